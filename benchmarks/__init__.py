@@ -0,0 +1,4 @@
+"""Headless benchmarks for the hot paths of the inventory app.
+
+Run with: python -m benchmarks.run --scales 1000 10000 100000
+"""
@@ -0,0 +1,205 @@
+import os
+import json
+import random
+import sqlite3
+import logging
+from datetime import date, timedelta
+from utils.migrations import migrate
+from utils.invoice_codec import encode_invoice_items
+from utils.money import Money, to_paise
+
+logger = logging.getLogger(__name__)
+
+# Rows written per executemany call
+BATCH_SIZE = 10000
+
+# Generated invoices are spread over the three financial years ending here
+END_DATE = date(2024, 3, 31)
+DAYS_OF_HISTORY = 3 * 365
+
+COMPANIES = ['HP', 'Dell', 'Lenovo', 'Asus', 'Acer', 'Canon', 'Epson', 'Logitech']
+CATEGORIES = ['Laptop', 'Printer', 'Monitor', 'Keyboard', 'Mouse', 'Cartridge', 'Cable', 'Adapter']
+GST_RATES = [5.0, 12.0, 18.0, 28.0]
+ITEM_COLUMNS = ['item_name', 'item_code', 'quantity', 'price', 'discount_percentage',
+                'discount_amount', 'gst_percentage', 'gst_amount', 'total_amount']
+
+def row_counts(scale):
+    """Number of rows per table for a given scale (roughly the total row count)"""
+    invoices = max(10, scale * 4 // 10)
+    return {
+        'products': max(20, scale // 50),
+        'sellers': max(10, scale // 100),
+        'invoices': invoices,
+        # One credit entry per credit invoice plus about as many payments
+        'seller_transactions': invoices * 6 // 10
+    }
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _products(rng, count):
+    for i in range(1, count + 1):
+        company = rng.choice(COMPANIES)
+        category = rng.choice(CATEGORIES)
+        # Prices are stored in paise
+        buying_price = to_paise(round(rng.uniform(50, 50000), 2))
+        yield (
+            company,
+            category,
+            f"{company} {category} {i:06d}",
+            f"ITM{i:07d}",
+            buying_price,
+            round(buying_price * rng.uniform(1.05, 1.4)),
+            rng.randint(0, 500),
+            (END_DATE - timedelta(days=rng.randrange(DAYS_OF_HISTORY))).isoformat(),
+            rng.choice(GST_RATES)
+        )
+
+def _sellers(rng, count):
+    for i in range(1, count + 1):
+        yield (
+            f"Seller {i:06d}",
+            f"{rng.randint(1, 999)} Market Road, Rayagada",
+            f"9{rng.randrange(10 ** 9):09d}",
+            f"21ABCDE{i:04d}F1Z{i % 10}"
+        )
+
+def _invoice_payload(rng, products, lines):
+    """Line items encoded the way create_invoice stores them in invoice_data, and the total in paise"""
+    items = []
+    total = Money(0)
+    for product in rng.sample(products, lines):
+        item_name, item_code, price, gst = product
+        price = Money(price)
+        quantity = rng.randint(1, 10)
+        discount_percentage = rng.choice([0.0, 0.0, 5.0, 10.0])
+        discount_amount = (price * quantity).percent(discount_percentage)
+        amount = price * quantity - discount_amount
+        items.append({
+            'item_name': item_name,
+            'item_code': item_code,
+            'quantity': quantity,
+            'price': price.rupees,
+            'discount_percentage': discount_percentage,
+            'discount_amount': discount_amount.rupees,
+            'gst_percentage': gst,
+            'gst_amount': amount.percent(gst).rupees,
+            'total_amount': amount.rupees
+        })
+        total += amount
+    return encode_invoice_items(items), total
+
+def generate(db_path, scale, seed=42):
+    """Create a database at db_path filled with deterministic synthetic data.
+
+    The schema is created by the app's migrations, so triggers maintain the
+    balance tables exactly as they do in production. Returns the row counts written.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    rng = random.Random(seed)
+    counts = row_counts(scale)
+
+    with sqlite3.connect(db_path) as conn:
+        migrate(conn)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            for batch in _batches(_products(rng, counts['products'])):
+                # Products start at zero; their stock arrives as opening movements
+                conn.executemany("""
+                    INSERT INTO products (
+                        company, category, item_name, item_code, buying_price,
+                        selling_price, quantity, date_purchased, gst_percentage
+                    ) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+                """, [row[:6] + row[7:] for row in batch])
+                conn.executemany("""
+                    INSERT INTO stock_movements (product_id, movement_type, quantity, balance_after, date, notes)
+                    SELECT id, 'opening', ?, ?, ?, 'Opening balance' FROM products WHERE item_code = ?
+                """, [(row[6], row[6], row[7], row[3]) for row in batch if row[6]])
+            for batch in _batches(_sellers(rng, counts['sellers'])):
+                conn.executemany(
+                    "INSERT INTO sellers (name, address, phone, gstin) VALUES (?, ?, ?, ?)", batch
+                )
+
+        products = conn.execute(
+            "SELECT item_name, item_code, selling_price, gst_percentage FROM products ORDER BY id"
+        ).fetchall()
+
+        # Invoices are generated in date order so ids and invoice numbers ascend together
+        start = END_DATE - timedelta(days=DAYS_OF_HISTORY)
+        offsets = sorted(rng.randrange(DAYS_OF_HISTORY) for _ in range(counts['invoices']))
+
+        credit_invoices = []
+
+        def invoices():
+            for number, offset in enumerate(offsets, 1):
+                invoice_date = (start + timedelta(days=offset)).isoformat()
+                payload, total = _invoice_payload(rng, products, min(len(products), rng.randint(1, 8)))
+                seller_id = rng.randint(1, counts['sellers'])
+                status = 'credit' if rng.random() < 0.5 else 'paid'
+                if status == 'credit':
+                    credit_invoices.append((number, seller_id, total, invoice_date))
+                yield (payload, total, invoice_date, seller_id, status, f"INV{number:04d}")
+
+        with conn:
+            for batch in _batches(invoices()):
+                conn.executemany("""
+                    INSERT INTO invoices (
+                        invoice_data, total_amount, date, seller_id,
+                        payment_status, invoice_number
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                """, batch)
+
+        def transactions():
+            budget = counts['seller_transactions']
+            for invoice_id, seller_id, total, invoice_date in credit_invoices:
+                if budget <= 0:
+                    return
+                yield (seller_id, invoice_id, total, 'credit', invoice_date,
+                       f"Credit sale - Invoice #INV{invoice_id:04d}")
+                budget -= 1
+                if budget > 0 and rng.random() < 0.8:
+                    paid_on = date.fromisoformat(invoice_date) + timedelta(days=rng.randint(0, 90))
+                    yield (seller_id, invoice_id, total * rng.uniform(0.2, 1.0), 'payment',
+                           min(paid_on, END_DATE).isoformat(), 'Payment received')
+                    budget -= 1
+
+        with conn:
+            for batch in _batches(transactions()):
+                conn.executemany("""
+                    INSERT INTO seller_transactions
+                    (seller_id, invoice_id, amount, transaction_type, date, notes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, batch)
+
+        written = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in counts
+        }
+    finally:
+        conn.close()
+
+    logger.info(f"Generated benchmark database {db_path}: {written}")
+    return written
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic inventory database")
+    parser.add_argument('db_path')
+    parser.add_argument('--scale', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(generate(args.db_path, args.scale, args.seed)))
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main is what a Streamlit worker imports before the first render; the pages
+# are what each first navigation pays for
+MODULES = [
+    'main',
+    'pages.invoice_generation',
+    'pages.add_items',
+    'pages.manage_items',
+    'pages.manage_sellers',
+    'pages.reports',
+    'pages.company_settings',
+    'pages.diagnostics',
+    'utils.backup_manager'
+]
+
+def _parse_importtime(stderr):
+    """Return {module: cumulative_us} from `python -X importtime` output"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # import time: <self us> | <cumulative us> | <nested module name>
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+def measure(module, repeat=3):
+    """Import module in fresh interpreters; returns median import time and heaviest dependencies"""
+    timings = []
+    heaviest = {}
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return {'module': module, 'error': result.stderr.strip().splitlines()[-1]}
+        cumulative = _parse_importtime(result.stderr)
+        timings.append(cumulative.get(module, 0) / 1000)
+        heaviest = cumulative
+
+    # Third-party and app modules with the largest cumulative cost
+    top = sorted(
+        ((name, us) for name, us in heaviest.items() if '.' not in name and name != module),
+        key=lambda item: item[1], reverse=True
+    )[:10]
+    return {
+        'module': module,
+        'runs': len(timings),
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'heaviest_imports_ms': {name: round(us / 1000, 3) for name, us in top}
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time of the app modules")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args(argv)
+
+    results = [measure(module, args.repeat) for module in args.modules]
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'results': results
+    }
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), 'results', f"import-time-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        if 'error' in result:
+            print(f"{result['module']:<28} failed: {result['error']}")
+        else:
+            print(f"{result['module']:<28} {result['median_ms']:>10.1f} ms")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
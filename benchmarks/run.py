@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from config import Config
+from benchmarks import datagen
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = [10 ** 3, 10 ** 4, 10 ** 5]
+DEFAULT_REPEAT = 5
+
+# Benchmarks whose cost grows with the whole history get fewer repetitions
+# above this many rows
+LARGE_SCALE = 10 ** 6
+
+def _time(func, repeat):
+    """Run func repeat times and return per-run wall times in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def _summary(name, scale, timings):
+    return {
+        'benchmark': name,
+        'scale': scale,
+        'runs': len(timings),
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3)
+    }
+
+def _sample_invoice_items(conn, lines=10):
+    import pandas as pd
+
+    items = pd.read_sql_query("""
+        SELECT item_name, item_code, selling_price as price, gst_percentage
+        FROM products
+        WHERE quantity > 0
+        ORDER BY id
+        LIMIT ?
+    """, conn, params=(lines,))
+    items['price'] = items['price'] / 100  # paise to rupees, as the invoice page does
+    items['quantity'] = 1
+    items['discount_percentage'] = 0.0
+    items['discount_amount'] = 0.0
+    items['total_amount'] = items['price']
+    items['gst_amount'] = items['total_amount'] * items['gst_percentage'] / 100
+    return items[datagen.ITEM_COLUMNS]
+
+def run_scale(scale, repeat, seed, workdir, only=None):
+    """Generate a database for one scale and time every hot path against it"""
+    # Pages are imported after Config points at the generated database
+    import pandas as pd
+    from utils.db_manager import get_db_connection
+    from utils import seller_index
+    from utils import analytics_snapshot
+    from utils import invoice_codec
+    from utils import invoice_cart
+    from utils import tax
+    from utils import money
+    from utils import pdf_generator
+    import inventory_core
+    from pages import invoice_generation, manage_sellers, reports
+
+    scale_dir = os.path.join(workdir, str(scale))
+    os.makedirs(scale_dir, exist_ok=True)
+    Config.DATABASE_PATH = os.path.join(scale_dir, 'inventory.db')
+    Config.ANALYTICS_DIR = os.path.join(scale_dir, 'analytics')
+
+    start = time.perf_counter()
+    counts = datagen.generate(Config.DATABASE_PATH, scale, seed)
+    generate_ms = (time.perf_counter() - start) * 1000
+
+    heavy_repeat = 1 if scale >= LARGE_SCALE else repeat
+    results = []
+
+    def bench(name, func, runs=repeat):
+        if only and name not in only:
+            return
+        logger.info(f"[{scale}] {name}")
+        results.append(_summary(name, scale, _time(func, runs)))
+
+    with get_db_connection() as conn:
+        items = _sample_invoice_items(conn)
+        seller = conn.execute(
+            "SELECT id, name, address, phone, gstin FROM sellers ORDER BY id LIMIT 1"
+        ).fetchone()
+        products_df = pd.read_sql_query("SELECT * FROM products WHERE quantity > 0", conn)
+        money.rupee_columns(products_df, ['buying_price', 'selling_price'])
+        invoice_tax = tax.compute_invoice_tax(conn, items, seller[4])
+
+    seller_details = {
+        'name': seller[1], 'address': seller[2], 'phone': seller[3],
+        'gstin': seller[4], 'payment_status': 'credit'
+    }
+    final_amount = invoice_tax.totals['grand_total']
+
+    bench('generate_pdf', lambda: pdf_generator.generate_pdf(
+        invoice_tax, seller_details, 'INV0001', preview=True
+    ))
+
+    # Tax for a 10,000-line invoice, intra-state (CGST/SGST) and inter-state (IGST)
+    large_invoice = pd.concat([items] * (10000 // len(items)), ignore_index=True)
+    bench('tax_10k_lines', lambda: tax.InvoiceTax(large_invoice, '21', '21ABCDE0001F1Z1'))
+    bench('tax_10k_lines_igst', lambda: tax.InvoiceTax(large_invoice, '21', '27ABCDE0001F1Z1'))
+
+    def next_invoice_number():
+        with get_db_connection() as conn:
+            inventory_core.get_next_invoice_number(conn)
+    bench('get_next_invoice_number', next_invoice_number)
+
+    bench('filter_products', lambda: invoice_generation.filter_products(
+        products_df, {'company': 'hp', 'item_name': '1'}
+    ))
+
+    def fill_cart(lines=500):
+        cart = invoice_cart.InvoiceCart()
+        for product in products_df.head(lines).itertuples(index=False):
+            cart.add(product.id, product.item_name, product.item_code, 1,
+                     product.selling_price, 0.0, product.gst_percentage)
+        return cart.to_dataframe()
+    bench('invoice_cart_fill', fill_cart)
+
+    bench('get_seller_history', manage_sellers.get_seller_history, heavy_repeat)
+
+    def build_seller_index():
+        seller_index.invalidate_seller_index()
+        seller_index.get_seller_index()
+    bench('seller_index_build', build_seller_index)
+
+    index = seller_index.get_seller_index()
+    bench('seller_index_search', lambda: index.search('Seller 00'))
+
+    with get_db_connection() as conn:
+        payloads = [row[0] for row in conn.execute(
+            "SELECT invoice_data FROM invoices ORDER BY id LIMIT 1000"
+        ).fetchall()]
+    bench('decode_invoice_items', lambda: [invoice_codec.decode_invoice_items(p) for p in payloads])
+
+    # Reports: first the SQLite path, then a cold and a warm columnar snapshot
+    available = analytics_snapshot.is_available
+    analytics_snapshot.is_available = lambda: False
+    try:
+        bench('reports_load_sqlite', analytics_snapshot.load_report_data, heavy_repeat)
+    finally:
+        analytics_snapshot.is_available = available
+
+    if analytics_snapshot.is_available():
+        bench('reports_snapshot_refresh_cold',
+              lambda: analytics_snapshot.refresh_snapshot(force=True), heavy_repeat)
+        bench('reports_load_snapshot', analytics_snapshot.load_report_data, heavy_repeat)
+
+    df_invoices, df_items = analytics_snapshot.load_report_data()
+    bench('reports_daily_sales_trend', lambda: reports.daily_sales_trend(df_invoices))
+    bench('reports_top_products', lambda: (
+        reports.top_products(df_items, 'total_amount'),
+        reports.top_products(df_items, 'quantity')
+    ))
+    now = datetime.now()
+    bench('reports_rfm', lambda: reports.score_rfm(reports.rfm_metrics(df_invoices, now)))
+
+    # Saving writes to the database, so it runs last
+    def create_invoice():
+        with get_db_connection() as conn:
+            inventory_core.create_invoice(conn, items, final_amount, seller[0], 'credit')
+    bench('create_invoice', create_invoice)
+
+    return {
+        'scale': scale,
+        'rows': counts,
+        'generate_ms': round(generate_ms, 3),
+        'database_bytes': os.path.getsize(Config.DATABASE_PATH),
+        'results': results
+    }
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inventory app's hot paths")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="approximate total row counts to generate (10^3 to 10^7)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='+', help="run only the named benchmarks")
+    parser.add_argument('--output', default=None,
+                        help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--keep', action='store_true', help="keep the generated databases")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    database_path, analytics_dir = Config.DATABASE_PATH, Config.ANALYTICS_DIR
+    try:
+        runs = [run_scale(scale, args.repeat, args.seed, workdir, args.only) for scale in args.scales]
+    finally:
+        Config.DATABASE_PATH, Config.ANALYTICS_DIR = database_path, analytics_dir
+        if args.keep:
+            print(f"Generated databases kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'runs': runs
+    }
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), 'results', f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for run in runs:
+        for result in run['results']:
+            print(f"{run['scale']:>10}  {result['benchmark']:<32} {result['median_ms']:>12.3f} ms")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
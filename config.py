@@ -2,9 +2,53 @@ import os
 
 class Config:
     DATABASE_PATH = 'inventory.db'
+    # Closed financial years are moved here by `python -m utils.archive`
+    ARCHIVE_DATABASE_PATH = 'inventory_archive.db'
     BACKUP_DIR = 'backups'
     MAX_BACKUPS = 30
-    PDF_DIR = 'invoices'
+    PDF_DIR = 'invoices/store'  # saved invoice PDFs, stored by content hash
+    PDF_WORKERS = 2       # processes rendering PDFs after an invoice is saved
+    PDF_FIRST_PAGE_ROWS = 24  # longer invoices are laid out a page at a time
+    PDF_PAGE_ROWS = 40        # item rows on each following page
+    PREVIEW_DIR = 'previews'  # PNG previews of invoice PDFs, cached by content hash
+    PREVIEW_PAGES = 2
+    PREVIEW_SCALE = 1.5       # 1.0 renders at 72 dpi
+    PREVIEW_CACHE_SIZE = 100  # previews kept, least recently shown dropped first
+    STATEMENT_DIR = 'statements'  # written by `python -m utils.statements`
+    STATEMENT_WORKERS = 4
+    STATEMENT_BATCH_SIZE = 50     # sellers per worker task
+    EXPORT_DIR = 'exports'        # CSV/XLSX files written by utils.exports
+    EXPORT_CHUNK_ROWS = 5000      # rows fetched from SQLite per chunk while exporting
+    EXPORT_KEEP = 20              # newest export files kept
+    ANALYTICS_DIR = 'analytics'
+    PAGE_SIZE = 50
+    PAGE_SIZE_OPTIONS = [25, 50, 100, 200]
+    
+    # Logging
+    LOG_DIR = 'logs'
+    LOG_FILE = 'app.jsonl'
+    LOG_LEVEL = 'INFO'
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUPS = 14
+    LOG_DEBUG_SAMPLE_EVERY = 10  # log file keeps 1 in N debug lines per call site; 0 keeps none
+    
+    # Query instrumentation
+    QUERY_STATS_ENABLED = True
+    SLOW_QUERY_MS = 100
+    SLOW_QUERY_LOG = os.path.join('logs', 'slow_queries.log')
+    SLOW_QUERY_HISTORY = 200
+    QUERY_PROGRESS_STEPS = 1000
+    
+    # Page profiling (also enabled per session with ?profile=1 or ?profile=cprofile)
+    PROFILING_ENABLED = False
+    PROFILE_CPROFILE = False
+    PROFILE_DIR = os.path.join('logs', 'profiles')
+    PROFILE_MAX_BYTES = 5 * 1024 * 1024
+    PROFILE_BACKUPS = 5
+    
+    # Tax (see utils/tax.py)
+    TAX_ROUNDING = 'half_up'    # or 'half_even'; line amounts are rounded to whole paise
+    INVOICE_ROUND_OFF = True    # round the invoice total to whole rupees
     
     # Company details
     COMPANY_NAME = "Gananath Enterprises"
@@ -0,0 +1,422 @@
+"""Core inventory operations, independent of the Streamlit pages.
+
+Every function takes an open sqlite3 connection, commits its own
+transaction and raises InventoryError when an operation is rejected, so the
+same code serves the pages, command-line scripts and the benchmarks.
+"""
+import sqlite3
+import logging
+from datetime import datetime
+import pandas as pd
+from utils.seller_index import invalidate_seller_index
+from utils.invoice_codec import encode_invoice_items
+from utils.money import Money, to_paise
+from utils.dates import to_iso_date
+from utils.allocations import allocate_payments
+
+logger = logging.getLogger(__name__)
+
+INVOICE_ITEM_COLUMNS = ['item_name', 'item_code', 'quantity', 'price',
+                        'discount_percentage', 'discount_amount',
+                        'gst_percentage', 'gst_amount', 'total_amount']
+
+PRODUCT_COLUMNS = ['company', 'category', 'item_name', 'item_code',
+                   'buying_price', 'selling_price', 'quantity', 'gst_percentage']
+
+class InventoryError(Exception):
+    """Raised when an operation is rejected, e.g. an unknown seller or insufficient stock"""
+
+def _today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+def _format_date(value):
+    if value is None:
+        return _today()
+    try:
+        return to_iso_date(value)
+    except ValueError as e:
+        raise InventoryError(str(e))
+
+# Sellers
+
+def add_seller(conn, name, address, phone, gstin):
+    """Create a seller and return its id"""
+    if not name or not address:
+        raise InventoryError("Name and Address are required fields!")
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO sellers (name, address, phone, gstin)
+            VALUES (?, ?, ?, ?)
+        ''', (name, address, phone, gstin))
+    invalidate_seller_index()
+    logger.info(f"Created new seller with ID: {cursor.lastrowid}")
+    return cursor.lastrowid
+
+def update_seller(conn, seller_id, name, address, phone, gstin):
+    if not name or not address:
+        raise InventoryError("Name and Address are required fields!")
+    with conn:
+        conn.execute('''
+            UPDATE sellers
+            SET name = ?, address = ?, phone = ?, gstin = ?
+            WHERE id = ?
+        ''', (name, address, phone, gstin, int(seller_id)))
+    invalidate_seller_index()
+
+def get_or_create_seller(conn, name, address, phone, gstin):
+    """Return the id of the seller with this name and phone, creating it if needed"""
+    existing_seller = conn.execute('''
+        SELECT id FROM sellers
+        WHERE name = ? AND phone = ?
+    ''', (name, phone)).fetchone()
+    if existing_seller:
+        logger.info(f"Found existing seller: {existing_seller[0]}")
+        return existing_seller[0]
+    return add_seller(conn, name, address, phone, gstin)
+
+# Seller ledger
+
+def record_transaction(conn, seller_id, amount, transaction_type, notes='', invoice_id=None, transaction_date=None):
+    """Append an entry to the seller ledger and return its id.
+
+    amount is in rupees, or Money; it is stored as paise.
+    sellers.total_credit is kept in step by the update_seller_credit trigger,
+    and open payments are allocated to open credit sales, oldest first.
+    """
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO seller_transactions
+            (seller_id, invoice_id, amount, transaction_type, date, notes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (int(seller_id), invoice_id, Money.from_rupees(amount), transaction_type,
+              _format_date(transaction_date), notes))
+        allocate_payments(conn, seller_id)
+    invalidate_seller_index()
+    return cursor.lastrowid
+
+def record_payment(conn, seller_id, amount, notes='', invoice_id=None, payment_date=None):
+    """Record a payment against a seller's outstanding credit"""
+    row = conn.execute("SELECT total_credit FROM sellers WHERE id = ?", (int(seller_id),)).fetchone()
+    if row is None:
+        raise InventoryError(f"Seller ID {seller_id} not found in database")
+    pending_amount = Money(row[0] or 0)
+    amount = Money.from_rupees(amount)
+    if amount <= 0:
+        raise InventoryError("Payment amount must be greater than 0")
+    if amount > pending_amount:
+        raise InventoryError(f"Payment amount cannot exceed pending amount (₹{pending_amount:.2f})")
+    return record_transaction(conn, seller_id, amount, 'payment', notes, invoice_id, payment_date)
+
+# Invoices
+
+def get_next_invoice_number(conn):
+    c = conn.cursor()
+
+    # Count archived invoices too so numbers keep increasing after utils.archive runs
+    c.execute("SELECT (SELECT COUNT(*) FROM invoices) + (SELECT COUNT(*) FROM archived_invoices)")
+    total_invoices = c.fetchone()[0]
+
+    # The next invoice number is the total number of invoices plus one
+    next_number = total_invoices + 1
+
+    # Format the invoice number (e.g., INV0001)
+    return f"INV{next_number:04d}"
+
+def _deduct_stock(conn, item_name, item_code, quantity, invoice_id, invoice_number):
+    product = conn.execute("""
+        SELECT id, quantity
+        FROM products
+        WHERE item_name = ? AND item_code = ?
+    """, (item_name, item_code)).fetchone()
+    if not product or product[1] < quantity:
+        raise InventoryError(f"Insufficient quantity for {item_name}")
+
+    _move_stock(conn, product[0], -int(quantity), 'sale', f'Invoice #{invoice_number}', invoice_id)
+    logger.debug(f"Updated quantity for {item_name}: -{quantity}")
+
+def create_invoice(conn, invoice_items, final_amount, seller_id, payment_status, invoice_number=None):
+    """Save an invoice, its credit entry and the stock deductions in one transaction.
+
+    invoice_items is a DataFrame with INVOICE_ITEM_COLUMNS and final_amount is
+    in rupees, or Money. Returns the new
+    invoice's (id, invoice_number); nothing is written if any step fails.
+    """
+    if invoice_items.empty:
+        raise InventoryError("Invoice has no items")
+    # A numpy int64 from a DataFrame would otherwise be bound as a BLOB
+    seller_id = int(seller_id)
+
+    cursor = conn.cursor()
+
+    # Double check seller exists
+    cursor.execute("""
+        SELECT id, name
+        FROM sellers
+        WHERE id = ?
+    """, (seller_id,))
+    seller_record = cursor.fetchone()
+    if not seller_record:
+        logger.error(f"Seller ID {seller_id} not found while saving invoice")
+        raise InventoryError(f"Seller ID {seller_id} not found in database")
+
+    logger.debug(f"Verified seller exists: ID={seller_id}, Name={seller_record[1]}")
+
+    if invoice_number is None:
+        invoice_number = get_next_invoice_number(conn)
+    today = _today()
+    final_amount = Money.from_rupees(final_amount)
+
+    with conn:
+        cursor.execute('''
+            INSERT INTO invoices (
+                invoice_data, total_amount, date, seller_id,
+                payment_status, invoice_number
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            encode_invoice_items(invoice_items),
+            final_amount,
+            today,
+            seller_id,
+            payment_status,
+            invoice_number
+        ))
+        invoice_id = cursor.lastrowid
+        logger.info(f"Created invoice: ID={invoice_id}, Number={invoice_number}")
+
+        # If credit sale, add to seller_transactions
+        if payment_status == 'credit':
+            cursor.execute('''
+                INSERT INTO seller_transactions
+                (seller_id, invoice_id, amount, transaction_type, date, notes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                seller_id,
+                invoice_id,
+                final_amount,
+                'credit',
+                today,
+                f'Credit sale - Invoice #{invoice_number}'
+            ))
+            # sellers.total_credit is updated by the update_seller_credit trigger;
+            # a payment received in advance is applied to the new credit
+            allocate_payments(conn, seller_id)
+            logger.info(f"Recorded credit for seller {seller_id}: +₹{final_amount:.2f}")
+
+        for item in invoice_items.itertuples(index=False):
+            _deduct_stock(conn, item.item_name, item.item_code, item.quantity, invoice_id, invoice_number)
+
+    logger.debug("Transaction committed successfully")
+    invalidate_seller_index()
+    return invoice_id, invoice_number
+
+# Products
+
+def _validate_product(product):
+    for column in ('company', 'category', 'item_name', 'item_code'):
+        if not product.get(column):
+            raise InventoryError(f"{column.replace('_', ' ').capitalize()} is required")
+    if product['buying_price'] <= 0:
+        raise InventoryError("Buying price must be greater than 0")
+    if product['selling_price'] <= 0:
+        raise InventoryError("Selling price must be greater than 0")
+    if product['quantity'] <= 0:
+        raise InventoryError("Quantity must be greater than 0")
+
+# Products start at zero stock; the purchase is then recorded as a stock movement
+PRODUCT_INSERT = '''
+    INSERT INTO products
+    (company, category, item_name, item_code, buying_price,
+     selling_price, date_purchased, gst_percentage, quantity)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+'''
+
+def _product_row(product, date_purchased):
+    # Buying prices are entered excluding GST and stored including it, in paise.
+    # The quantity comes last so the row minus it matches PRODUCT_INSERT
+    buying_price_with_gst = product['buying_price'] * (1 + product['gst_percentage'] / 100)
+    return (
+        product['company'], product['category'], product['item_name'], product['item_code'],
+        to_paise(buying_price_with_gst), to_paise(product['selling_price']),
+        _format_date(date_purchased), float(product['gst_percentage']), int(product['quantity'])
+    )
+
+def add_product(conn, company, category, item_name, item_code, buying_price,
+                selling_price, quantity, date_purchased, gst_percentage):
+    """Add a single product; buying_price excludes GST"""
+    product = {
+        'company': company, 'category': category, 'item_name': item_name,
+        'item_code': item_code, 'buying_price': buying_price,
+        'selling_price': selling_price, 'quantity': quantity,
+        'gst_percentage': gst_percentage
+    }
+    _validate_product(product)
+
+    existing_product = conn.execute("""
+        SELECT id FROM products
+        WHERE company = ? AND category = ? AND item_name = ?
+    """, (company, category, item_name)).fetchone()
+    if existing_product:
+        raise InventoryError("A product with this combination already exists.")
+
+    row = _product_row(product, date_purchased)
+    try:
+        with conn:
+            cursor = conn.execute(PRODUCT_INSERT, row[:-1])
+            _move_stock(conn, cursor.lastrowid, row[-1], 'purchase', 'Added product')
+    except sqlite3.IntegrityError:
+        raise InventoryError("A product with this combination already exists.")
+
+def import_products(conn, products, date_purchased=None):
+    """Add many products, e.g. from a bulk upload.
+
+    products is a DataFrame with PRODUCT_COLUMNS; buying prices exclude GST.
+    Rows without a name and code are ignored and rows without stock are
+    rejected. A row whose item code already exists updates that product's
+    details and adds its quantity as a purchase. Returns
+    (success_count, error_count, errors) with one message per rejected row.
+    """
+    rows = []
+    errors = []
+    for product in products.to_dict('records'):
+        if not product.get('item_name') or not product.get('item_code'):
+            continue
+        try:
+            if float(product['quantity']) <= 0:
+                errors.append(f"Skipping {product['item_name']}: Quantity must be greater than 0")
+                continue
+            rows.append(_product_row(product, date_purchased))
+        except (TypeError, ValueError) as e:
+            errors.append(f"Error adding {product['item_name']}: {str(e)}")
+
+    success_count = 0
+    with conn:
+        # Savepoints below would otherwise each commit on their own
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        for row in rows:
+            try:
+                conn.execute("SAVEPOINT import_product")
+                # An upsert keeps the product id, so its stock history stays attached
+                product_id = conn.execute(PRODUCT_INSERT.rstrip() + '''
+                    ON CONFLICT(item_code) DO UPDATE SET
+                        company = excluded.company,
+                        category = excluded.category,
+                        item_name = excluded.item_name,
+                        buying_price = excluded.buying_price,
+                        selling_price = excluded.selling_price,
+                        date_purchased = excluded.date_purchased,
+                        gst_percentage = excluded.gst_percentage
+                    RETURNING id
+                ''', row[:-1]).fetchone()[0]
+                _move_stock(conn, product_id, row[-1], 'purchase', 'Imported')
+                conn.execute("RELEASE import_product")
+                success_count += 1
+            except (sqlite3.Error, InventoryError) as e:
+                conn.execute("ROLLBACK TO import_product")
+                conn.execute("RELEASE import_product")
+                errors.append(f"Error adding {row[2]}: {str(e)}")
+
+    logger.info(f"Imported {success_count} products, {len(errors)} rejected")
+    return success_count, len(errors), errors
+
+# Stock ledger
+
+STOCK_MOVEMENT_TYPES = ('purchase', 'sale', 'adjustment', 'return')
+
+def _move_stock(conn, product_id, delta, movement_type, notes='', invoice_id=None):
+    """Append a stock movement inside the caller's transaction and return the new balance.
+
+    products.quantity is updated from balance_after by the
+    stock_movements_update_quantity trigger. Movements are dated today so
+    each product's balances follow date order, which as-of lookups rely on.
+    """
+    row = conn.execute("SELECT quantity FROM products WHERE id = ?", (int(product_id),)).fetchone()
+    if row is None:
+        raise InventoryError(f"Product ID {product_id} not found")
+    balance = (row[0] or 0) + int(delta)
+    if balance < 0:
+        raise InventoryError(f"Insufficient quantity for product ID {product_id}")
+    conn.execute('''
+        INSERT INTO stock_movements
+        (product_id, movement_type, quantity, balance_after, date, invoice_id, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (int(product_id), movement_type, int(delta), balance,
+          _today(), invoice_id, notes))
+    return balance
+
+def adjust_stock(conn, item_code, delta, movement_type='adjustment', notes=''):
+    """Add delta (negative to remove) to a product's stock and return the new quantity"""
+    if movement_type not in STOCK_MOVEMENT_TYPES:
+        raise InventoryError(f"Unknown stock movement type {movement_type}")
+    row = conn.execute("SELECT id FROM products WHERE item_code = ?", (item_code,)).fetchone()
+    if row is None:
+        raise InventoryError(f"Product {item_code} not found")
+    with conn:
+        balance = _move_stock(conn, row[0], delta, movement_type, notes)
+    logger.info(f"Stock {movement_type} for {item_code}: {int(delta):+d}, now {balance}")
+    return balance
+
+def update_products(conn, products):
+    """Save edited product rows, matched by id; prices are in rupees"""
+    if (products['quantity'] <= 0).any():
+        raise InventoryError("Quantity must be greater than 0 for all products")
+
+    rows = []
+    quantities = []
+    for row in products.to_dict('records'):
+        # Rows added in the editor have no id yet and are not saved here
+        if pd.isna(row['id']):
+            continue
+        rows.append((
+            row['company'], row['category'], row['item_name'], row['item_code'],
+            to_paise(row['buying_price']), to_paise(row['selling_price']),
+            None if pd.isna(row['date_purchased']) else _format_date(row['date_purchased']),
+            row['gst_percentage'], int(row['id'])
+        ))
+        quantities.append((int(row['id']), int(row['quantity'])))
+    with conn:
+        conn.executemany("""
+            UPDATE products
+            SET company=?, category=?, item_name=?, item_code=?,
+                buying_price=?, selling_price=?,
+                date_purchased=?, gst_percentage=?
+            WHERE id=?
+        """, rows)
+        # Edited quantities are recorded as adjustments against the current stock
+        for product_id, quantity in quantities:
+            current = conn.execute("SELECT quantity FROM products WHERE id = ?", (product_id,)).fetchone()
+            if current is not None and quantity != (current[0] or 0):
+                _move_stock(conn, product_id, quantity - (current[0] or 0), 'adjustment', 'Edited in Manage Items')
+
+def delete_products(conn, products):
+    """Delete products given as (item_name, item_code) pairs.
+
+    Remaining stock is written off first so the ledger balances to zero.
+    """
+    with conn:
+        for item_name, item_code in products:
+            row = conn.execute("""
+                SELECT id, quantity FROM products
+                WHERE item_name = ? AND item_code = ?
+            """, (item_name, item_code)).fetchone()
+            if row is None:
+                continue
+            if row[1]:
+                _move_stock(conn, row[0], -row[1], 'adjustment', 'Product deleted')
+            conn.execute("DELETE FROM products WHERE id = ?", (row[0],))
+
+if __name__ == "__main__":
+    # e.g. python inventory_core.py import-products products.csv
+    import sys
+    from utils.db_manager import get_db_connection
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3 or sys.argv[1] != 'import-products':
+        sys.exit("usage: python inventory_core.py import-products <file.csv|file.xlsx>")
+    path = sys.argv[2]
+    products = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path)
+    with get_db_connection() as conn:
+        success_count, error_count, errors = import_products(conn, products)
+    for error in errors:
+        print(error)
+    print(f"{success_count} products imported, {error_count} rejected")
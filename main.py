@@ -1,90 +1,36 @@
 import streamlit as st
-import sqlite3
+import importlib
 from streamlit_option_menu import option_menu
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-import io
-import base64
-from pages.add_items import add_items
-from pages.manage_items import manage_items
-from pages.invoice_generation import invoice_generation
-from pages.reports import reports
-from pages.manage_sellers import manage_sellers
-from pages.company_settings import company_settings
 from backup import after_login_logout
 from utils.db_manager import init_db
-from utils.backup_manager import init_backup
+from utils.backup_manager import start_background_backup
+from utils.query_stats import page_context
+from utils.profiler import profile_page
+from config import Config
+from contextlib import nullcontext
 import logging
-from utils.logger import setup_logger
-
-# Initialize SQLite database
-conn = sqlite3.connect('inventory.db')
-c = conn.cursor()
-
-# Enable foreign key support
-c.execute("PRAGMA foreign_keys = ON")
-
-# Create tables if they don't exist
-c.execute('''CREATE TABLE IF NOT EXISTS products
-             (id INTEGER PRIMARY KEY, company TEXT, category TEXT, item_name TEXT, 
-             item_code TEXT, buying_price REAL, selling_price REAL, 
-             quantity INTEGER, date_purchased TEXT,
-             gst_percentage REAL,
-             UNIQUE(company, category, item_name))''')
-
-c.execute('''CREATE TABLE IF NOT EXISTS sellers
-             (id INTEGER PRIMARY KEY,
-              name TEXT NOT NULL,
-              address TEXT,
-              phone TEXT,
-              gstin TEXT,
-              total_credit REAL DEFAULT 0,
-              UNIQUE(name, phone))''')
-
-# Check if the invoices table exists
-c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='invoices'")
-if c.fetchone() is None:
-    # If the table doesn't exist, create it with all columns
-    c.execute('''CREATE TABLE invoices
-                 (id INTEGER PRIMARY KEY,
-                  invoice_data TEXT,
-                  total_amount REAL,
-                  date TEXT,
-                  pdf_path TEXT,
-                  seller_id INTEGER,
-                  payment_status TEXT DEFAULT 'paid',
-                  invoice_number TEXT,  -- Format: INV0001, INV0002, etc.
-                  FOREIGN KEY(seller_id) REFERENCES sellers(id))''')
-else:
-    # If the table exists, check if all columns are present
-    c.execute("PRAGMA table_info(invoices)")
-    columns = [column[1] for column in c.fetchall()]
-    required_columns = ['invoice_data', 'total_amount', 'date', 'pdf_path', 
-                       'seller_id', 'payment_status', 'invoice_number']
-    
-    for column in required_columns:
-        if column not in columns:
-            # If a required column doesn't exist, add it
-            c.execute(f"ALTER TABLE invoices ADD COLUMN {column} TEXT")
-
-# Create seller_transactions table after invoices table
-c.execute('''CREATE TABLE IF NOT EXISTS seller_transactions
-             (id INTEGER PRIMARY KEY,
-              seller_id INTEGER,
-              invoice_id INTEGER,
-              amount REAL,
-              transaction_type TEXT,
-              date TEXT,
-              notes TEXT,
-              FOREIGN KEY(seller_id) REFERENCES sellers(id),
-              FOREIGN KEY(invoice_id) REFERENCES invoices(id))''')
-
-conn.commit()
-
-logger = setup_logger()
+from utils.logger import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Menu label -> (module, function). Page modules and their heavy dependencies
+# (reportlab, plotly, OCR, PDF parsing) are imported on first navigation only
+PAGES = {
+    "Create Invoice": ("pages.invoice_generation", "invoice_generation"),
+    "Add New Items": ("pages.add_items", "add_items"),
+    "Inventory Management": ("pages.manage_items", "manage_items"),
+    "Customer Database": ("pages.manage_sellers", "manage_sellers"),
+    "Business Analytics": ("pages.reports", "reports"),
+    "Business Settings": ("pages.company_settings", "company_settings"),
+    "Data Export": ("pages.data_export", "data_export"),
+    "Diagnostics": ("pages.diagnostics", "diagnostics")
+}
+
+def load_page(label):
+    """Import a page module on first use and return its render function"""
+    module_name, function_name = PAGES[label]
+    return getattr(importlib.import_module(module_name), function_name)
 
 def main():
     st.set_page_config(
@@ -99,14 +45,8 @@ def main():
         st.error("Failed to initialize database. Please check the logs.")
         return
 
-    # Perform backup
-    try:
-        if init_backup():
-            logger.info("Backup completed successfully")
-        else:
-            logger.warning("Backup failed or partially completed")
-    except Exception as e:
-        logger.error(f"Error during backup: {e}")
+    # Back up once per process, off the request thread
+    start_background_backup()
 
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
@@ -168,6 +108,7 @@ def main():
                 "Inventory Management",
                 "Customer Database",
                 "Business Analytics",
+                "Data Export",
                 "Business Settings"
             ],
             icons=[
@@ -176,6 +117,7 @@ def main():
                 '📦 box-seam',        # Inventory Management
                 '👥 people',          # Customer Database
                 '📊 graph-up',        # Business Analytics
+                '📥 download',        # Data Export
                 '⚙️ gear'             # Business Settings
             ],
             menu_icon=None,
@@ -217,22 +159,33 @@ def main():
         "Inventory Management": "Manage Items",
         "Customer Database": "Manage Sellers",
         "Business Analytics": "Reports",
+        "Data Export": "Data Export",
         "Business Settings": "Company Settings"
     }
     
-    # Route to the selected page
-    if selected == "Create Invoice":
-        invoice_generation()
-    elif selected == "Add New Items":
-        add_items()
-    elif selected == "Inventory Management":
-        manage_items()
-    elif selected == "Customer Database":
-        manage_sellers()
-    elif selected == "Business Analytics":
-        reports()
-    elif selected == "Business Settings":
-        company_settings()
+    # The diagnostics page is not in the menu; open it with ?page=diagnostics
+    if st.query_params.get("page") == "diagnostics":
+        selected = "Diagnostics"
+    
+    # Opt-in profiling: Config.PROFILING_ENABLED, or ?profile=1 / ?profile=cprofile
+    profile_mode = st.query_params.get("profile")
+    profiling = Config.PROFILING_ENABLED or profile_mode in ("1", "cprofile")
+    use_cprofile = Config.PROFILE_CPROFILE or profile_mode == "cprofile"
+    page_name = page_mapping.get(selected, selected)
+    
+    # Route to the selected page; queries are attributed to it in the diagnostics
+    profile = profile_page(page_name, use_cprofile) if profiling else nullcontext()
+    with profile as run, page_context(page_name):
+        load_page(selected)()
+    
+    if run is not None:
+        # Timing overlay for the page just rendered
+        stages = " · ".join(f"{s['stage']} {s['ms']:.0f} ms" for s in run.stages)
+        st.caption(
+            f"⏱️ {page_name}: {run.total_ms:.0f} ms total, "
+            f"{run.sql_ms:.0f} ms SQL in {run.sql_statements} statements"
+            + (f" | {stages}" if stages else "")
+        )
 
 if __name__ == "__main__":
     main()
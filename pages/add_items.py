@@ -1,31 +1,22 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import pytesseract
-from PIL import Image
-import pdfplumber
-from utils.logger import setup_logger
+import logging
 from utils.db_manager import get_db_connection
+import inventory_core
 import time
 
-logger = setup_logger()
+logger = logging.getLogger(__name__)
 
 def add_single_product(conn, company, category, item_name, item_code, buying_price, 
                       selling_price, quantity, date_purchased, gst_percentage):
     try:
-        # Calculate buying price including GST
-        buying_price_with_gst = buying_price * (1 + gst_percentage/100)
-        
-        with conn:
-            conn.execute('''INSERT OR REPLACE INTO products 
-                         (company, category, item_name, item_code, buying_price, 
-                         selling_price, quantity, date_purchased, gst_percentage) 
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (company, category, item_name, item_code, buying_price_with_gst,
-                       selling_price, quantity, str(date_purchased), gst_percentage))
+        inventory_core.add_product(
+            conn, company, category, item_name, item_code, buying_price,
+            selling_price, quantity, date_purchased, gst_percentage
+        )
         return True, "Product added successfully!"
-    except sqlite3.IntegrityError:
-        return False, "Error: A product with this combination already exists."
+    except inventory_core.InventoryError as e:
+        return False, f"Error: {e}"
 
 def single_product_form(conn):
     # Create a container for the form
@@ -98,16 +89,6 @@ def single_product_form(conn):
             if validation_failed:
                 return False
             
-            # Check if product already exists with improved error message
-            existing_product = pd.read_sql_query("""
-                SELECT * FROM products 
-                WHERE company = ? AND category = ? AND item_name = ?
-            """, conn, params=(company, category, item_name))
-            
-            if not existing_product.empty:
-                st.error("❌ A product with this combination already exists. Please use the Manage Items page to update existing products.")
-                return False
-            
             with st.spinner("Adding product..."):
                 success, message = add_single_product(
                     conn, company, category, item_name, item_code, 
@@ -126,7 +107,10 @@ def single_product_form(conn):
 
 def process_file(file, column_mapping=None):
     try:
+        # OCR and PDF parsing libraries are imported only when such a file is uploaded
         if file.type.startswith('image'):
+            import pytesseract
+            from PIL import Image
             image = Image.open(file)
             text = pytesseract.image_to_string(image)
             # Convert OCR text to DataFrame
@@ -143,6 +127,7 @@ def process_file(file, column_mapping=None):
             df = pd.DataFrame(data)
             
         elif file.type == 'application/pdf':
+            import pdfplumber
             text = ""
             with pdfplumber.open(file) as pdf:
                 for page in pdf.pages:
@@ -248,57 +233,12 @@ def create_combined_items_table(field_type, company_value, category_value, num_r
 
 def add_combined_items(conn, items_df):
     """Add multiple items to the database"""
-    success_count = 0
-    error_count = 0
-    errors = []
-    
-    for _, item in items_df.iterrows():
-        if not item['item_name'] or not item['item_code']:
-            continue
-            
-        try:
-            # Calculate buying price including GST
-            buying_price_with_gst = item['buying_price'] * (1 + item['gst_percentage']/100)
-            
-            with conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO products 
-                    (company, category, item_name, item_code, buying_price, 
-                     selling_price, quantity, date_purchased, gst_percentage) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    item['company'], item['category'], item['item_name'],
-                    item['item_code'], buying_price_with_gst, item['selling_price'],
-                    item['quantity'], pd.Timestamp.now().strftime('%Y-%m-%d'),
-                    item['gst_percentage']
-                ))
-            success_count += 1
-        except Exception as e:
-            error_count += 1
-            errors.append(f"Error adding {item['item_name']}: {str(e)}")
-    
-    return success_count, error_count, errors
+    return inventory_core.import_products(conn, items_df)
 
 def add_items():
     st.title("Add Items to Inventory")
     
-    # Initialize database
     with get_db_connection() as conn:
-        conn.execute('''CREATE TABLE IF NOT EXISTS products
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     company TEXT,
-                     category TEXT,
-                     item_name TEXT,
-                     item_code TEXT,
-                     buying_price REAL,
-                     selling_price REAL,
-                     quantity INTEGER,
-                     date_purchased TEXT,
-                     gst_percentage REAL,
-                     UNIQUE(company, category, item_name),
-                     UNIQUE(item_code)
-                     )''')
-        
         # Tab selection with icons
         tab1, tab2, tab3 = st.tabs(["📝 Single Item", "📑 Bulk Upload", "🔄 Combine Items"])
         
@@ -345,29 +285,11 @@ def add_items():
                             )
                             
                             if st.button("Upload to Database"):
-                                success_count = 0
-                                error_count = 0
-                                
-                                for _, row in edited_df.iterrows():
-                                    try:
-                                        # Validate quantity
-                                        if row['quantity'] <= 0:
-                                            st.warning(f"Skipping {row['item_name']}: Quantity must be greater than 0")
-                                            error_count += 1
-                                            continue
-                                            
-                                        success, _ = add_single_product(
-                                            conn, row['company'], row['category'], row['item_name'],
-                                            row['item_code'], row['buying_price'], row['selling_price'],
-                                            row['quantity'], pd.Timestamp.now(), row['gst_percentage']
-                                        )
-                                        if success:
-                                            success_count += 1
-                                        else:
-                                            error_count += 1
-                                    except Exception as e:
-                                        error_count += 1
-                                        logger.error(f"Error adding product: {e}")
+                                success_count, error_count, errors = inventory_core.import_products(
+                                    conn, edited_df
+                                )
+                                for error in errors:
+                                    st.warning(error)
                                 
                                 st.success(f"Successfully added {success_count} products!")
                                 if error_count > 0:
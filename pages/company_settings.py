@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
 from utils.db_manager import get_db_connection, ensure_company_details_exist
-from utils.logger import setup_logger
+import logging
 import time
 
-logger = setup_logger()
+logger = logging.getLogger(__name__)
 
 def update_company_details(conn, details):
     try:
@@ -0,0 +1,46 @@
+import os
+import streamlit as st
+import logging
+from utils.db_manager import get_db_connection
+from utils.profiler import stage
+from utils.exports import EXPORTS, FORMATS, export
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    'csv': "text/csv",
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+def data_export():
+    st.title("Data Export")
+    st.caption("Exports are written to disk in chunks, so even large tables can be downloaded.")
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        name = st.selectbox("Data", list(EXPORTS), format_func=lambda key: EXPORTS[key][0])
+    with col2:
+        fmt = st.radio("Format", FORMATS, format_func=str.upper, horizontal=True)
+
+    if st.button("Prepare Export", type="primary"):
+        try:
+            with stage("export"), st.spinner("Exporting..."), get_db_connection() as conn:
+                path, count = export(conn, name, fmt)
+            # Kept across the rerun a download button click causes
+            st.session_state.last_export = (path, count)
+        except Exception as e:
+            logger.error(f"Error exporting {name}: {e}")
+            st.error(f"Error exporting data: {e}")
+
+    last_export = st.session_state.get('last_export')
+    if last_export and os.path.exists(last_export[0]):
+        path, count = last_export
+        file_name = os.path.basename(path)
+        st.success(f"{count:,} rows exported to {file_name}")
+        with open(path, 'rb') as f:
+            st.download_button(
+                f"Download {file_name}",
+                f,
+                file_name=file_name,
+                mime=MIME_TYPES[file_name.rsplit('.', 1)[1]]
+            )
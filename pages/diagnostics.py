@@ -0,0 +1,113 @@
+import streamlit as st
+import pandas as pd
+from config import Config
+from utils.query_stats import get_query_stats, get_slow_queries, reset_query_stats
+from utils.profiler import load_profiles, summarize_profiles
+
+def page_profiles():
+    """p50/p95 render time per page and stage from the profile store"""
+    st.subheader("Page Render Times")
+    records = load_profiles()
+    if not records:
+        st.info("No page profiles recorded. Open a page with ?profile=1 (or ?profile=cprofile) to record one.")
+        return
+
+    summary = pd.DataFrame(summarize_profiles(records))
+    st.dataframe(
+        summary,
+        column_config={
+            "page": "Page",
+            "stage": "Stage",
+            "runs": "Runs",
+            "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+            "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    # Latest cProfile capture, if any
+    profiled = [r for r in records if r.get('top_functions')]
+    if profiled:
+        latest = profiled[-1]
+        with st.expander(f"Latest cProfile: {latest['page']} at {latest['time']}"):
+            st.dataframe(pd.DataFrame(latest['top_functions']), hide_index=True, use_container_width=True)
+
+def diagnostics():
+    st.title("Diagnostics")
+
+    page_profiles()
+
+    if not Config.QUERY_STATS_ENABLED:
+        st.info("Query instrumentation is disabled (Config.QUERY_STATS_ENABLED).")
+        return
+
+    st.caption(
+        f"Statistics cover this server process since start or last reset. "
+        f"Statements slower than {Config.SLOW_QUERY_MS} ms are logged to {Config.SLOW_QUERY_LOG}."
+    )
+
+    if st.button("Reset Statistics"):
+        reset_query_stats()
+        st.rerun()
+
+    stats = pd.DataFrame(get_query_stats())
+    if stats.empty:
+        st.info("No queries recorded yet")
+        return
+
+    # Per-page totals show which page is hammering the database
+    st.subheader("Database Time by Page")
+    by_page = stats.groupby('page').agg({
+        'calls': 'sum',
+        'total_ms': 'sum',
+        'rows': 'sum',
+        'slow_calls': 'sum'
+    }).sort_values('total_ms', ascending=False).reset_index()
+    st.dataframe(
+        by_page,
+        column_config={
+            "page": "Page",
+            "calls": "Statements",
+            "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+            "rows": "Rows Returned",
+            "slow_calls": "Slow Statements"
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    st.subheader("Statements")
+    page_filter = st.selectbox("Page", ["All"] + by_page['page'].tolist())
+    if page_filter != "All":
+        stats = stats[stats['page'] == page_filter]
+    st.dataframe(
+        stats[['page', 'sql', 'calls', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'vm_steps', 'slow_calls']],
+        column_config={
+            "page": "Page",
+            "sql": st.column_config.TextColumn("SQL", width="large"),
+            "calls": "Calls",
+            "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+            "avg_ms": st.column_config.NumberColumn("Avg (ms)", format="%.2f"),
+            "max_ms": st.column_config.NumberColumn("Max (ms)", format="%.1f"),
+            "rows": "Rows",
+            "vm_steps": "VM Steps",
+            "slow_calls": "Slow"
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    st.subheader("Recent Slow Queries")
+    slow_queries = get_slow_queries()
+    if not slow_queries:
+        st.info("No slow queries recorded")
+    for query in slow_queries:
+        with st.expander(f"{query['elapsed_ms']:.1f} ms · {query['page']} · {query['time']}"):
+            st.code(query['sql'], language='sql')
+            if query['plan']:
+                st.text(query['plan'])
+            st.write(f"Rows returned: {query['rows']}")
+
+if __name__ == "__main__":
+    diagnostics()
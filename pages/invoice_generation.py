@@ -1,277 +1,32 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-import io
 import os
 from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A5
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import base64
 from utils.db_manager import get_db_connection, ensure_company_details_exist
+from utils.seller_index import get_seller_index
+from utils.profiler import stage
+from utils.invoice_cart import InvoiceCart
+from utils.pdf_generator import generate_pdf, get_company_details, invoice_pdf_key
+from utils.invoice_pdfs import queue_invoice_pdf
+from utils.pdf_preview import invoice_preview
+from utils.tax import line_amounts, compute_invoice_tax
+from utils.money import rupee_columns
+from inventory_core import get_next_invoice_number, get_or_create_seller, create_invoice
+from config import Config
 import time
 import logging
-from num2words import num2words
 
 logger = logging.getLogger(__name__)
 
-def generate_pdf(invoice_items, total_amount, gst_rate, igst_rate, final_amount, seller_details, invoice_number, preview=False):
-    buffer = io.BytesIO()
-    
-    # Ensure database is initialized
-    if not ensure_company_details_exist():
-        raise Exception("Failed to initialize database. Please check the logs.")
-    
-    # Get company details
-    with get_db_connection() as conn:
-        company_df = pd.read_sql_query("SELECT * FROM company_details WHERE id = 1", conn)
-        if company_df.empty:
-            raise Exception("Company details not found!")
-        company_details = company_df.iloc[0]
-    
-    # Use letter size for better layout
-    doc = SimpleDocTemplate(
-        buffer, 
-        pagesize=letter,
-        rightMargin=30,  # Increased margins
-        leftMargin=30,
-        topMargin=30,
-        bottomMargin=30,
-        showBoundary=1
-    )
-
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Add custom styles
-    styles.add(ParagraphStyle(
-        name='CompanyHeader',
-        parent=styles['Normal'],
-        fontSize=11,  # Slightly reduced font size
-        spaceAfter=2,
-        leading=13,
-        fontName='Helvetica-Bold'
-    ))
-    styles.add(ParagraphStyle(
-        name='CompanyDetails',
-        parent=styles['Normal'],
-        fontSize=8,  # Reduced font size
-        spaceAfter=1,
-        leading=10
-    ))
-    
-    # Create the title "TAX INVOICE" centered
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Title'],
-        fontSize=16,
-        spaceAfter=6,
-        spaceBefore=6,
-        alignment=1
-    )
-    elements.append(Paragraph("TAX INVOICE", title_style))
-    elements.append(Spacer(1, 5))
-    
-    # Create header table with seller and company info
-    seller_info = [
-        [Paragraph("Bill To:", styles['CompanyHeader'])],
-        [Paragraph(f"M/S {seller_details['name']}", styles['CompanyDetails'])],
-        [Paragraph(seller_details['address'], styles['CompanyDetails'])],
-        [Paragraph(f"GSTIN/UIN: {seller_details['gstin']}", styles['CompanyDetails'])],
-        [Paragraph(f"Contact: {seller_details['phone']}", styles['CompanyDetails'])],
-        [Paragraph(f"State Name: {company_details['state']}, Code: {company_details['state_code']}", styles['CompanyDetails'])]
-    ]
-    
-    company_info = [
-        [Paragraph(company_details['name'], styles['CompanyHeader'])],
-        [Paragraph(company_details['address'], styles['CompanyDetails'])],
-        [Paragraph(f"{company_details['city']}, {company_details['state']} - {company_details['state_code']}", styles['CompanyDetails'])],
-        [Paragraph(f"GSTIN: {company_details['gstin']}", styles['CompanyDetails'])],
-        [Paragraph(f"Phone: {company_details['phone']}", styles['CompanyDetails'])],
-        [Paragraph(f"Email: {company_details['email']}", styles['CompanyDetails'])]
-    ]
-    
-    # Calculate available width for tables
-    available_width = 535  # Total width minus margins
-    col_width = available_width / 2  # Equal width for two columns
-    
-    # Create a table for the header section
-    header_data = [
-        [Table(seller_info, colWidths=[col_width]), Table(company_info, colWidths=[col_width])],
-        [
-            Table([
-                [Paragraph("Invoice Details:", styles['CompanyHeader'])],
-                [Paragraph(f"Invoice No: {invoice_number}", styles['CompanyDetails'])],
-                [Paragraph(f"Date: {datetime.now().strftime('%d-%b-%y')}", styles['CompanyDetails'])],
-                [Paragraph(f"Mode/Terms of Payment: {seller_details['payment_status'].upper()}", styles['CompanyDetails'])]
-            ], colWidths=[col_width]),
-            Table([
-                [Paragraph("Shipping Details:", styles['CompanyHeader'])],
-                [Paragraph("Delivery Note: ", styles['CompanyDetails'])],
-                [Paragraph("Dispatch Doc No: ", styles['CompanyDetails'])],
-                [Paragraph("Dispatched through: ", styles['CompanyDetails'])]
-            ], colWidths=[col_width])
-        ]
-    ]
-    
-    header_table = Table(header_data, colWidths=[col_width, col_width])
-    header_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 8))
-    
-    # Create items table with borders (removed Part No. column)
-    items_data = [
-        ['Sl\nNo.', 'Description of Goods', 'HSN/SAC', 'GST\nRate', 'Quantity', 'Rate\n(incl. of Tax)', 'Rate', 'per', 'Disc. %', 'Amount']
-    ]
-    
-    # Add items with rounded amounts
-    for idx, item in enumerate(invoice_items.itertuples(), 1):
-        items_data.append([
-            str(idx),
-            item.item_name,
-            "84701000",  # Example HSN code
-            f"{item.gst_percentage}%",
-            str(item.quantity),
-            f"{item.price:.0f}",
-            f"{(item.price/(1 + item.gst_percentage/100)):.0f}",
-            "Nos",
-            f"{item.discount_percentage}%",
-            f"{item.total_amount:.0f}"
-        ])
-    
-    # Add totals row with rounded amount
-    total_qty = invoice_items['quantity'].sum()
-    items_data.append(['', 'Total', '', '', str(total_qty), '', '', '', '', f"{total_amount:.0f}"])
-    
-    # Adjust items table column widths to fit within available width
-    col_widths = [25, 175, 45, 35, 45, 55, 55, 30, 35, 35]  # Total should equal available_width
-    
-    items_table = Table(items_data, colWidths=col_widths)
-    items_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
-        ('FONT', (0, 1), (-1, -1), 'Helvetica', 8),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),  # Description column left aligned
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(items_table)
-    
-    # Add spacer to push bottom section to the end
-    elements.append(Spacer(1, 50))
-    
-    # Update bottom section widths
-    bottom_data = [
-        [
-            # Left side - Bank Details
-            Table([
-                [Paragraph("Company's Bank Details", styles['CompanyHeader'])],
-                [Paragraph(f"Bank Name: {company_details['bank_name']}", styles['CompanyDetails'])],
-                [Paragraph(f"A/c No.: {company_details['bank_account']}", styles['CompanyDetails'])],
-                [Paragraph(f"Branch: {company_details['bank_branch']}", styles['CompanyDetails'])],
-                [Paragraph(f"IFSC Code: {company_details['bank_ifsc']}", styles['CompanyDetails'])]
-            ], colWidths=[col_width]),
-            
-            # Right side - Amount Details
-            Table([
-                [Paragraph("Amount Details", styles['CompanyHeader'])],
-                [Paragraph(f"Subtotal: INR {total_amount:.0f}", styles['CompanyDetails'])],
-                [Paragraph(f"GST ({gst_rate}%): INR {total_amount * (gst_rate/100):.0f}", styles['CompanyDetails'])],
-                [Paragraph(f"Total Amount: INR {final_amount:.0f}", styles['CompanyDetails'])],
-                [Paragraph(f"Amount in Words: {num2words(int(final_amount)).title()} Only", 
-                          ParagraphStyle('AmountWords', parent=styles['CompanyDetails'], fontSize=8, leading=10))]
-            ], colWidths=[col_width])
-        ]
-    ]
-    
-    bottom_table = Table(bottom_data, colWidths=[col_width, col_width])
-    bottom_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
-    elements.append(bottom_table)
-    
-    # Update footer width
-    footer_data = [
-        [Paragraph("Declaration: We declare that this invoice shows the actual price of the goods described and that all particulars are true and correct.", 
-                  ParagraphStyle('Footer', parent=styles['Normal'], fontSize=7, alignment=0, leading=8))],
-        [Paragraph(f"SUBJECT TO {company_details['jurisdiction']} JURISDICTION | This is a Computer Generated Invoice", 
-                  ParagraphStyle('Footer', parent=styles['Normal'], fontSize=7, alignment=1, leading=8))]
-    ]
-    
-    footer_table = Table(footer_data, colWidths=[available_width])
-    footer_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    elements.append(footer_table)
-
-    doc.build(elements)
-    
-    if preview:
-        return buffer
-    else:
-        return buffer.getvalue()
-
-def get_next_invoice_number(conn):
-    c = conn.cursor()
-    
-    # Get the total number of rows in the invoices table
-    c.execute("SELECT COUNT(*) FROM invoices")
-    total_invoices = c.fetchone()[0]
-    
-    # The next invoice number is the total number of invoices plus one
-    next_number = total_invoices + 1
-    
-    # Format the invoice number (e.g., INV0001)
-    return f"INV{next_number:04d}"
-
-def get_seller_history():
-    """Fetch unique seller details from previous invoices"""
-    try:
-        with get_db_connection() as conn:
-            df = pd.read_sql_query("""
-                SELECT s.*, 
-                       COUNT(DISTINCT i.id) as order_count,
-                       MAX(i.date) as last_order_date,
-                       s.total_credit as current_credit
-                FROM sellers s
-                LEFT JOIN invoices i ON s.id = i.seller_id
-                GROUP BY s.id
-                ORDER BY last_order_date DESC
-            """, conn)
-            return df
-    except Exception as e:
-        st.error(f"Error fetching seller history: {e}")
-        return pd.DataFrame()
-
 def seller_details_section():
     """Seller details section with history support"""
     with st.container():
         st.subheader("Seller Details")
         
-        # Get seller history
-        seller_history = get_seller_history()
+        # Get the cached seller index
+        with stage("seller index"):
+            seller_index = get_seller_index()
         
         # Clear seller_id from session state if "New Seller" is selected
         if 'current_seller_id' in st.session_state and st.session_state.get('new_seller_selected', False):
@@ -281,11 +36,21 @@ def seller_details_section():
         col1, col2 = st.columns(2)
         
         with col1:
-            if not seller_history.empty:
-                # Create a selectbox with previous sellers
+            if len(seller_index) > 0:
+                # Typeahead over the index; without a search the most recent buyers are listed
+                seller_search = st.text_input(
+                    "Search Seller",
+                    placeholder="Type a name or phone number...",
+                    key="seller_search"
+                )
+                matches = seller_index.search(seller_search, limit=Config.PAGE_SIZE)
+                
+                # Options are seller ids so duplicate names resolve unambiguously
                 selected_seller = st.selectbox(
                     "Select Seller",
-                    ["Select a Seller", "New Seller"] + seller_history['name'].tolist(),
+                    ["Select a Seller", "New Seller"] + matches,
+                    format_func=lambda x: x if isinstance(x, str) else
+                        f"{seller_index.get(x)['name']} ({seller_index.get(x)['phone']})",
                     help="Select from existing sellers or choose 'New Seller' to enter new details"
                 )
                 
@@ -312,9 +77,7 @@ def seller_details_section():
                     seller_gstin = st.text_input("GSTIN")
                 else:
                     # Auto-fill seller details
-                    seller_data = seller_history[
-                        seller_history['name'] == selected_seller
-                    ].iloc[0]
+                    seller_data = seller_index.get(selected_seller)
                     
                     st.info(f"""
                         Last Order: {seller_data['last_order_date']}
@@ -324,7 +87,7 @@ def seller_details_section():
                     
                     # Store seller_id in session state
                     st.session_state.current_seller_id = int(seller_data['id'])
-                    logger.info(f"Set current_seller_id in session: {st.session_state.current_seller_id}")
+                    logger.debug(f"Set current_seller_id in session: {st.session_state.current_seller_id}")
                     
                     # Display seller details in read-only format
                     st.write("**Seller Name:**", seller_data['name'])
@@ -390,17 +153,15 @@ def invoice_generation():
     tab1, tab2 = st.tabs(["🛍️ Select Items", "📋 Preview Invoice"])
     
     # Initialize session state for invoice items if not exists
-    if 'invoice_items' not in st.session_state:
-        st.session_state.invoice_items = pd.DataFrame(
-            columns=['item_name', 'item_code', 'quantity', 'price', 
-                    'discount_percentage', 'discount_amount',
-                    'gst_percentage', 'gst_amount', 'total_amount']
-        )
+    if 'invoice_cart' not in st.session_state:
+        st.session_state.invoice_cart = InvoiceCart()
+    cart = st.session_state.invoice_cart
     
     with tab1:
         # Load available products
-        with get_db_connection() as conn:
+        with stage("load products"), get_db_connection() as conn:
             products_df = pd.read_sql_query("SELECT * FROM products WHERE quantity > 0", conn)
+            rupee_columns(products_df, ['buying_price', 'selling_price'])
         
         if products_df.empty:
             st.warning("⚠️ No products available in inventory. Please add products first.")
@@ -508,11 +269,12 @@ def invoice_generation():
                     )
                 
                 # Calculate and show totals with better formatting
-                subtotal = quantity * new_price
-                discount_amount = subtotal * (discount_percentage / 100)
-                amount_after_discount = subtotal - discount_amount
-                gst_amount = amount_after_discount * (gst_percentage / 100)
-                final_amount = amount_after_discount + gst_amount
+                amounts = line_amounts(quantity, new_price, discount_percentage, gst_percentage)
+                subtotal = amounts['gross_amount']
+                discount_amount = amounts['discount_amount']
+                amount_after_discount = amounts['taxable_value']
+                gst_amount = amounts['gst_amount']
+                final_amount = amounts['total_amount']
                 
                 st.markdown("### 💳 Order Summary")
                 summary_col1, summary_col2 = st.columns(2)
@@ -555,52 +317,42 @@ def invoice_generation():
                             return
                         
                         # Check total quantity in current invoice
-                        if not st.session_state.invoice_items.empty:
-                            existing_qty = st.session_state.invoice_items[
-                                st.session_state.invoice_items['item_name'] == selected_item
-                            ]['quantity'].sum()
-                            
-                            if existing_qty + quantity > current_qty:
-                                st.error(f"""
-                                    Cannot add item: Total quantity would exceed available stock
-                                    Available: {current_qty}
-                                    Already in invoice: {existing_qty}
-                                    Additional requested: {quantity}
-                                    Total needed: {existing_qty + quantity}
-                                    
-                                    Please adjust quantities or update stock in Manage Items.
-                                """)
-                                return
-                    
-                    # Add item to invoice
-                    new_item = pd.DataFrame([{
-                        'item_name': selected_item,
-                        'item_code': item_details['item_code'],
-                        'quantity': quantity,
-                        'price': new_price,
-                        'discount_percentage': discount_percentage,
-                        'discount_amount': discount_amount,
-                        'gst_percentage': gst_percentage,
-                        'gst_amount': gst_amount,
-                        'total_amount': final_amount
-                    }])
+                        existing_qty = cart.quantity_of(int(item_details['id']))
+                        if existing_qty + quantity > current_qty:
+                            st.error(f"""
+                                Cannot add item: Total quantity would exceed available stock
+                                Available: {current_qty}
+                                Already in invoice: {existing_qty}
+                                Additional requested: {quantity}
+                                Total needed: {existing_qty + quantity}
+                                
+                                Please adjust quantities or update stock in Manage Items.
+                            """)
+                            return
                     
-                    st.session_state.invoice_items = pd.concat(
-                        [st.session_state.invoice_items, new_item],
-                        ignore_index=True
+                    # Add item to invoice, merging with an existing line for the same product
+                    cart.add(
+                        int(item_details['id']),
+                        selected_item,
+                        item_details['item_code'],
+                        quantity,
+                        new_price,
+                        discount_percentage,
+                        gst_percentage
                     )
                     st.success(f"Added {quantity} {selected_item} to invoice")
                     time.sleep(0.5)
                     st.rerun()
 
         # Display current invoice items
-        if not st.session_state.invoice_items.empty:
+        if not cart.empty:
             st.subheader("Current Invoice Items")
             
             # Make the dataframe editable
             edited_df = st.data_editor(
-                st.session_state.invoice_items,
+                cart.to_dataframe(),
                 column_config={
+                    "product_id": None,  # Hide product ID column
                     "item_name": st.column_config.TextColumn("Item Name"),
                     "item_code": st.column_config.TextColumn("Item Code"),
                     "quantity": st.column_config.NumberColumn("Quantity", min_value=1),
@@ -618,41 +370,46 @@ def invoice_generation():
             # Add Save Changes button
             if st.button("Save Changes", type="primary"):
                 try:
-                    # Update calculations
-                    if not edited_df.empty:
-                        edited_df['discount_amount'] = edited_df['price'] * edited_df['quantity'] * edited_df['discount_percentage'] / 100
-                        edited_df['gst_amount'] = (edited_df['price'] * edited_df['quantity'] - edited_df['discount_amount']) * edited_df['gst_percentage'] / 100
-                        edited_df['total_amount'] = (
-                            edited_df['price'] * edited_df['quantity'] * 
-                            (1 - edited_df['discount_percentage']/100) * 
-                            (1 + edited_df['gst_percentage']/100)
-                        )
-                        st.session_state.invoice_items = edited_df
-                        st.success("Changes saved successfully!")
-                        st.rerun()
+                    # Amounts are recomputed for every line
+                    cart.replace_from_dataframe(edited_df)
+                    st.success("Changes saved successfully!")
+                    st.rerun()
                 except Exception as e:
                     st.error(f"Error saving changes: {e}")
             
-            # Calculate totals
-            subtotal = edited_df['total_amount'].sum()
-            total_gst = edited_df['gst_amount'].sum()
-            final_amount = subtotal
+            # Totals of the rows as edited, so unsaved edits show up before Save Changes
+            totals = cart.totals
+            try:
+                totals = InvoiceCart.from_dataframe(edited_df).totals
+            except (ValueError, TypeError) as e:
+                st.warning(f"Showing saved totals; an edited row is incomplete: {e}")
+            if totals != cart.totals:
+                st.caption("Totals include unsaved changes")
+            subtotal = totals['taxable_value']
+            total_gst = totals['gst_amount']
+            final_amount = totals['total_amount']
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Subtotal", f"₹{subtotal:.2f}")
+                st.metric("Taxable Value", f"₹{subtotal:.2f}")
             with col2:
                 st.metric("GST Amount", f"₹{total_gst:.2f}")
             with col3:
                 st.metric("Final Amount", f"₹{final_amount:.2f}")
     
     with tab2:
-        if st.session_state.invoice_items.empty:
+        if cart.empty:
             st.info("Add items to the invoice to see preview")
         else:
-            # Generate invoice preview
+            invoice_items = cart.to_dataframe()
+
+            # Generate invoice preview. Line amounts already include GST; the
+            # CGST/SGST or IGST split depends on the place of supply
             with get_db_connection() as conn:
                 invoice_number = get_next_invoice_number(conn)
+                tax = compute_invoice_tax(conn, invoice_items, seller_details['gstin'])
+                company_details = get_company_details(conn)
+            final_amount = tax.totals['grand_total']
             
             seller_info = {
                 'name': seller_details['name'],
@@ -662,29 +419,29 @@ def invoice_generation():
                 'payment_status': seller_details['payment_status']
             }
             
-            # Calculate GST
-            total_amount = st.session_state.invoice_items['total_amount'].sum()
-            total_gst = (st.session_state.invoice_items['total_amount'] * 
-                        st.session_state.invoice_items['gst_percentage'] / 100).sum()
-            final_amount = total_amount + total_gst
-            
-            # Generate PDF preview
-            pdf_buffer = generate_pdf(
-                st.session_state.invoice_items,
-                total_amount,
-                total_gst,
-                0,  # IGST rate
-                final_amount,
-                seller_info,
-                invoice_number,
-                preview=True
-            )
+            # Generate PDF preview; it is cached by a hash of its inputs, so a
+            # rerun with the same invoice neither renders nor rasterizes it again
+            with stage("pdf preview"):
+                pdf_key = invoice_pdf_key(tax, seller_info, invoice_number, company_details)
+                pdf_path, images, page_count = invoice_preview(
+                    pdf_key,
+                    lambda: generate_pdf(tax, seller_info, invoice_number, invariant=True)
+                )
             
-            # Display PDF preview
-            pdf_bytes = pdf_buffer.getvalue()
-            b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-            pdf_display = f'<iframe src="data:application/pdf;base64,{b64_pdf}" width="100%" height="800" type="application/pdf"></iframe>'
-            st.markdown(pdf_display, unsafe_allow_html=True)
+            # Display page images; the PDF itself is only sent when downloaded
+            if not images:
+                st.info("Install pypdfium2 to see a preview of the invoice here.")
+            else:
+                st.image(images, use_column_width=True)
+                if page_count > len(images):
+                    st.caption(f"Showing {len(images)} of {page_count} pages")
+            with open(pdf_path, 'rb') as pdf_file:
+                st.download_button(
+                    "Download PDF",
+                    pdf_file,
+                    file_name=f"{invoice_number}.pdf",
+                    mime="application/pdf"
+                )
             
             col1, col2 = st.columns(2)
             with col1:
@@ -703,156 +460,52 @@ def invoice_generation():
                             # Get or create seller_id
                             if hasattr(st.session_state, 'current_seller_id'):
                                 seller_id = st.session_state.current_seller_id
-                                logger.info(f"Using existing seller_id from session: {seller_id}")
+                                logger.debug(f"Using existing seller_id from session: {seller_id}")
                             else:
                                 # Validate new seller details
                                 if not seller_details['name'] or not seller_details['address']:
                                     st.error("Please fill in all required seller details (Name and Address)")
                                     return
                                 
-                                # Check if seller already exists
-                                cursor = conn.cursor()
-                                cursor.execute('''
-                                    SELECT id FROM sellers 
-                                    WHERE name = ? AND phone = ?
-                                ''', (seller_details['name'], seller_details['phone']))
-                                existing_seller = cursor.fetchone()
-                                
-                                if existing_seller:
-                                    seller_id = existing_seller[0]
-                                    logger.info(f"Found existing seller: {seller_id}")
-                                else:
-                                    # Insert new seller
-                                    cursor.execute('''
-                                        INSERT INTO sellers (name, address, phone, gstin)
-                                        VALUES (?, ?, ?, ?)
-                                    ''', (
-                                        seller_details['name'],
-                                        seller_details['address'],
-                                        seller_details['phone'],
-                                        seller_details['gstin']
-                                    ))
-                                    conn.commit()  # Commit the seller creation
-                                    seller_id = cursor.lastrowid
-                                    logger.info(f"Created new seller with ID: {seller_id}")
+                                seller_id = get_or_create_seller(
+                                    conn,
+                                    seller_details['name'],
+                                    seller_details['address'],
+                                    seller_details['phone'],
+                                    seller_details['gstin']
+                                )
                             
                             if not seller_id:
                                 st.error("Failed to get or create seller ID")
                                 return
                             
-                            logger.info(f"Final seller_id before transaction: {seller_id}")
+                            logger.debug(f"Final seller_id before transaction: {seller_id}")
                             
                             # Save invoice to database with validated seller_id
-                            cursor = conn.cursor()
-                            
-                            # Start transaction
                             try:
-                                # Double check seller exists
-                                cursor.execute("""
-                                    SELECT id, name 
-                                    FROM sellers 
-                                    WHERE id = ?
-                                """, (seller_id,))
-                                seller_record = cursor.fetchone()
-                                logger.info(f"Seller verification query result: {seller_record}")
-                                
-                                if not seller_record:
-                                    # Try to debug the issue
-                                    cursor.execute("SELECT * FROM sellers")
-                                    all_sellers = cursor.fetchall()
-                                    logger.error(f"All sellers in database: {all_sellers}")
-                                    raise Exception(f"Seller ID {seller_id} not found in database")
-                                
-                                logger.info(f"Verified seller exists: ID={seller_id}, Name={seller_record[1]}")
-                                
-                                # Begin transaction after verification
-                                conn.execute("BEGIN TRANSACTION")
-                                
-                                # Insert invoice with verified seller_id
-                                cursor.execute('''
-                                    INSERT INTO invoices (
-                                        invoice_data, total_amount, date, seller_id,
-                                        payment_status, invoice_number
-                                    ) VALUES (?, ?, ?, ?, ?, ?)
-                                ''', (
-                                    st.session_state.invoice_items.to_json(),
+                                invoice_id, invoice_number = create_invoice(
+                                    conn,
+                                    tax.lines,
                                     final_amount,
-                                    datetime.now().strftime('%Y-%m-%d'),
                                     seller_id,
                                     seller_details['payment_status'],
                                     invoice_number
-                                ))
-                                invoice_id = cursor.lastrowid
-                                logger.info(f"Created invoice: ID={invoice_id}, Number={invoice_number}")
-                                
-                                # If credit sale, add to seller_transactions
-                                if seller_details['payment_status'] == 'credit':
-                                    cursor.execute('''
-                                        INSERT INTO seller_transactions 
-                                        (seller_id, invoice_id, amount, transaction_type, date, notes)
-                                        VALUES (?, ?, ?, ?, ?, ?)
-                                    ''', (
-                                        seller_id,
-                                        invoice_id,
-                                        final_amount,
-                                        'credit',
-                                        datetime.now().strftime('%Y-%m-%d'),
-                                        f'Credit sale - Invoice #{invoice_number}'
-                                    ))
-                                    
-                                    # Update seller's total credit
-                                    cursor.execute('''
-                                        UPDATE sellers 
-                                        SET total_credit = total_credit + ?
-                                        WHERE id = ?
-                                    ''', (final_amount, seller_id))
-                                    logger.info(f"Updated credit for seller {seller_id}: +₹{final_amount:.2f}")
-                                
-                                # Update product quantities
-                                for _, item in st.session_state.invoice_items.iterrows():
-                                    # Verify current quantity first
-                                    cursor.execute("""
-                                        SELECT quantity 
-                                        FROM products 
-                                        WHERE item_name = ? AND item_code = ?
-                                    """, (item['item_name'], item['item_code']))
-                                    current_qty = cursor.fetchone()
-                                    if not current_qty or current_qty[0] < item['quantity']:
-                                        raise Exception(f"Insufficient quantity for {item['item_name']}")
-                                    
-                                    # Update quantity
-                                    cursor.execute("""
-                                        UPDATE products 
-                                        SET quantity = quantity - ? 
-                                        WHERE item_name = ? AND item_code = ?
-                                    """, (
-                                        item['quantity'],
-                                        item['item_name'],
-                                        item['item_code']
-                                    ))
-                                    logger.info(f"Updated quantity for {item['item_name']}: -{item['quantity']}")
+                                )
                                 
-                                # Commit all changes
-                                conn.commit()
-                                logger.info("Transaction committed successfully")
+                                # The final PDF is rendered and stored in the background
+                                try:
+                                    queue_invoice_pdf(conn, invoice_id, invoice_number, tax, seller_info)
+                                except Exception as e:
+                                    logger.error(f"Could not queue PDF for invoice {invoice_number}: {e}")
                                 
                                 # Clear the invoice items
-                                st.session_state.invoice_items = pd.DataFrame(
-                                    columns=['item_name', 'item_code', 'quantity', 'price', 
-                                            'discount_percentage', 'discount_amount',
-                                            'gst_percentage', 'gst_amount', 'total_amount']
-                                )
+                                cart.clear()
                                 
                                 st.success("Invoice generated and saved successfully!")
                                 time.sleep(1)
                                 st.rerun()
                                 
                             except Exception as e:
-                                # Rollback on any error
-                                try:
-                                    conn.rollback()
-                                except:
-                                    pass
                                 st.error(f"Error saving invoice: {str(e)}")
                                 logger.error(f"Error saving invoice: {str(e)}")
                                 return
@@ -862,11 +515,7 @@ def invoice_generation():
             
             with col2:
                 if st.button("Clear Invoice"):
-                    st.session_state.invoice_items = pd.DataFrame(
-                        columns=['item_name', 'item_code', 'quantity', 'price', 
-                                'discount_percentage', 'discount_amount',
-                                'gst_percentage', 'gst_amount', 'total_amount']
-                    )
+                    cart.clear()
                     st.rerun()
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
 import streamlit as st
 import pandas as pd
 from utils.db_manager import get_db_connection
+import inventory_core
+from utils.stock_ledger import get_stock_as_of, get_stock_movements_page, get_inventory_value_series
+from utils.money import rupee_columns
+from utils.dates import DATE_FORMAT
+from config import Config
 from datetime import datetime
 
 def filter_products(df, filters):
@@ -23,9 +28,10 @@ def manage_items():
     with get_db_connection() as conn:
         # Load all products
         df = pd.read_sql_query("SELECT * FROM products", conn)
+        rupee_columns(df, ['buying_price', 'selling_price'])
         
         # Convert string dates to datetime
-        df['date_purchased'] = pd.to_datetime(df['date_purchased'])
+        df['date_purchased'] = pd.to_datetime(df['date_purchased'], format=DATE_FORMAT)
         
         # Filters
         st.subheader("Filter Products")
@@ -70,34 +76,11 @@ def manage_items():
         
         if st.button("Save Changes"):
             try:
-                # Validate quantities before saving
-                if (edited_df['quantity'] <= 0).any():
-                    st.error("Quantity must be greater than 0 for all products")
-                    return
-                    
-                # Update changed rows
-                for index, row in edited_df.iterrows():
-                    date_str = row['date_purchased']
-                    if isinstance(date_str, pd.Timestamp):
-                        date_str = date_str.strftime('%Y-%m-%d')
-                    elif isinstance(date_str, str):
-                        # Ensure string dates are properly formatted
-                        date_str = pd.to_datetime(date_str).strftime('%Y-%m-%d')
-                    
-                    conn.execute("""
-                        UPDATE products 
-                        SET company=?, category=?, item_name=?, item_code=?, 
-                            buying_price=?, selling_price=?, quantity=?, 
-                            date_purchased=?, gst_percentage=?
-                        WHERE id=?
-                    """, (
-                        row['company'], row['category'], row['item_name'], row['item_code'],
-                        row['buying_price'], row['selling_price'], row['quantity'],
-                        date_str, row['gst_percentage'], row['id']
-                    ))
-                conn.commit()
+                inventory_core.update_products(conn, edited_df)
                 st.success("Changes saved successfully!")
                 st.rerun()
+            except inventory_core.InventoryError as e:
+                st.error(str(e))
             except Exception as e:
                 st.error(f"Error saving changes: {e}")
         
@@ -116,21 +99,71 @@ def manage_items():
         
         if products_to_delete and st.button("Delete Selected Products"):
             try:
-                for product in products_to_delete:
-                    # Extract item_name and item_code from the selected option
-                    item_name = product.split(" (Code: ")[0]
-                    item_code = product.split(" (Code: ")[1].rstrip(")")
-                    
-                    conn.execute("""
-                        DELETE FROM products 
-                        WHERE item_name = ? AND item_code = ?
-                    """, (item_name, item_code))
-                
-                conn.commit()
+                # Extract item_name and item_code from the selected options
+                inventory_core.delete_products(conn, [
+                    (product.split(" (Code: ")[0], product.split(" (Code: ")[1].rstrip(")"))
+                    for product in products_to_delete
+                ])
                 st.success(f"Successfully deleted {len(products_to_delete)} products!")
                 st.rerun()
             except Exception as e:
                 st.error(f"Error deleting products: {e}")
 
+        stock_history(conn, filtered_df)
+
+def stock_history(conn, products_df):
+    """Stock on a past date and each product's movements, from the stock ledger"""
+    st.subheader("Stock History")
+
+    as_of = st.date_input("Stock as of", value=datetime.now().date())
+    stock = get_stock_as_of(conn, as_of)
+    stock = stock[stock['product_id'].isin(products_df['id'])]
+    st.metric("Inventory Value", f"₹{stock['value'].sum():,.2f}")
+    st.dataframe(
+        stock.drop(columns=['product_id']),
+        column_config={
+            "company": "Company",
+            "category": "Category",
+            "item_name": "Item Name",
+            "item_code": "Item Code",
+            "buying_price": st.column_config.NumberColumn("Buying Price", format="₹%.2f"),
+            "quantity": "Quantity",
+            "value": st.column_config.NumberColumn("Value", format="₹%.2f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    series = get_inventory_value_series(conn)
+    if not series.empty:
+        st.line_chart(series.set_index('snapshot_date')['value'])
+
+    if products_df.empty:
+        return
+    labels = dict(zip(
+        products_df['id'],
+        products_df['item_name'] + " (Code: " + products_df['item_code'].astype(str) + ")"
+    ))
+    product_id = st.selectbox("Movements for", list(labels), format_func=labels.get)
+    movements, next_cursor = get_stock_movements_page(conn, product_id, page_size=Config.PAGE_SIZE)
+    if movements.empty:
+        st.info("No stock movements recorded")
+        return
+    st.dataframe(
+        movements.drop(columns=['id']),
+        column_config={
+            "date": "Date",
+            "movement_type": "Type",
+            "quantity": "Change",
+            "balance_after": "Balance",
+            "invoice_number": "Invoice",
+            "notes": "Notes"
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    if next_cursor is not None:
+        st.caption(f"Showing the latest {Config.PAGE_SIZE} movements")
+
 if __name__ == "__main__":
     manage_items() 
\ No newline at end of file
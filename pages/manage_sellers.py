@@ -1,66 +1,60 @@
 import streamlit as st
 import pandas as pd
+import io
+import os
 from datetime import datetime
 from utils.db_manager import get_db_connection
-from utils.logger import setup_logger
+import logging
+from utils.ledger import (
+    SELLER_SORT_COLUMNS, get_seller_ledger_page, get_seller_ledger_totals, search_sellers,
+    get_seller_summary, get_seller_transactions_page, get_seller_invoices_page,
+    get_receivables_aging
+)
+import inventory_core
+from utils.profiler import stage
+from utils.invoice_codec import decode_invoice_items
+from utils.money import rupee_columns
+from utils.dates import format_date
+from utils.invoice_pdfs import get_invoice_pdf, render_stored_invoice, verify_pdf
+from utils.archive import unified_invoices
+from utils.pdf_generator import get_company_details
+from utils.statements import seller_statement, write_statement_pdf, write_statement_xlsx
+from config import Config
 import json
 import time
 
-logger = setup_logger()
+logger = logging.getLogger(__name__)
+
+AGING_LABELS = {
+    'days_0_30': "0-30 Days",
+    'days_31_60': "31-60 Days",
+    'days_61_90': "61-90 Days",
+    'days_over_90': "Over 90 Days",
+    'total_outstanding': "Total Outstanding"
+}
 
 def add_seller(conn, name, address, phone, gstin):
     try:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO sellers (name, address, phone, gstin)
-                VALUES (?, ?, ?, ?)
-            ''', (name, address, phone, gstin))
-            return True, "Seller added successfully!"
+        inventory_core.add_seller(conn, name, address, phone, gstin)
+        return True, "Seller added successfully!"
     except Exception as e:
         logger.error(f"Error adding seller: {e}")
         return False, f"Error: {str(e)}"
 
 def update_seller(conn, seller_id, name, address, phone, gstin):
     try:
-        with conn:
-            conn.execute('''
-                UPDATE sellers 
-                SET name = ?, address = ?, phone = ?, gstin = ?
-                WHERE id = ?
-            ''', (name, address, phone, gstin, seller_id))
-            return True, "Seller updated successfully!"
+        inventory_core.update_seller(conn, seller_id, name, address, phone, gstin)
+        return True, "Seller updated successfully!"
     except Exception as e:
         logger.error(f"Error updating seller: {e}")
         return False, f"Error: {str(e)}"
 
-def add_transaction(conn, seller_id, amount, transaction_type, notes, invoice_id=None, payment_date=None):
+def record_payment(conn, seller_id, amount, notes, payment_date=None):
     try:
-        with conn:
-            # Add transaction record
-            conn.execute('''
-                INSERT INTO seller_transactions 
-                (seller_id, invoice_id, amount, transaction_type, date, notes)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (seller_id, invoice_id, amount, transaction_type, 
-                 payment_date.strftime('%Y-%m-%d') if payment_date else datetime.now().strftime('%Y-%m-%d'),
-                 notes))
-            
-            # Update seller's total credit
-            if transaction_type == 'credit':
-                conn.execute('''
-                    UPDATE sellers 
-                    SET total_credit = total_credit + ?
-                    WHERE id = ?
-                ''', (amount, seller_id))
-            else:  # payment
-                conn.execute('''
-                    UPDATE sellers 
-                    SET total_credit = total_credit - ?
-                    WHERE id = ?
-                ''', (amount, seller_id))
-            
-            return True, "Transaction recorded successfully!"
+        inventory_core.record_payment(conn, seller_id, amount, notes, payment_date=payment_date)
+        return True, "Transaction recorded successfully!"
+    except inventory_core.InventoryError as e:
+        return False, str(e)
     except Exception as e:
         logger.error(f"Error recording transaction: {e}")
         return False, f"Error: {str(e)}"
@@ -81,34 +75,74 @@ def get_seller_history():
                 GROUP BY s.id
                 ORDER BY last_order_date DESC NULLS LAST, s.name ASC
             """, conn)
+            rupee_columns(df, ['total_credit', 'total_credit_amount', 'total_paid_amount'])
             
-            logger.info(f"Found {len(df)} sellers in history")
+            logger.debug(f"Found {len(df)} sellers in history")
             if not df.empty:
-                logger.info(f"Sample seller data: {df.iloc[0].to_dict()}")
+                logger.debug(f"Sample seller data: {df.iloc[0].to_dict()}")
             return df
     except Exception as e:
         logger.error(f"Error fetching seller history: {e}")
         return pd.DataFrame()
 
+def get_page_cursor(key, reset_token):
+    """Return the cursor for the current page of a paginated table.
+
+    Paging restarts from the first page whenever reset_token (the search,
+    sort and page size in effect) changes.
+    """
+    state = st.session_state.setdefault(f"{key}_pages", {'token': None, 'cursors': [None]})
+    if state['token'] != reset_token:
+        state['token'] = reset_token
+        state['cursors'] = [None]
+    return state['cursors'][-1]
+
+def pagination_controls(key, next_cursor):
+    """Previous/Next buttons for a table paginated with get_page_cursor"""
+    state = st.session_state[f"{key}_pages"]
+    page_number = len(state['cursors'])
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=page_number == 1):
+            state['cursors'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {page_number}")
+    with col3:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=next_cursor is None):
+            state['cursors'].append(next_cursor)
+            st.rerun()
+
 def manage_sellers():
     st.title("Manage Sellers")
     
+    page_size = st.sidebar.selectbox(
+        "Rows per page",
+        Config.PAGE_SIZE_OPTIONS,
+        index=Config.PAGE_SIZE_OPTIONS.index(Config.PAGE_SIZE),
+        help="Number of rows loaded per page in seller tables"
+    )
+    
     # Create tabs for different operations with icons
     tab1, tab2, tab3 = st.tabs(["👤 Add/Edit Sellers", "📋 View Sellers", "💰 Manage Credits"])
     
     with tab1:
         st.subheader("Add/Edit Seller")
         
-        # Get existing seller for editing if selected
-        with get_db_connection() as conn:
-            sellers_df = pd.read_sql_query("""
-                SELECT s.* 
-                FROM sellers s 
-                ORDER BY s.name
-            """, conn)
-        
         edit_mode = st.toggle("✏️ Edit Existing Seller")
         
+        # Get matching sellers for editing if selected
+        sellers_df = pd.DataFrame()
+        if edit_mode:
+            edit_search = st.text_input(
+                "🔍 Find Seller",
+                placeholder="Search by name, phone, or GSTIN...",
+                key="edit_seller_search"
+            )
+            with get_db_connection() as conn:
+                sellers_df = search_sellers(conn, edit_search, page_size)
+        
         if edit_mode and not sellers_df.empty:
             # Add phone number to distinguish duplicates
             selected_seller = st.selectbox(
@@ -187,138 +221,156 @@ def manage_sellers():
     with tab2:
         st.subheader("📊 View Sellers")
         
+        # Add search and sort controls
+        search_col, sort_col, order_col = st.columns([3, 2, 1])
+        with search_col:
+            search = st.text_input("🔍 Search Sellers", placeholder="Type to search by name, phone, or GSTIN...")
+        with sort_col:
+            sort = st.selectbox(
+                "Sort by",
+                list(SELLER_SORT_COLUMNS),
+                format_func=lambda x: x.replace('_', ' ').title()
+            )
+        with order_col:
+            descending = st.toggle("Descending")
+        
         with get_db_connection() as conn:
-            sellers_df = pd.read_sql_query("""
-                SELECT 
-                    s.*,
-                    COUNT(i.id) as total_invoices,
-                    COALESCE(SUM(i.total_amount), 0) as total_sales,
-                    MAX(i.date) as last_invoice_date,
-                    COALESCE(SUM(st.amount), 0) as total_payments
-                FROM sellers s
-                LEFT JOIN invoices i ON s.id = i.seller_id
-                LEFT JOIN seller_transactions st 
-                    ON s.id = st.seller_id 
-                    AND st.transaction_type = 'payment'
-                GROUP BY s.id
-                ORDER BY s.name
-            """, conn)
+            # Fetch only the current page; sorting and search run in SQLite
+            cursor = get_page_cursor("sellers", (search, sort, descending, page_size))
+            with stage("seller ledger page"):
+                sellers_df, next_cursor = get_seller_ledger_page(
+                    conn, search, sort, descending, cursor, page_size
+                )
             
             if not sellers_df.empty:
-                # Convert NaN to 0 for numeric columns
-                numeric_columns = ['total_invoices', 'total_sales', 'total_payments']
-                sellers_df[numeric_columns] = sellers_df[numeric_columns].fillna(0)
-                
                 # Ensure remaining credit is not negative
-                sellers_df['remaining_credit'] = sellers_df['total_credit'] - sellers_df['total_payments']
-                sellers_df['remaining_credit'] = sellers_df['remaining_credit'].apply(lambda x: max(0, x))
-                
-                # Add search functionality
-                search = st.text_input("🔍 Search Sellers", placeholder="Type to search by name, phone, or GSTIN...")
-                
-                if search:
-                    mask = (
-                        sellers_df['name'].str.contains(search, case=False, na=False) |
-                        sellers_df['phone'].str.contains(search, case=False, na=False) |
-                        sellers_df['gstin'].str.contains(search, case=False, na=False)
-                    )
-                    filtered_df = sellers_df[mask]
-                else:
-                    filtered_df = sellers_df
+                sellers_df['remaining_credit'] = sellers_df['remaining_credit'].clip(lower=0)
                 
-                if filtered_df.empty:
-                    st.info("ℹ️ No sellers match your search criteria.")
-                else:
-                    st.dataframe(
-                        filtered_df,
-                        column_config={
-                            "id": None,  # Hide ID column
-                            "name": st.column_config.TextColumn(
-                                "Name",
-                                width="medium",
-                                help="Seller's name"
-                            ),
-                            "address": st.column_config.TextColumn(
-                                "Address",
-                                width="large",
-                                help="Seller's address"
-                            ),
-                            "phone": st.column_config.TextColumn(
-                                "Phone",
-                                width="medium",
-                                help="Contact number"
-                            ),
-                            "gstin": "GSTIN",
-                            "total_invoices": st.column_config.NumberColumn(
-                                "Total Invoices",
-                                help="Total number of invoices",
-                                format="%d"
-                            ),
-                            "total_sales": st.column_config.NumberColumn(
-                                "Total Sales",
-                                format="₹%.2f",
-                                help="Total amount from all sales"
-                            ),
-                            "total_payments": st.column_config.NumberColumn(
-                                "Total Payments",
-                                format="₹%.2f",
-                                help="Total payments received"
-                            ),
-                            "remaining_credit": st.column_config.NumberColumn(
-                                "Remaining Credit",
-                                format="₹%.2f",
-                                help="Current outstanding credit"
-                            ),
-                            "last_invoice_date": st.column_config.DateColumn(
-                                "Last Invoice",
-                                format="DD-MM-YYYY",
-                                help="Date of last invoice"
-                            )
-                        },
-                        hide_index=True,
-                        use_container_width=True
-                    )
-                    
-                    # Add summary metrics
-                    st.markdown("### 📈 Summary")
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric(
-                            "Total Sellers",
-                            len(filtered_df),
-                            help="Number of sellers"
-                        )
-                    with col2:
-                        st.metric(
+                st.dataframe(
+                    sellers_df,
+                    column_config={
+                        "id": None,  # Hide ID column
+                        "name": st.column_config.TextColumn(
+                            "Name",
+                            width="medium",
+                            help="Seller's name"
+                        ),
+                        "address": st.column_config.TextColumn(
+                            "Address",
+                            width="large",
+                            help="Seller's address"
+                        ),
+                        "phone": st.column_config.TextColumn(
+                            "Phone",
+                            width="medium",
+                            help="Contact number"
+                        ),
+                        "gstin": "GSTIN",
+                        "total_invoices": st.column_config.NumberColumn(
+                            "Total Invoices",
+                            help="Total number of invoices",
+                            format="%d"
+                        ),
+                        "total_sales": st.column_config.NumberColumn(
                             "Total Sales",
-                            f"₹{filtered_df['total_sales'].sum():,.2f}",
-                            help="Sum of all sales"
-                        )
-                    with col3:
-                        st.metric(
+                            format="₹%.2f",
+                            help="Total amount from all sales"
+                        ),
+                        "total_payments": st.column_config.NumberColumn(
                             "Total Payments",
-                            f"₹{filtered_df['total_payments'].sum():,.2f}",
-                            help="Sum of all payments"
-                        )
-                    with col4:
-                        st.metric(
-                            "Total Outstanding",
-                            f"₹{filtered_df['remaining_credit'].sum():,.2f}",
-                            help="Total pending credits"
+                            format="₹%.2f",
+                            help="Total payments received"
+                        ),
+                        "remaining_credit": st.column_config.NumberColumn(
+                            "Remaining Credit",
+                            format="₹%.2f",
+                            help="Current outstanding credit"
+                        ),
+                        "last_invoice_date": st.column_config.DateColumn(
+                            "Last Invoice",
+                            format="DD-MM-YYYY",
+                            help="Date of last invoice"
                         )
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                pagination_controls("sellers", next_cursor)
+                
+                # Add summary metrics across all matching sellers
+                with stage("seller ledger totals"):
+                    totals = get_seller_ledger_totals(conn, search)
+                st.markdown("### 📈 Summary")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric(
+                        "Total Sellers",
+                        totals['total_sellers'],
+                        help="Number of sellers"
+                    )
+                with col2:
+                    st.metric(
+                        "Total Sales",
+                        f"₹{totals['total_sales']:,.2f}",
+                        help="Sum of all sales"
+                    )
+                with col3:
+                    st.metric(
+                        "Total Payments",
+                        f"₹{totals['total_payments']:,.2f}",
+                        help="Sum of all payments"
+                    )
+                with col4:
+                    st.metric(
+                        "Total Outstanding",
+                        f"₹{totals['total_outstanding']:,.2f}",
+                        help="Total pending credits"
+                    )
+            elif search:
+                st.info("ℹ️ No sellers match your search criteria.")
             else:
                 st.info("ℹ️ No sellers found. Add sellers using the Add/Edit Sellers tab.")
     
     with tab3:
         st.subheader("💰 Manage Credits")
+
+        # Outstanding credit of all sellers by age, from the FIFO payment allocations
+        with st.expander("📊 Receivables Aging"):
+            aging_date = st.date_input("As of", value=datetime.now().date(), key="aging_as_of")
+            with get_db_connection() as conn:
+                aging_df = get_receivables_aging(conn, aging_date)
+            if aging_df.empty:
+                st.info("No outstanding credit")
+            else:
+                bucket_cols = st.columns(5)
+                for col, (column, label) in zip(bucket_cols, AGING_LABELS.items()):
+                    with col:
+                        st.metric(label, f"₹{aging_df[column].sum():,.2f}")
+                aging_df['oldest_open_date'] = aging_df['oldest_open_date'].map(format_date)
+                st.dataframe(
+                    aging_df.drop(columns=['seller_id']),
+                    column_config={
+                        "name": "Seller",
+                        "phone": "Phone",
+                        **{
+                            column: st.column_config.NumberColumn(label, format="₹%.2f")
+                            for column, label in AGING_LABELS.items()
+                        },
+                        "oldest_open_date": "Oldest Open Sale"
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+
+        credit_search = st.text_input(
+            "🔍 Find Seller",
+            placeholder="Search by name, phone, or GSTIN...",
+            key="credit_seller_search"
+        )
         
         with get_db_connection() as conn:
-            # Get seller list
-            sellers_df = pd.read_sql_query("""
-                SELECT id, name, phone 
-                FROM sellers 
-                ORDER BY name
-            """, conn)
+            # Get matching sellers, one page at most
+            sellers_df = search_sellers(conn, credit_search, page_size)
             
             if not sellers_df.empty:
                 # Create seller selection dropdown
@@ -334,42 +386,10 @@ def manage_sellers():
                     format_func=lambda i: f"{seller_options[i][1]} ({seller_options[i][2]})"
                 )
                 
-                selected_seller_id = seller_options[selected_seller_index][0]
+                selected_seller_id = int(seller_options[selected_seller_index][0])
                 
                 # Get seller summary
-                summary_query = """
-                    WITH invoice_summary AS (
-                        SELECT 
-                            seller_id,
-                            COUNT(id) as total_invoices,
-                            SUM(total_amount) as total_sales,
-                            SUM(CASE WHEN payment_status = 'credit' THEN total_amount ELSE 0 END) as total_credit_sales,
-                            SUM(CASE WHEN payment_status = 'paid' THEN total_amount ELSE 0 END) as total_paid_sales
-                        FROM invoices
-                        GROUP BY seller_id
-                    ),
-                    payment_summary AS (
-                        SELECT 
-                            seller_id,
-                            SUM(CASE WHEN transaction_type = 'payment' THEN amount ELSE 0 END) as total_payments
-                        FROM seller_transactions
-                        GROUP BY seller_id
-                    )
-                    SELECT 
-                        s.*,
-                        COALESCE(i.total_invoices, 0) as total_invoices,
-                        COALESCE(i.total_sales, 0) as total_sales,
-                        COALESCE(i.total_credit_sales, 0) as total_credit_sales,
-                        COALESCE(i.total_paid_sales, 0) as total_paid_sales,
-                        COALESCE(p.total_payments, 0) as total_payments,
-                        COALESCE(i.total_credit_sales, 0) - COALESCE(p.total_payments, 0) as pending_amount
-                    FROM sellers s
-                    LEFT JOIN invoice_summary i ON s.id = i.seller_id
-                    LEFT JOIN payment_summary p ON s.id = p.seller_id
-                    WHERE s.id = ?
-                    GROUP BY s.id
-                """
-                seller_summary = pd.read_sql_query(summary_query, conn, params=(selected_seller_id,))
+                seller_summary = get_seller_summary(conn, selected_seller_id)
                 
                 if not seller_summary.empty:
                     # Display seller info
@@ -443,45 +463,81 @@ def manage_sellers():
                         submitted = st.form_submit_button("Record Payment")
                         
                         if submitted:
-                            if amount <= 0:
-                                st.error("Payment amount must be greater than 0")
-                            elif amount > pending_amount:
-                                st.error(f"Payment amount cannot exceed pending amount (₹{pending_amount:.2f})")
+                            success, message = record_payment(
+                                conn, 
+                                selected_seller_id, 
+                                amount, 
+                                notes,
+                                payment_date=payment_date
+                            )
+                            if success:
+                                st.success(message)
+                                st.rerun()
                             else:
-                                success, message = add_transaction(
-                                    conn, 
-                                    selected_seller_id, 
-                                    amount, 
-                                    'payment', 
-                                    notes,
-                                    payment_date=payment_date
+                                st.error(message)
+                    
+                    # Account statement for a period, as PDF and XLSX
+                    with st.expander("📄 Account Statement"):
+                        with st.form("statement_form"):
+                            today = datetime.now().date()
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                statement_from = st.date_input("From", value=today.replace(day=1))
+                            with col2:
+                                statement_to = st.date_input("To", value=today)
+                            create_statement = st.form_submit_button("Create Statement")
+                        
+                        if create_statement:
+                            try:
+                                statement = seller_statement(conn, selected_seller_id, statement_from, statement_to)
+                                pdf_buffer, xlsx_buffer = io.BytesIO(), io.BytesIO()
+                                write_statement_pdf(pdf_buffer, statement, get_company_details(conn))
+                                write_statement_xlsx(xlsx_buffer, statement)
+                                # Kept across the rerun a download button click causes
+                                st.session_state.statement_files = (
+                                    selected_seller_id, statement['start'], statement['end'],
+                                    pdf_buffer.getvalue(), xlsx_buffer.getvalue()
                                 )
-                                if success:
-                                    st.success(message)
-                                    st.rerun()
-                                else:
-                                    st.error(message)
+                            except Exception as e:
+                                logger.error(f"Error creating statement: {e}")
+                                st.error(f"Error creating statement: {e}")
+                        
+                        statement_files = st.session_state.get('statement_files')
+                        if statement_files and statement_files[0] == selected_seller_id:
+                            _, start, end, pdf_bytes, xlsx_bytes = statement_files
+                            file_name = f"statement-{selected_seller_id}-{start}-{end}"
+                            st.caption(f"Statement for {format_date(start)} to {format_date(end)}")
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                st.download_button("Download PDF", pdf_bytes, file_name=f"{file_name}.pdf",
+                                                   mime="application/pdf")
+                            with col2:
+                                st.download_button(
+                                    "Download Excel", xlsx_bytes, file_name=f"{file_name}.xlsx",
+                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                                )
+                    
+                    # Date range applied to both the payment history and the invoices
+                    range_col1, range_col2 = st.columns(2)
+                    with range_col1:
+                        history_from = st.date_input("History from", value=None, key="history_from")
+                    with range_col2:
+                        history_to = st.date_input("History to", value=None, key="history_to")
                     
                     # Show transactions history
                     st.write("### Payment History")
-                    transactions_df = pd.read_sql_query("""
-                        SELECT 
-                            t.date,
-                            t.amount,
-                            t.transaction_type,
-                            t.notes,
-                            i.invoice_number,
-                            i.total_amount as invoice_amount
-                        FROM seller_transactions t
-                        LEFT JOIN invoices i ON t.invoice_id = i.id
-                        WHERE t.seller_id = ?
-                        ORDER BY t.date DESC, t.id DESC
-                    """, conn, params=(selected_seller_id,))
+                    cursor = get_page_cursor(
+                        "transactions", (selected_seller_id, page_size, history_from, history_to)
+                    )
+                    transactions_df, next_cursor = get_seller_transactions_page(
+                        conn, selected_seller_id, cursor, page_size, history_from, history_to
+                    )
                     
                     if not transactions_df.empty:
                         st.dataframe(
                             transactions_df,
                             column_config={
+                                "id": None,
                                 "date": st.column_config.DateColumn("Date", format="DD-MM-YYYY"),
                                 "amount": st.column_config.NumberColumn("Amount", format="₹%.2f"),
                                 "transaction_type": "Type",
@@ -492,27 +548,18 @@ def manage_sellers():
                             hide_index=True,
                             use_container_width=True
                         )
+                        pagination_controls("transactions", next_cursor)
                     else:
                         st.info("No transaction history found")
                     
                     # Show invoices
                     st.write("### Invoices")
-                    invoices_df = pd.read_sql_query("""
-                        SELECT 
-                            i.invoice_number,
-                            i.total_amount,
-                            i.payment_status,
-                            i.date,
-                            COALESCE((
-                                SELECT SUM(amount) 
-                                FROM seller_transactions 
-                                WHERE invoice_id = i.id 
-                                AND transaction_type = 'payment'
-                            ), 0) as paid_amount
-                        FROM invoices i
-                        WHERE i.seller_id = ?
-                        ORDER BY i.date DESC, i.id DESC
-                    """, conn, params=(selected_seller_id,))
+                    cursor = get_page_cursor(
+                        "seller_invoices", (selected_seller_id, page_size, history_from, history_to)
+                    )
+                    invoices_df, next_cursor = get_seller_invoices_page(
+                        conn, selected_seller_id, cursor, page_size, history_from, history_to
+                    )
                     
                     if not invoices_df.empty:
                         # Calculate balance
@@ -520,6 +567,7 @@ def manage_sellers():
                         st.dataframe(
                             invoices_df,
                             column_config={
+                                "id": None,
                                 "invoice_number": "Invoice #",
                                 "total_amount": st.column_config.NumberColumn("Amount", format="₹%.2f"),
                                 "payment_status": "Status",
@@ -530,6 +578,7 @@ def manage_sellers():
                             hide_index=True,
                             use_container_width=True
                         )
+                        pagination_controls("seller_invoices", next_cursor)
                     else:
                         st.info("No invoices found")
                     
@@ -542,19 +591,17 @@ def manage_sellers():
                     )
                     
                     if invoice_number:
-                        invoice_details = pd.read_sql_query("""
-                            SELECT 
-                                i.*,
-                                COALESCE((
-                                    SELECT SUM(amount) 
-                                    FROM seller_transactions 
-                                    WHERE invoice_id = i.id 
-                                    AND transaction_type = 'payment'
-                                ), 0) as paid_amount,
-                                json_extract(i.invoice_data, '$') as items_data
-                            FROM invoices i
-                            WHERE i.invoice_number = ? AND i.seller_id = ?
-                        """, conn, params=(invoice_number, selected_seller_id))
+                        # Invoices of closed years are looked up in the archive too
+                        with unified_invoices(conn):
+                            invoice_details = pd.read_sql_query("""
+                                SELECT 
+                                    i.*,
+                                    COALESCE(b.paid_amount, 0) as paid_amount
+                                FROM all_invoices i
+                                LEFT JOIN invoice_balances b ON i.id = b.invoice_id
+                                WHERE i.invoice_number = ? AND i.seller_id = ?
+                            """, conn, params=(invoice_number, selected_seller_id))
+                        rupee_columns(invoice_details, ['total_amount', 'paid_amount'])
                         
                         if not invoice_details.empty:
                             invoice = invoice_details.iloc[0]
@@ -565,7 +612,7 @@ def manage_sellers():
                             
                             with col1:
                                 st.write(f"**Invoice Number:** {invoice['invoice_number']}")
-                                st.write(f"**Date:** {pd.to_datetime(invoice['date']).strftime('%d-%m-%Y')}")
+                                st.write(f"**Date:** {format_date(invoice['date'])}")
                                 st.write(f"**Status:** {invoice['payment_status']}")
                             
                             with col2:
@@ -574,11 +621,41 @@ def manage_sellers():
                                 balance = float(invoice['total_amount']) - float(invoice['paid_amount'])
                                 st.write(f"**Balance:** ₹{balance:.2f}")
                             
+                            # Reprints read the PDF stored when the invoice was saved
+                            if invoice['archived']:
+                                pdf_path, pdf_sha256 = invoice['pdf_path'], invoice['pdf_sha256']
+                                stored_pdf = None
+                                if pdf_path and os.path.exists(pdf_path):
+                                    # Archived before hashes were kept: nothing to verify against
+                                    if pd.isna(pdf_sha256) or verify_pdf(pdf_path, pdf_sha256):
+                                        stored_pdf = (pdf_path, pdf_sha256)
+                                    else:
+                                        logger.warning(f"Stored PDF {pdf_path} of archived invoice "
+                                                       f"{invoice['id']} does not match its hash")
+                            else:
+                                stored_pdf = get_invoice_pdf(conn, invoice['id'])
+                            if stored_pdf:
+                                with open(stored_pdf[0], 'rb') as pdf_file:
+                                    st.download_button(
+                                        "Download PDF",
+                                        pdf_file,
+                                        file_name=f"{invoice['invoice_number']}.pdf",
+                                        mime="application/pdf"
+                                    )
+                            elif invoice['archived']:
+                                st.info("This invoice is archived and has no stored PDF")
+                            elif st.button("Create PDF", help="No stored PDF yet; render it from the saved items"):
+                                try:
+                                    render_stored_invoice(conn, invoice['id'])
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"Error creating PDF: {e}")
+                            
                             # Display invoice items
-                            if invoice['items_data']:
+                            if invoice['invoice_data'] is not None:
                                 st.write("#### Items")
                                 try:
-                                    items_df = pd.read_json(invoice['items_data'])
+                                    items_df = pd.DataFrame(decode_invoice_items(invoice['invoice_data']))
                                     st.dataframe(
                                         items_df,
                                         column_config={
@@ -608,6 +685,7 @@ def manage_sellers():
                                 WHERE t.invoice_id = ?
                                 ORDER BY t.date DESC
                             """, conn, params=(invoice['id'],))
+                            rupee_columns(transactions, ['amount'])
                             
                             if not transactions.empty:
                                 st.write("#### Related Transactions")
@@ -623,6 +701,8 @@ def manage_sellers():
                                 )
                         else:
                             st.warning("Invoice not found")
+            elif credit_search:
+                st.info("No sellers match your search criteria.")
             else:
                 st.info("No sellers found. Add sellers using the Add/Edit Sellers tab.")
 
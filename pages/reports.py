@@ -1,50 +1,101 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import ast
-import re
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-
-def preprocess_invoice_data(invoice_data):
-    return re.sub(r'\bnan\b', 'None', invoice_data)
+from utils import analytics_snapshot
+from utils.analytics_snapshot import load_report_data
+from utils.db_manager import connect
+from utils.money import rupee_columns
+from utils.profiler import stage
 
 def calculate_growth(current, previous):
     if previous == 0:
         return 0
     return ((current - previous) / previous) * 100
 
-def reports():
-    st.title("Business Analytics Dashboard")
+def daily_sales_trend(filtered_invoices):
+    """Daily revenue and order counts with 7-day moving averages"""
+    daily_sales = filtered_invoices.groupby(filtered_invoices['date'].dt.date).agg({
+        'total_amount': 'sum',
+        'id': 'count'
+    }).reset_index()
     
-    # Initialize database connection
-    conn = sqlite3.connect('inventory.db')
+    # Calculate 7-day moving averages
+    daily_sales['revenue_ma'] = daily_sales['total_amount'].rolling(7).mean()
+    daily_sales['orders_ma'] = daily_sales['id'].rolling(7).mean()
+    return daily_sales
 
-    # Fetch all required data
-    df_invoices = pd.read_sql_query("""
-        SELECT 
-            i.*,
-            s.name as customer_name,
-            s.total_credit as current_credit
-        FROM invoices i
-        LEFT JOIN sellers s ON i.seller_id = s.id
-        ORDER BY i.date DESC
-    """, conn)
-    df_invoices['date'] = pd.to_datetime(df_invoices['date'])
+def top_products(df_items, by, n=10):
+    """Top n products by total_amount or quantity, in ascending order for bar charts"""
+    product_totals = df_items.groupby('item_name').agg({
+        'total_amount': 'sum',
+        'quantity': 'sum'
+    }).reset_index()
+    return product_totals.sort_values(by, ascending=True).tail(n)
 
-    # Process invoice items
-    all_items = []
-    for invoice_data in df_invoices['invoice_data']:
-        try:
-            preprocessed_data = preprocess_invoice_data(invoice_data)
-            items_df = pd.read_json(preprocessed_data)
-            all_items.extend(items_df.to_dict('records'))
-        except (ValueError, SyntaxError) as e:
-            continue
+def create_scores(series, reverse=False):
+    """Quantile scores handling duplicate values"""
+    if len(series.unique()) < 5:
+        # If we have less than 5 unique values, use quantile-based scoring
+        if len(series.unique()) == 1:
+            # If all values are the same, assign middle score
+            return pd.Series([3] * len(series))
+        else:
+            # Use as many quantiles as unique values
+            labels = range(1, len(series.unique()) + 1)
+            if reverse:
+                labels = list(reversed(labels))
+            return pd.qcut(series, q=len(series.unique()), labels=labels, duplicates='drop')
+    else:
+        # If we have 5 or more unique values, proceed with quintiles
+        labels = range(1, 6)
+        if reverse:
+            labels = list(reversed(labels))
+        return pd.qcut(series, q=5, labels=labels, duplicates='drop')
 
-    df_items = pd.DataFrame(all_items) if all_items else pd.DataFrame()
+def segment_customers(row):
+    avg_score = (row['r_score'] + row['f_score'] + row['m_score']) / 3
+    if avg_score >= 4:
+        return 'Champions'
+    elif avg_score >= 3:
+        return 'Loyal Customers'
+    elif avg_score >= 2:
+        return 'Regular Customers'
+    else:
+        return 'New/Inactive Customers'
+
+def rfm_metrics(filtered_invoices, current_date):
+    """Recency, frequency and monetary value per customer"""
+    rfm = filtered_invoices.groupby('customer_name').agg({
+        'date': lambda x: (current_date - x.max()).days,  # Recency
+        'id': 'count',  # Frequency
+        'total_amount': 'sum'  # Monetary
+    }).reset_index()
+    
+    rfm.columns = ['customer_name', 'recency', 'frequency', 'monetary']
+    return rfm
+
+def score_rfm(rfm):
+    """Score RFM metrics and assign customer segments"""
+    rfm['r_score'] = create_scores(rfm['recency'], reverse=True)  # Higher score for lower recency
+    rfm['f_score'] = create_scores(rfm['frequency'])  # Higher score for higher frequency
+    rfm['m_score'] = create_scores(rfm['monetary'])   # Higher score for higher monetary value
+    
+    # Calculate RFM Score
+    rfm['r_score'] = rfm['r_score'].astype(int)
+    rfm['f_score'] = rfm['f_score'].astype(int)
+    rfm['m_score'] = rfm['m_score'].astype(int)
+    
+    rfm['customer_segment'] = rfm.apply(segment_customers, axis=1)
+    return rfm
+
+def reports():
+    st.title("Business Analytics Dashboard")
+    
+    # Initialize database connection
+    conn = connect()
 
     # Time period selection
     st.sidebar.header("📅 Time Period")
@@ -54,22 +105,53 @@ def reports():
         index=1
     )
 
+    period_days = {
+        "Last 7 Days": 7,
+        "Last 30 Days": 30,
+        "Last 90 Days": 90,
+        "Last 365 Days": 365
+    }
+
     end_date = datetime.now()
-    if date_filter == "Last 7 Days":
-        start_date = end_date - timedelta(days=7)
-    elif date_filter == "Last 30 Days":
-        start_date = end_date - timedelta(days=30)
-    elif date_filter == "Last 90 Days":
-        start_date = end_date - timedelta(days=90)
-    elif date_filter == "Last 365 Days":
-        start_date = end_date - timedelta(days=365)
+    if date_filter in period_days:
+        start_date = end_date - timedelta(days=period_days[date_filter])
+        # Load the current and the previous period only
+        load_from = (start_date - (end_date - start_date)).strftime('%Y-%m')
     else:
+        load_from = None
+
+    # The snapshot is refreshed by the nightly job or on request, never per view
+    if analytics_snapshot.is_available():
+        refreshed_at = analytics_snapshot.snapshot_time()
+        pending = analytics_snapshot.pending_changes()
+        if refreshed_at is None or pending:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                if refreshed_at is None:
+                    st.caption("No analytics snapshot yet; reading invoices directly.")
+                else:
+                    st.caption(f"Snapshot from {refreshed_at}; {pending} month(s) changed since.")
+            with col2:
+                if st.button("Refresh snapshot"):
+                    with stage("refresh snapshot"), st.spinner("Refreshing snapshot..."):
+                        analytics_snapshot.refresh_snapshot()
+                    st.rerun()
+
+    # Fetch all required data (month partitions from the analytics snapshot)
+    with stage("load data"):
+        df_invoices, df_items = load_report_data(start_month=load_from)
+
+    if date_filter not in period_days:
         start_date = df_invoices['date'].min()
 
     filtered_invoices = df_invoices[
         (df_invoices['date'] >= start_date) & 
         (df_invoices['date'] <= end_date)
     ]
+    filtered_items = df_items[
+        (df_items['date'] >= start_date) &
+        (df_items['date'] <= end_date)
+    ]
 
     # 1. Executive Summary
     st.header("📊 Executive Summary")
@@ -133,14 +215,7 @@ def reports():
     
     with tab1:
         # Daily sales trend with moving average
-        daily_sales = filtered_invoices.groupby(filtered_invoices['date'].dt.date).agg({
-            'total_amount': 'sum',
-            'id': 'count'
-        }).reset_index()
-        
-        # Calculate 7-day moving averages
-        daily_sales['revenue_ma'] = daily_sales['total_amount'].rolling(7).mean()
-        daily_sales['orders_ma'] = daily_sales['id'].rolling(7).mean()
+        daily_sales = daily_sales_trend(filtered_invoices)
         
         fig = make_subplots(specs=[[{"secondary_y": True}]])
         
@@ -193,17 +268,12 @@ def reports():
         st.plotly_chart(fig, use_container_width=True)
 
     with tab2:
-        if not df_items.empty:
+        if not filtered_items.empty:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Top products by revenue
-                product_revenue = df_items.groupby('item_name').agg({
-                    'total_amount': 'sum',
-                    'quantity': 'sum'
-                }).reset_index()
-                
-                product_revenue = product_revenue.sort_values('total_amount', ascending=True).tail(10)
+                product_revenue = top_products(filtered_items, 'total_amount')
                 
                 fig = go.Figure(go.Bar(
                     x=product_revenue['total_amount'],
@@ -224,12 +294,7 @@ def reports():
             
             with col2:
                 # Top products by quantity
-                product_quantity = df_items.groupby('item_name').agg({
-                    'quantity': 'sum',
-                    'total_amount': 'sum'
-                }).reset_index()
-                
-                product_quantity = product_quantity.sort_values('quantity', ascending=True).tail(10)
+                product_quantity = top_products(filtered_items, 'quantity')
                 
                 fig = go.Figure(go.Bar(
                     x=product_quantity['quantity'],
@@ -256,59 +321,11 @@ def reports():
         st.subheader("Customer Segmentation (RFM Analysis)")
         
         # Calculate RFM metrics
-        current_date = datetime.now()
-        rfm = filtered_invoices.groupby('customer_name').agg({
-            'date': lambda x: (current_date - x.max()).days,  # Recency
-            'id': 'count',  # Frequency
-            'total_amount': 'sum'  # Monetary
-        }).reset_index()
-        
-        rfm.columns = ['customer_name', 'recency', 'frequency', 'monetary']
-        
-        # Function to create scores handling duplicates
-        def create_scores(series, reverse=False):
-            if len(series.unique()) < 5:
-                # If we have less than 5 unique values, use quantile-based scoring
-                if len(series.unique()) == 1:
-                    # If all values are the same, assign middle score
-                    return pd.Series([3] * len(series))
-                else:
-                    # Use as many quantiles as unique values
-                    labels = range(1, len(series.unique()) + 1)
-                    if reverse:
-                        labels = list(reversed(labels))
-                    return pd.qcut(series, q=len(series.unique()), labels=labels, duplicates='drop')
-            else:
-                # If we have 5 or more unique values, proceed with quintiles
-                labels = range(1, 6)
-                if reverse:
-                    labels = list(reversed(labels))
-                return pd.qcut(series, q=5, labels=labels, duplicates='drop')
+        rfm = rfm_metrics(filtered_invoices, datetime.now())
         
         # Score RFM metrics
         try:
-            rfm['r_score'] = create_scores(rfm['recency'], reverse=True)  # Higher score for lower recency
-            rfm['f_score'] = create_scores(rfm['frequency'])  # Higher score for higher frequency
-            rfm['m_score'] = create_scores(rfm['monetary'])   # Higher score for higher monetary value
-            
-            # Calculate RFM Score
-            rfm['r_score'] = rfm['r_score'].astype(int)
-            rfm['f_score'] = rfm['f_score'].astype(int)
-            rfm['m_score'] = rfm['m_score'].astype(int)
-            
-            # Segment customers with adjusted logic
-            def segment_customers(row):
-                avg_score = (row['r_score'] + row['f_score'] + row['m_score']) / 3
-                if avg_score >= 4:
-                    return 'Champions'
-                elif avg_score >= 3:
-                    return 'Loyal Customers'
-                elif avg_score >= 2:
-                    return 'Regular Customers'
-                else:
-                    return 'New/Inactive Customers'
-            
-            rfm['customer_segment'] = rfm.apply(segment_customers, axis=1)
+            rfm = score_rfm(rfm)
             
             # Display segments
             segment_counts = rfm['customer_segment'].value_counts()
@@ -416,10 +433,12 @@ def reports():
     st.header("📦 Inventory Insights")
     
     # Fetch current inventory
-    inventory_df = pd.read_sql_query("""
-        SELECT * FROM products
-        WHERE quantity > 0
-    """, conn)
+    with stage("load inventory"):
+        inventory_df = pd.read_sql_query("""
+            SELECT * FROM products
+            WHERE quantity > 0
+        """, conn)
+        rupee_columns(inventory_df, ['buying_price', 'selling_price'])
     
     if not inventory_df.empty:
         col1, col2 = st.columns(2)
@@ -75,12 +75,13 @@ CREATE TABLE IF NOT EXISTS company_details (
     updated_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
 
--- Insert default company details if not exists
+-- Insert default company details if not exists (the app reads row id 1)
 INSERT OR IGNORE INTO company_details (
-    name, address, city, state, state_code, gstin, 
+    id, name, address, city, state, state_code, gstin, 
     phone, email, bank_name, bank_account, bank_ifsc, 
     bank_branch, jurisdiction
 ) VALUES (
+    1,
     'GANANATH ENTERPRISES',
     'New Colony',
     'Rayagada',
@@ -103,8 +104,79 @@ CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices(invoice_number);
 CREATE INDEX IF NOT EXISTS idx_invoices_seller ON invoices(seller_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_seller ON seller_transactions(seller_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_invoice ON seller_transactions(invoice_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_seller_type ON seller_transactions(seller_id, transaction_type);
 
--- Add trigger for credit updates
+-- Pre-aggregated per-seller ledger figures, maintained by the triggers below
+CREATE TABLE IF NOT EXISTS seller_balances (
+    seller_id INTEGER PRIMARY KEY,
+    total_invoices INTEGER NOT NULL DEFAULT 0,
+    total_sales REAL NOT NULL DEFAULT 0,
+    credit_sales REAL NOT NULL DEFAULT 0,
+    paid_sales REAL NOT NULL DEFAULT 0,
+    total_payments REAL NOT NULL DEFAULT 0,
+    last_invoice_date TEXT
+);
+
+-- Pre-aggregated per-invoice payments, maintained by the triggers below
+CREATE TABLE IF NOT EXISTS invoice_balances (
+    invoice_id INTEGER PRIMARY KEY,
+    seller_id INTEGER,
+    total_amount REAL NOT NULL DEFAULT 0,
+    paid_amount REAL NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_invoice_balances_seller ON invoice_balances(seller_id);
+
+-- Backfill the balance tables once, when they are first created
+INSERT INTO seller_balances (
+    seller_id, total_invoices, total_sales, credit_sales, paid_sales,
+    total_payments, last_invoice_date
+)
+SELECT
+    s.id,
+    COALESCE(i.total_invoices, 0),
+    COALESCE(i.total_sales, 0),
+    COALESCE(i.credit_sales, 0),
+    COALESCE(i.paid_sales, 0),
+    COALESCE(p.total_payments, 0),
+    i.last_invoice_date
+FROM sellers s
+LEFT JOIN (
+    SELECT
+        seller_id,
+        COUNT(*) as total_invoices,
+        SUM(total_amount) as total_sales,
+        SUM(CASE WHEN payment_status = 'credit' THEN total_amount ELSE 0 END) as credit_sales,
+        SUM(CASE WHEN payment_status = 'paid' THEN total_amount ELSE 0 END) as paid_sales,
+        MAX(date) as last_invoice_date
+    FROM invoices
+    GROUP BY seller_id
+) i ON s.id = i.seller_id
+LEFT JOIN (
+    SELECT seller_id, SUM(amount) as total_payments
+    FROM seller_transactions
+    WHERE transaction_type = 'payment'
+    GROUP BY seller_id
+) p ON s.id = p.seller_id
+WHERE NOT EXISTS (SELECT 1 FROM seller_balances);
+
+INSERT INTO invoice_balances (invoice_id, seller_id, total_amount, paid_amount)
+SELECT
+    i.id,
+    i.seller_id,
+    COALESCE(i.total_amount, 0),
+    COALESCE(p.paid_amount, 0)
+FROM invoices i
+LEFT JOIN (
+    SELECT invoice_id, SUM(amount) as paid_amount
+    FROM seller_transactions
+    WHERE transaction_type = 'payment' AND invoice_id IS NOT NULL
+    GROUP BY invoice_id
+) p ON i.id = p.invoice_id
+WHERE NOT EXISTS (SELECT 1 FROM invoice_balances);
+
+-- Add trigger for credit updates. This is the only writer of
+-- sellers.total_credit; the ledger below is the source of truth
 CREATE TRIGGER IF NOT EXISTS update_seller_credit
 AFTER INSERT ON seller_transactions
 BEGIN
@@ -116,4 +188,58 @@ BEGIN
         END,
         updated_at = CURRENT_TIMESTAMP
     WHERE id = NEW.seller_id;
-END; 
\ No newline at end of file
+END;
+
+-- Keep the pre-aggregated balance tables in step with new rows
+CREATE TRIGGER IF NOT EXISTS seller_balances_on_seller_insert
+AFTER INSERT ON sellers
+BEGIN
+    INSERT OR IGNORE INTO seller_balances (seller_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS seller_balances_on_invoice_insert
+AFTER INSERT ON invoices
+BEGIN
+    INSERT OR IGNORE INTO seller_balances (seller_id) VALUES (NEW.seller_id);
+    UPDATE seller_balances
+    SET total_invoices = total_invoices + 1,
+        total_sales = total_sales + COALESCE(NEW.total_amount, 0),
+        credit_sales = credit_sales +
+            CASE WHEN NEW.payment_status = 'credit' THEN COALESCE(NEW.total_amount, 0) ELSE 0 END,
+        paid_sales = paid_sales +
+            CASE WHEN NEW.payment_status = 'paid' THEN COALESCE(NEW.total_amount, 0) ELSE 0 END,
+        last_invoice_date =
+            CASE WHEN last_invoice_date IS NULL OR NEW.date > last_invoice_date
+                THEN NEW.date
+                ELSE last_invoice_date
+            END
+    WHERE seller_id = NEW.seller_id;
+    INSERT OR REPLACE INTO invoice_balances (invoice_id, seller_id, total_amount, paid_amount)
+    VALUES (NEW.id, NEW.seller_id, COALESCE(NEW.total_amount, 0), 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS seller_balances_on_payment_insert
+AFTER INSERT ON seller_transactions
+WHEN NEW.transaction_type = 'payment'
+BEGIN
+    INSERT OR IGNORE INTO seller_balances (seller_id) VALUES (NEW.seller_id);
+    UPDATE seller_balances
+    SET total_payments = total_payments + NEW.amount
+    WHERE seller_id = NEW.seller_id;
+    UPDATE invoice_balances
+    SET paid_amount = paid_amount + NEW.amount
+    WHERE invoice_id = NEW.invoice_id;
+END;
+
+-- The seller ledger is append-only; corrections are recorded as new entries
+CREATE TRIGGER IF NOT EXISTS seller_transactions_no_update
+BEFORE UPDATE ON seller_transactions
+BEGIN
+    SELECT RAISE(ABORT, 'seller_transactions is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS seller_transactions_no_delete
+BEFORE DELETE ON seller_transactions
+BEGIN
+    SELECT RAISE(ABORT, 'seller_transactions is append-only');
+END;
@@ -0,0 +1,36 @@
+from datetime import date, datetime
+import pytest
+
+from utils.dates import to_iso_date, month_bounds, format_date
+
+@pytest.mark.parametrize("value", [
+    '2024-03-31',
+    '2024/03/31',
+    '31-03-2024',
+    '31/03/2024',
+    '31.03.2024',
+    ' 2024-03-31 ',
+    '2024-03-31 10:15:00',
+    '2024-03-31T10:15:00',
+    date(2024, 3, 31),
+    datetime(2024, 3, 31, 23, 59),
+])
+def test_to_iso_date(value):
+    assert to_iso_date(value) == '2024-03-31'
+
+def test_to_iso_date_keeps_none():
+    assert to_iso_date(None) is None
+
+@pytest.mark.parametrize("value", ['', '31 March 2024', '2024-02-30', 'nan'])
+def test_to_iso_date_rejects_unreadable(value):
+    with pytest.raises(ValueError):
+        to_iso_date(value)
+
+def test_month_bounds():
+    assert month_bounds('2024-02') == ('2024-02-01', '2024-03-01')
+    assert month_bounds('2023-12') == ('2023-12-01', '2024-01-01')
+
+def test_format_date():
+    assert format_date('2024-03-31') == '31-03-2024'
+    assert format_date(None) == ''
+    assert format_date('unknown') == 'unknown'
@@ -0,0 +1,69 @@
+import math
+import zlib
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils.money import to_paise
+from utils.invoice_codec import (
+    COLUMNS, MONEY_COLUMNS, MAGIC, FORMAT_VERSION, PayloadError, encode_invoice_items, decode_invoice_items, is_current
+)
+
+ITEMS = [
+    {'item_name': 'Steel Bolt M8', 'item_code': 'SB-08', 'quantity': 3.0, 'price': 99.99,
+     'discount_percentage': 5.0, 'discount_amount': 15.0, 'gst_percentage': 18.0,
+     'gst_amount': 51.3, 'total_amount': 336.27},
+    {'item_name': 'Würth Ölfilter – 2L', 'item_code': '', 'quantity': 1.5, 'price': 2.675,
+     'discount_percentage': float('nan'), 'discount_amount': None, 'gst_percentage': 12.0,
+     'gst_amount': 0.48, 'total_amount': 4.49},
+]
+
+def _same(decoded, expected):
+    for column in COLUMNS:
+        value = expected[column]
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            assert math.isnan(decoded[column])
+        elif column in MONEY_COLUMNS:
+            # Stored as whole paise, so 2.675 comes back as 2.68
+            assert decoded[column] == to_paise(value) / 100
+        else:
+            assert decoded[column] == value
+
+def test_round_trip():
+    payload = encode_invoice_items(ITEMS)
+    assert payload.startswith(MAGIC + bytes([FORMAT_VERSION]))
+    assert is_current(payload)
+    decoded = decode_invoice_items(payload)
+    assert len(decoded) == len(ITEMS)
+    for item, expected in zip(decoded, ITEMS):
+        _same(item, expected)
+
+def test_round_trip_dataframe():
+    pd = pytest.importorskip("pandas")
+    payload = encode_invoice_items(pd.DataFrame(ITEMS))
+    assert decode_invoice_items(payload)[0]['item_name'] == 'Steel Bolt M8'
+    assert decode_invoice_items(memoryview(payload))[1]['price'] == 2.68
+
+def test_empty_payloads():
+    assert decode_invoice_items(None) == []
+    assert decode_invoice_items(b'') == []
+    assert decode_invoice_items(encode_invoice_items([])) == []
+
+def test_legacy_json():
+    # DataFrame.to_json() output, with a bare nan as older versions wrote it
+    legacy = '{"item_name": {"0": "Bolt", "1": "Nut"}, "price": {"0": 1.5, "1": nan}}'
+    assert decode_invoice_items(legacy) == [
+        {'item_name': 'Bolt', 'price': 1.5}, {'item_name': 'Nut', 'price': None}
+    ]
+    compressed = zlib.compress(b'[{"item_name": "Bolt"}]')
+    assert decode_invoice_items(compressed) == [{'item_name': 'Bolt'}]
+    assert not is_current(legacy)
+
+@pytest.mark.parametrize("payload", [
+    MAGIC + bytes([99]) + zlib.compress(b''),
+    encode_invoice_items(ITEMS)[:-4],
+    b'not an invoice',
+])
+def test_unreadable_payloads(payload):
+    with pytest.raises(PayloadError):
+        decode_invoice_items(payload)
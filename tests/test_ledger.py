@@ -0,0 +1,106 @@
+import sqlite3
+from datetime import date
+import pytest
+
+pytest.importorskip("pandas")
+
+from inventory_core import add_seller, record_payment, record_transaction
+from utils.archive import archive_closed_years
+from utils.ledger import verify_seller_ledger, reconcile_seller_credit
+from utils.migrations import migrate
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'inventory.db')
+    migrate(conn)
+    yield conn
+    conn.close()
+
+def _invoice(conn, seller_id, amount, payment_status, day, number):
+    """Save an invoice header (amount in rupees) and, for credit sales, its ledger entry"""
+    with conn:
+        invoice_id = conn.execute("""
+            INSERT INTO invoices (total_amount, date, seller_id, payment_status, invoice_number)
+            VALUES (?, ?, ?, ?, ?)
+        """, (round(amount * 100), day, seller_id, payment_status, number)).lastrowid
+    if payment_status == 'credit':
+        record_transaction(conn, seller_id, amount, 'credit', f'Credit sale - Invoice #{number}',
+                           invoice_id, day)
+    return invoice_id
+
+@pytest.fixture
+def sellers(conn):
+    first = add_seller(conn, "First Traders", "Main Road", "9000000001", "")
+    second = add_seller(conn, "Second Stores", "Market Street", "9000000002", "")
+    _invoice(conn, first, 1000.50, 'credit', '2023-05-10', 'INV0001')
+    _invoice(conn, first, 250, 'paid', '2023-06-01', 'INV0002')
+    _invoice(conn, second, 480, 'credit', '2024-05-02', 'INV0003')
+    _invoice(conn, first, 300, 'credit', '2024-07-15', 'INV0004')
+    record_payment(conn, first, 600, payment_date='2023-08-01')
+    record_payment(conn, second, 80.25, payment_date='2024-06-01')
+    return first, second
+
+def _invoice_balance(conn, invoice_id):
+    return conn.execute(
+        "SELECT seller_id, total_amount FROM invoice_balances WHERE invoice_id = ?", (invoice_id,)
+    ).fetchone()
+
+def test_ledger_matches_recompute(conn, sellers):
+    assert verify_seller_ledger(conn) == []
+    assert reconcile_seller_credit(conn) == []
+
+def test_payments_are_allocated_oldest_first(conn, sellers):
+    first, _ = sellers
+    paid = conn.execute("""
+        SELECT i.invoice_number, b.paid_amount
+        FROM invoice_balances b JOIN invoices i ON i.id = b.invoice_id
+        WHERE b.seller_id = ? AND i.payment_status = 'credit'
+        ORDER BY i.date
+    """, (first,)).fetchall()
+    assert paid == [('INV0001', 60000), ('INV0004', 0)]
+
+def test_archive_keeps_ledger(conn, sellers, tmp_path):
+    moved = archive_closed_years(conn, today=date(2024, 8, 1), archive_path=str(tmp_path / 'archive.db'))
+    assert moved == {'FY2023-24': 2}
+    assert conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 2
+    assert verify_seller_ledger(conn) == []
+    assert reconcile_seller_credit(conn) == []
+
+def test_invoice_updates_keep_ledger(conn, sellers):
+    first, second = sellers
+    invoice_id = conn.execute("SELECT id FROM invoices WHERE invoice_number = 'INV0002'").fetchone()[0]
+
+    with conn:
+        conn.execute("UPDATE invoices SET total_amount = 27500 WHERE id = ?", (invoice_id,))
+    assert verify_seller_ledger(conn) == []
+
+    with conn:
+        conn.execute("UPDATE invoices SET payment_status = 'credit' WHERE id = ?", (invoice_id,))
+    assert verify_seller_ledger(conn) == []
+
+    with conn:
+        conn.execute("UPDATE invoices SET seller_id = ?, date = '2024-09-01' WHERE id = ?",
+                     (second, invoice_id))
+    assert verify_seller_ledger(conn) == []
+    assert _invoice_balance(conn, invoice_id) == (second, 27500)
+
+    with conn:
+        conn.execute("UPDATE invoices SET date = '2023-01-01' WHERE id = ?", (invoice_id,))
+    assert verify_seller_ledger(conn) == []
+
+def test_ledger_rejects_updates_and_deletes(conn, sellers):
+    with pytest.raises(sqlite3.IntegrityError):
+        with conn:
+            conn.execute("UPDATE seller_transactions SET amount = amount + 100")
+    with pytest.raises(sqlite3.IntegrityError):
+        with conn:
+            conn.execute("DELETE FROM seller_transactions")
+    assert verify_seller_ledger(conn) == []
+    assert reconcile_seller_credit(conn) == []
+
+def test_verify_reports_drift(conn, sellers):
+    first, _ = sellers
+    with conn:
+        conn.execute("UPDATE seller_balances SET total_payments = total_payments + 1 WHERE seller_id = ?",
+                     (first,))
+    assert verify_seller_ledger(conn) == [(first, 'total_payments', 60001, 60000)]
@@ -0,0 +1,56 @@
+from decimal import Decimal
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils.money import Money, to_paise, round_paise, format_inr
+
+@pytest.mark.parametrize("rupees, paise", [
+    (2.675, 268),
+    (1.005, 101),
+    ('10.125', 1013),
+    (Decimal('-2.675'), -268),
+    (99.99, 9999),
+    (0, 0),
+])
+def test_to_paise_rounds_half_up(rupees, paise):
+    assert to_paise(rupees) == paise
+
+def test_to_paise_keeps_missing():
+    assert to_paise(None) is None
+    assert to_paise(float('nan')) is None
+
+@pytest.mark.parametrize("mode, paise", [
+    ('half_up', [268, 269, -268]),
+    ('half_even', [268, 268, -268]),
+])
+def test_round_paise(mode, paise):
+    # 267.49999999 is 267.5 with binary representation error
+    assert round_paise([267.49999999, 268.5, -267.5], mode).tolist() == paise
+    assert round_paise(268.5, mode) == paise[1]
+
+def test_money_arithmetic_stays_in_paise():
+    price = Money.from_rupees(99.99)
+    assert price + 1 == Money(10000)
+    assert isinstance(price - Money(99), Money)
+    assert 10000 - price == Money(1)
+    assert -price == Money(-9999)
+
+def test_money_multiplication_rounds_half_up():
+    assert Money(29997).percent(5) == 1500   # 1499.85
+    assert Money(28497).percent(9) == 2565   # 2564.73
+    assert Money(5) * 0.5 == 3
+    assert Money(-5) * 0.5 == -3
+
+@pytest.mark.parametrize("operand", [0.5, Decimal('1.5')])
+def test_money_rejects_fractional_operands(operand):
+    with pytest.raises(TypeError):
+        Money(100) + operand
+    with pytest.raises(TypeError):
+        Money(100) - operand
+
+def test_money_formatting():
+    amount = Money(123450)
+    assert f"{amount:,.2f}" == "1,234.50"
+    assert str(amount) == format_inr(123450) == "₹1,234.50"
+    assert str(Money(-2000)) == "-₹20.00"
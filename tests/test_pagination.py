@@ -0,0 +1,46 @@
+import sqlite3
+import pytest
+
+pytest.importorskip("pandas")
+
+from utils.pagination import fetch_page
+
+QUERY = "SELECT id, name, total_credit FROM sellers WHERE total_credit >= ?"
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE sellers (id INTEGER PRIMARY KEY, name TEXT, total_credit INTEGER)")
+    # Repeated credits so pages have to break ties on id
+    conn.executemany("INSERT INTO sellers (id, name, total_credit) VALUES (?, ?, ?)",
+                     [(i, f"Seller {i}", (i % 4) * 100) for i in range(1, 12)])
+    yield conn
+    conn.close()
+
+def _all_pages(conn, **kwargs):
+    ids, cursor = [], None
+    while True:
+        page, cursor = fetch_page(conn, QUERY, (0,), cursor=cursor, page_size=3, **kwargs)
+        assert len(page) <= 3
+        ids.extend(page['id'].tolist())
+        if cursor is None:
+            return ids
+
+def test_pages_cover_every_row_once(conn):
+    expected = [row[0] for row in conn.execute("SELECT id FROM sellers ORDER BY total_credit, id")]
+    assert _all_pages(conn, sort_column='total_credit') == expected
+
+def test_descending_pages(conn):
+    expected = [row[0] for row in conn.execute(
+        "SELECT id FROM sellers ORDER BY total_credit DESC, id DESC")]
+    assert _all_pages(conn, sort_column='total_credit', descending=True) == expected
+
+def test_cursor_is_last_row(conn):
+    page, cursor = fetch_page(conn, QUERY, (0,), sort_column='name', page_size=5)
+    assert cursor == (page.iloc[-1]['name'], int(page.iloc[-1]['id']))
+    assert all(isinstance(value, (str, int)) for value in cursor)
+
+def test_last_page_has_no_cursor(conn):
+    page, cursor = fetch_page(conn, QUERY, (300,), page_size=3)
+    assert page['id'].tolist() == [3, 7, 11]
+    assert cursor is None
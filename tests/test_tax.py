@@ -0,0 +1,69 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from utils.money import Money
+from utils.tax import is_interstate, line_amounts, compute_line_taxes, tax_slabs, invoice_totals
+
+@pytest.fixture
+def items():
+    return pd.DataFrame({
+        'quantity': [3, 1],
+        'price': [99.99, 10.0],
+        'discount_percentage': [5, 0],
+        'gst_percentage': [18, 5],
+    })
+
+@pytest.mark.parametrize("company_state, buyer_gstin, interstate", [
+    ('27', '27AAAAA0000A1Z5', False),
+    ('27', '29AAAAA0000A1Z5', True),
+    (7, '07AAAAA0000A1Z5', False),
+    ('27', '', False),
+    ('', '29AAAAA0000A1Z5', False),
+    (None, '29AAAAA0000A1Z5', False),
+])
+def test_is_interstate(company_state, buyer_gstin, interstate):
+    assert is_interstate(company_state, buyer_gstin) is interstate
+
+def test_intra_state_splits_cgst_and_sgst(items):
+    lines = compute_line_taxes(items, interstate=False)
+    # 3 x 99.99 = 299.97, less 5% (14.9985 -> 15.00) = 284.97;
+    # 9% of that is 25.6473, rounded to 25.65 for CGST and SGST each
+    first = lines.iloc[0]
+    assert first['taxable_value'] == 284.97
+    assert first['cgst_amount'] == first['sgst_amount'] == 25.65
+    assert first['igst_amount'] == 0
+    assert first['gst_amount'] == 51.30
+    assert first['total_amount'] == 336.27
+    # 2.5% of 10.00 is exactly 0.25
+    assert lines.iloc[1][['cgst_amount', 'sgst_amount', 'igst_amount']].tolist() == [0.25, 0.25, 0]
+
+def test_inter_state_charges_igst(items):
+    first = compute_line_taxes(items, interstate=True).iloc[0]
+    # 18% of 284.97 is 51.2946, rounded once for IGST
+    assert first['igst_amount'] == first['gst_amount'] == 51.29
+    assert first['cgst_amount'] == first['sgst_amount'] == 0
+    assert first['total_amount'] == 336.26
+
+def test_line_amounts_round_at_the_full_rate():
+    amounts = line_amounts(3, 99.99, 5, 18)
+    assert amounts['discount_amount'] == Money(1500)
+    assert amounts['gst_amount'] == Money(5129)
+    assert amounts['total_amount'] == Money(33626)
+
+def test_tax_slabs(items):
+    slabs = tax_slabs(compute_line_taxes(items, interstate=False))
+    assert slabs['gst_percentage'].tolist() == [5, 18]
+    assert slabs['taxable_value'].tolist() == [10.0, 284.97]
+    assert slabs['gst_amount'].tolist() == [0.5, 51.3]
+
+def test_invoice_totals_round_off(items):
+    lines = compute_line_taxes(items, interstate=False)
+    totals = invoice_totals(lines, round_off=True)
+    assert totals['total_amount'] == Money(34677)
+    assert totals['grand_total'] == Money(34700)
+    assert totals['round_off'] == Money(23)
+
+    exact = invoice_totals(lines, round_off=False)
+    assert exact['grand_total'] == exact['total_amount'] == Money(34677)
+    assert exact['round_off'] == 0
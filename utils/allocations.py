@@ -0,0 +1,76 @@
+"""Payments applied to credit sales, oldest first.
+
+Payments are recorded against a seller rather than an invoice, so each one
+is split across the seller's open credit entries (credit sales in
+seller_transactions) in date order and the pieces are stored in
+payment_allocations. invoice_balances.paid_amount is the sum of an
+invoice's allocations, kept up to date by a trigger, and the receivables
+aging report reads what is left open on each credit entry.
+
+Allocation is incremental: each run only matches the still-open remainder
+of payments against the still-open remainder of credits, so for entries
+recorded in date order, running it after every ledger entry or once over
+the whole ledger gives the same result. A back-dated payment is applied to
+whatever is still open when it is recorded.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Credits and payments each get a running total of their open amounts per
+# seller, in (date, id) order; a payment covers the part of the credits
+# whose running-total interval overlaps its own.
+ALLOCATE_SQL = """
+    INSERT INTO payment_allocations (payment_id, credit_id, invoice_id, seller_id, amount)
+    WITH allocated_credits AS (
+        SELECT credit_id AS id, SUM(amount) AS allocated
+        FROM payment_allocations {allocation_filter}
+        GROUP BY credit_id
+    ), allocated_payments AS (
+        SELECT payment_id AS id, SUM(amount) AS allocated
+        FROM payment_allocations {allocation_filter}
+        GROUP BY payment_id
+    ), open_entries AS (
+        SELECT
+            t.id, t.seller_id, t.invoice_id, t.transaction_type, t.date,
+            t.amount - COALESCE(c.allocated, p.allocated, 0) AS open_amount
+        FROM seller_transactions t
+        LEFT JOIN allocated_credits c ON t.transaction_type = 'credit' AND c.id = t.id
+        LEFT JOIN allocated_payments p ON t.transaction_type = 'payment' AND p.id = t.id
+        WHERE t.transaction_type IN ('credit', 'payment') {transaction_filter}
+    ), ranges AS (
+        SELECT
+            id, seller_id, invoice_id, transaction_type, date, open_amount,
+            SUM(open_amount) OVER (
+                PARTITION BY seller_id, transaction_type ORDER BY date, id
+            ) AS range_end
+        FROM open_entries
+        WHERE open_amount > 0
+    )
+    SELECT
+        p.id, c.id, c.invoice_id, c.seller_id,
+        MIN(c.range_end, p.range_end) - MAX(c.range_end - c.open_amount, p.range_end - p.open_amount)
+    FROM ranges c
+    JOIN ranges p ON p.seller_id = c.seller_id
+    WHERE c.transaction_type = 'credit' AND p.transaction_type = 'payment'
+        AND p.range_end - p.open_amount < c.range_end
+        AND c.range_end - c.open_amount < p.range_end
+    ORDER BY p.date, p.id, c.date, c.id
+"""
+
+def allocate_payments(conn, seller_id=None):
+    """Apply open payments to open credits, for one seller or all of them.
+
+    Runs in the caller's transaction; returns the number of allocations added.
+    """
+    if seller_id is None:
+        sql = ALLOCATE_SQL.format(allocation_filter='', transaction_filter='')
+        params = ()
+    else:
+        sql = ALLOCATE_SQL.format(allocation_filter='WHERE seller_id = ?',
+                                  transaction_filter='AND t.seller_id = ?')
+        params = (int(seller_id),) * 3
+    added = conn.execute(sql, params).rowcount
+    if added:
+        logger.debug(f"Added {added} payment allocations" + (f" for seller {seller_id}" if seller_id else ""))
+    return added
@@ -0,0 +1,323 @@
+import os
+import json
+import logging
+from datetime import datetime
+import pandas as pd
+from config import Config
+from utils.db_manager import get_db_connection
+from utils.archive import unified_invoices
+from utils.invoice_codec import decode_invoice_items, PayloadError
+from utils.money import rupee_columns, paise_columns
+from utils.dates import DATE_FORMAT, month_bounds
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - snapshot is optional
+    pa = None
+    ipc = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+# Manifest layout; older manifests tracked row signatures and are rebuilt
+SNAPSHOT_VERSION = 2
+
+ITEM_COLUMNS = ['invoice_id', 'date', 'item_name', 'item_code', 'quantity', 'price',
+                'discount_percentage', 'discount_amount', 'gst_percentage',
+                'gst_amount', 'total_amount']
+
+# Snapshots keep money as int64 paise like the database; load_report_data
+# converts it to rupees for the reports page
+ITEM_MONEY_COLUMNS = ['price', 'discount_amount', 'gst_amount', 'total_amount']
+
+# Month-partitioned tables: name -> (months query, export query). Export
+# queries select one month with the clause from _month_filter. Writes to the
+# source tables log their months in snapshot_changes (migration 12), which
+# refresh_snapshot reads instead of scanning the tables
+PARTITIONED_TABLES = {
+    'invoices': (
+        """
+        SELECT DISTINCT COALESCE(strftime('%Y-%m', date), 'unknown')
+        FROM invoices
+        """,
+        """
+        SELECT id, invoice_number, invoice_data, total_amount, date,
+               seller_id, payment_status
+        FROM invoices
+        WHERE {month_filter}
+        ORDER BY id
+        """
+    ),
+    'transactions': (
+        """
+        SELECT DISTINCT COALESCE(strftime('%Y-%m', date), 'unknown')
+        FROM seller_transactions
+        """,
+        """
+        SELECT id, seller_id, invoice_id, amount, transaction_type, date, notes
+        FROM seller_transactions
+        WHERE {month_filter}
+        ORDER BY id
+        """
+    )
+}
+
+def is_available():
+    """Return True if pyarrow is installed and snapshots can be used"""
+    return pa is not None
+
+def parse_invoice_items(invoice_data):
+    """Parse a stored invoice_data payload into a list of item records"""
+    try:
+        return decode_invoice_items(invoice_data)
+    except PayloadError as e:
+        logger.warning(f"Skipping unreadable invoice payload: {e}")
+        return []
+
+def _snapshot_dir():
+    return Config.ANALYTICS_DIR
+
+def _partition_path(table, month):
+    return os.path.join(_snapshot_dir(), table, f"{month}.arrow")
+
+def _load_manifest():
+    path = os.path.join(_snapshot_dir(), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable snapshot manifest: {e}")
+        return {}
+
+def _save_manifest(manifest):
+    path = os.path.join(_snapshot_dir(), MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _write_arrow(df, path):
+    """Write a DataFrame as an uncompressed Arrow IPC file so it can be memory-mapped"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def _read_arrow(path):
+    """Memory-map an Arrow IPC file; column buffers are read without copying"""
+    with pa.memory_map(path, 'r') as source:
+        return ipc.open_file(source).read_all()
+
+def _month_filter(month):
+    # A date range seeks on the date index; rows without a valid date form 'unknown'
+    if month == 'unknown':
+        return "date(date) IS NULL", ()
+    return "date >= ? AND date < ?", month_bounds(month)
+
+def _read_month(conn, query, month):
+    month_filter, params = _month_filter(month)
+    df = pd.read_sql_query(query.format(month_filter=month_filter), conn, params=params)
+    df['date'] = pd.to_datetime(df['date'], format=DATE_FORMAT, errors='coerce')
+    return df
+
+def _export_invoices(conn, query, month):
+    invoices = _read_month(conn, query, month)
+    if invoices.empty:
+        return 0
+
+    # Parse line items once here so reports never touch the JSON blobs
+    items = []
+    for row in invoices.itertuples(index=False):
+        for item in parse_invoice_items(row.invoice_data):
+            item['invoice_id'] = row.id
+            item['date'] = row.date
+            items.append(item)
+    items_df = pd.DataFrame(items).reindex(columns=ITEM_COLUMNS)
+    for column in ITEM_COLUMNS[4:]:
+        items_df[column] = pd.to_numeric(items_df[column], errors='coerce')
+    paise_columns(items_df, ITEM_MONEY_COLUMNS)
+    items_df['item_name'] = items_df['item_name'].astype('string')
+    items_df['item_code'] = items_df['item_code'].astype('string')
+
+    _write_arrow(invoices.drop(columns=['invoice_data']), _partition_path('invoices', month))
+    _write_arrow(items_df, _partition_path('line_items', month))
+    return len(invoices)
+
+def _export_transactions(conn, query, month):
+    transactions = _read_month(conn, query, month)
+    if transactions.empty:
+        return 0
+    _write_arrow(transactions, _partition_path('transactions', month))
+    return len(transactions)
+
+def _partition_months(table):
+    table_dir = os.path.join(_snapshot_dir(), table)
+    if not os.path.isdir(table_dir):
+        return set()
+    return {f[:-len('.arrow')] for f in os.listdir(table_dir) if f.endswith('.arrow')}
+
+def pending_changes():
+    """Number of table months written since the last refresh_snapshot"""
+    with get_db_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM snapshot_changes").fetchone()[0]
+
+def snapshot_time():
+    """When the snapshot was last refreshed, or None if there is no usable snapshot"""
+    manifest = _load_manifest()
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return None
+    return manifest.get('refreshed_at')
+
+def refresh_snapshot(force=False):
+    """Bring the columnar snapshot up to date with the database.
+
+    Only the months logged in snapshot_changes since the last refresh are
+    rewritten, so closed months are exported once; the first refresh (or
+    force=True) exports every month. Run it from cron or the reports page
+    button; reports only read the snapshot. Returns the number of partitions
+    written, or None if pyarrow is missing.
+    """
+    if not is_available():
+        return None
+
+    os.makedirs(_snapshot_dir(), exist_ok=True)
+    manifest = {} if force else _load_manifest()
+    full = manifest.get('version') != SNAPSHOT_VERSION
+    written = 0
+
+    with get_db_connection() as conn:
+        changes = conn.execute("SELECT table_name, month, changes FROM snapshot_changes").fetchall()
+        # Months moved out by utils.archive keep their partitions so reports still see them
+        archived = {
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT strftime('%Y-%m', date) FROM archived_invoices"
+            ).fetchall()
+        }
+
+        for table, (months_query, export_query) in PARTITIONED_TABLES.items():
+            if full:
+                # Including partitions of months that no longer have rows
+                months = {row[0] for row in conn.execute(months_query).fetchall()}
+                months |= _partition_months(table)
+            else:
+                months = {month for name, month, _ in changes if name == table}
+
+            for month in sorted(months):
+                if table == 'invoices':
+                    rows = _export_invoices(conn, export_query, month)
+                else:
+                    rows = _export_transactions(conn, export_query, month)
+                if not rows and not (table == 'invoices' and month in archived):
+                    for name in (['invoices', 'line_items'] if table == 'invoices' else [table]):
+                        path = _partition_path(name, month)
+                        if os.path.exists(path):
+                            os.remove(path)
+                written += 1
+
+        # Sellers are small and change in place, so they are rewritten each refresh
+        sellers = pd.read_sql_query("SELECT id, name, phone, gstin, total_credit FROM sellers", conn)
+        _write_arrow(sellers, os.path.join(_snapshot_dir(), 'sellers.arrow'))
+
+        # A month written again while exporting has a higher count and stays logged
+        with conn:
+            conn.executemany(
+                "DELETE FROM snapshot_changes WHERE table_name = ? AND month = ? AND changes = ?",
+                changes
+            )
+
+    _save_manifest({
+        'version': SNAPSHOT_VERSION,
+        'refreshed_at': datetime.now().isoformat(timespec='seconds')
+    })
+
+    if written:
+        logger.info(f"Analytics snapshot refreshed: {written} partitions written")
+    return written
+
+def load_table(table, start_month=None):
+    """Load a partitioned table from the snapshot, optionally from start_month onwards"""
+    table_dir = os.path.join(_snapshot_dir(), table)
+    if not os.path.isdir(table_dir):
+        return pd.DataFrame()
+
+    months = sorted(_partition_months(table))
+    if start_month:
+        months = [m for m in months if m >= start_month or m == 'unknown']
+
+    tables = [_read_arrow(_partition_path(table, m)) for m in months]
+    tables = [t for t in tables if t.num_rows > 0]
+    if not tables:
+        return pd.DataFrame()
+    return pa.concat_tables(tables, promote_options='default').to_pandas(split_blocks=True)
+
+def load_sellers():
+    path = os.path.join(_snapshot_dir(), 'sellers.arrow')
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return _read_arrow(path).to_pandas()
+
+def load_report_data(start_month=None):
+    """Return (invoices, line_items) frames for the reports page, from start_month if given.
+
+    Reads the memory-mapped snapshot as of its last refresh_snapshot when
+    pyarrow is available and a snapshot exists, otherwise falls back to
+    fetching rows from SQLite, archived years included, and parsing
+    invoice_data on the fly.
+    """
+    if is_available() and snapshot_time() is not None:
+        try:
+            df_invoices = load_table('invoices', start_month)
+            df_items = load_table('line_items', start_month)
+            sellers = load_sellers()
+            if not df_invoices.empty:
+                sellers = sellers.rename(columns={
+                    'id': 'seller_id', 'name': 'customer_name', 'total_credit': 'current_credit'
+                })[['seller_id', 'customer_name', 'current_credit']]
+                df_invoices = df_invoices.merge(sellers, on='seller_id', how='left')
+                df_invoices = df_invoices.sort_values('date', ascending=False, ignore_index=True)
+                rupee_columns(df_invoices, ['total_amount', 'current_credit'])
+                return df_invoices, rupee_columns(df_items, ITEM_MONEY_COLUMNS)
+        except Exception as e:
+            logger.error(f"Error reading analytics snapshot, falling back to SQLite: {e}")
+
+    since = month_bounds(start_month)[0] if start_month else ''
+    with get_db_connection() as conn, unified_invoices(conn):
+        df_invoices = pd.read_sql_query("""
+            SELECT
+                i.*,
+                s.name as customer_name,
+                s.total_credit as current_credit
+            FROM all_invoices i
+            LEFT JOIN sellers s ON i.seller_id = s.id
+            WHERE i.date >= ?
+            ORDER BY i.date DESC
+        """, conn, params=(since,))
+    df_invoices['date'] = pd.to_datetime(df_invoices['date'], format=DATE_FORMAT, errors='coerce')
+    rupee_columns(df_invoices, ['total_amount', 'current_credit'])
+
+    # Decoded line items are already in rupees; same columns as the snapshot
+    all_items = []
+    for row in df_invoices.itertuples(index=False):
+        for item in parse_invoice_items(row.invoice_data):
+            item['invoice_id'] = row.id
+            item['date'] = row.date
+            all_items.append(item)
+
+    df_items = pd.DataFrame(all_items).reindex(columns=ITEM_COLUMNS)
+    return df_invoices, df_items
+
+if __name__ == "__main__":
+    # Intended to be run nightly, e.g. from cron: python -m utils.analytics_snapshot
+    logging.basicConfig(level=logging.INFO)
+    result = refresh_snapshot()
+    if result is None:
+        print("pyarrow is not installed; analytics snapshot skipped")
+    else:
+        print(f"Analytics snapshot refreshed ({result} partitions written)")
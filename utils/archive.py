@@ -0,0 +1,218 @@
+import sys
+import logging
+from datetime import date
+from contextlib import contextmanager
+from config import Config
+from utils.invoice_codec import encode_invoice_items, decode_invoice_items, is_current, PayloadError
+
+logger = logging.getLogger(__name__)
+
+# Financial years run from 1 April to 31 March
+FY_START_MONTH = 4
+
+# PRAGMA user_version of the archive database; 1 stores amounts in paise,
+# 2 adds the stored PDF's hash
+ARCHIVE_VERSION = 2
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.invoices (
+        id INTEGER PRIMARY KEY,
+        invoice_number TEXT,
+        invoice_data_z BLOB,  -- utils.invoice_codec payload; zlib-compressed JSON in older archives
+        total_amount INTEGER,  -- paise, see utils.money
+        date TEXT,
+        seller_id INTEGER,
+        payment_status TEXT,
+        pdf_path TEXT,
+        pdf_sha256 TEXT,  -- see utils.invoice_pdfs
+        financial_year TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_invoices_seller ON invoices(seller_id)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_invoices_date ON invoices(date)"
+]
+
+def financial_year(day):
+    """Label of the financial year containing day, e.g. 'FY2023-24'"""
+    start = day.year if day.month >= FY_START_MONTH else day.year - 1
+    return f"FY{start}-{(start + 1) % 100:02d}"
+
+def financial_year_bounds(label):
+    """(first day, first day of the next year) as ISO strings for a label like 'FY2023-24'"""
+    start = int(label[2:6])
+    return date(start, FY_START_MONTH, 1).isoformat(), date(start + 1, FY_START_MONTH, 1).isoformat()
+
+def current_year_start(today=None):
+    """First day of the financial year containing today; earlier years are closed"""
+    label = financial_year(today or date.today())
+    return financial_year_bounds(label)[0]
+
+def _compact(invoice_data):
+    # Rows normally arrive in the current format; older payloads are re-encoded
+    if invoice_data is None or is_current(invoice_data):
+        return invoice_data
+    try:
+        return encode_invoice_items(decode_invoice_items(invoice_data))
+    except PayloadError as e:
+        logger.warning(f"Archiving unreadable invoice payload unchanged: {e}")
+        return invoice_data
+
+def _attach(conn, archive_path=None):
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path or Config.ARCHIVE_DATABASE_PATH,))
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement)
+    version = conn.execute("PRAGMA archive.user_version").fetchone()[0]
+    if version < ARCHIVE_VERSION:
+        # The savepoint keeps the upgrade steps and the version bump together
+        conn.execute("SAVEPOINT archive_upgrade")
+        if version < 1:
+            # Archives written before amounts moved to integer paise hold rupees
+            conn.execute("UPDATE archive.invoices SET total_amount = CAST(ROUND(total_amount * 100) AS INTEGER)")
+        columns = [row[1] for row in conn.execute("PRAGMA archive.table_info(invoices)")]
+        if 'pdf_sha256' not in columns:
+            conn.execute("ALTER TABLE archive.invoices ADD COLUMN pdf_sha256 TEXT")
+        conn.execute(f"PRAGMA archive.user_version = {ARCHIVE_VERSION}")
+        conn.execute("RELEASE archive_upgrade")
+
+def closed_years(conn, today=None):
+    """Closed financial years that still have invoices in the hot database, with counts"""
+    rows = conn.execute("""
+        SELECT date, COUNT(*) FROM invoices
+        WHERE date IS NOT NULL AND date < ?
+        GROUP BY date
+    """, (current_year_start(today),)).fetchall()
+    years = {}
+    for day, count in rows:
+        try:
+            label = financial_year(date.fromisoformat(day[:10]))
+        except ValueError:
+            logger.warning(f"Skipping invoices with unparseable date {day!r}")
+            continue
+        years[label] = years.get(label, 0) + count
+    return dict(sorted(years.items()))
+
+def _archive_year(conn, label):
+    start, end = financial_year_bounds(label)
+    rows = conn.execute("""
+        SELECT id, invoice_number, invoice_data, total_amount, date,
+               seller_id, payment_status, pdf_path, pdf_sha256
+        FROM invoices
+        WHERE date >= ? AND date < ?
+    """, (start, end)).fetchall()
+    if not rows:
+        return 0
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO archive.invoices (
+            id, invoice_number, invoice_data_z, total_amount, date,
+            seller_id, payment_status, pdf_path, pdf_sha256, financial_year
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (row[0], row[1], _compact(row[2]), row[3], row[4], row[5], row[6], row[7], row[8], label)
+        for row in rows
+    ])
+
+    # Headers stay in the hot database for invoice numbering and ledger lookups
+    conn.execute("""
+        INSERT OR REPLACE INTO archived_invoices (
+            id, invoice_number, total_amount, date, seller_id, payment_status, financial_year
+        )
+        SELECT id, invoice_number, total_amount, date, seller_id, payment_status, ?
+        FROM invoices
+        WHERE date >= ? AND date < ?
+    """, (label, start, end))
+
+    # seller_balances and invoice_balances keep their lifetime totals: there
+    # are no delete triggers on invoices
+    conn.execute("DELETE FROM invoices WHERE date >= ? AND date < ?", (start, end))
+
+    conn.execute("""
+        INSERT INTO archive_summary (financial_year, invoice_count, total_amount, archived_at)
+        SELECT financial_year, COUNT(*), COALESCE(SUM(total_amount), 0), CURRENT_TIMESTAMP
+        FROM archived_invoices
+        WHERE financial_year = ?
+        GROUP BY financial_year
+        ON CONFLICT(financial_year) DO UPDATE SET
+            invoice_count = excluded.invoice_count,
+            total_amount = excluded.total_amount,
+            archived_at = excluded.archived_at
+    """, (label,))
+    return len(rows)
+
+def archive_closed_years(conn, today=None, archive_path=None):
+    """Move invoices of every closed financial year into the archive database.
+
+    Each year is moved in one transaction spanning both databases. Returns
+    {financial_year: invoices moved}.
+    """
+    years = closed_years(conn, today)
+    if not years:
+        return {}
+
+    moved = {}
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    # seller_transactions still reference archived invoice ids
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    _attach(conn, archive_path)
+    try:
+        for label in years:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                moved[label] = _archive_year(conn, label)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            logger.info(f"Archived {moved[label]} invoices from {label}")
+    finally:
+        conn.execute("DETACH DATABASE archive")
+        conn.execute(f"PRAGMA foreign_keys = {int(foreign_keys)}")
+        conn.isolation_level = isolation_level
+    return moved
+
+@contextmanager
+def unified_invoices(conn, archive_path=None):
+    """Expose hot and archived invoices together as the temp view all_invoices.
+
+    For cross-year reports and lookups; day-to-day queries should read invoices.
+    Decode invoice_data with utils.invoice_codec.decode_invoice_items.
+    """
+    _attach(conn, archive_path)
+    try:
+        conn.execute("""
+            CREATE TEMP VIEW IF NOT EXISTS all_invoices AS
+            SELECT id, invoice_number, invoice_data, total_amount, date,
+                   seller_id, payment_status, pdf_path, pdf_sha256, 0 AS archived
+            FROM main.invoices
+            UNION ALL
+            SELECT id, invoice_number, invoice_data_z, total_amount, date,
+                   seller_id, payment_status, pdf_path, pdf_sha256, 1 AS archived
+            FROM archive.invoices
+        """)
+        yield conn
+    finally:
+        conn.execute("DROP VIEW IF EXISTS temp.all_invoices")
+        conn.execute("DETACH DATABASE archive")
+
+if __name__ == "__main__":
+    # Run after each financial year closes: python -m utils.archive [--dry-run] [--vacuum]
+    from utils.db_manager import get_db_connection, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    with get_db_connection() as conn:
+        if '--dry-run' in sys.argv[1:]:
+            for label, count in closed_years(conn).items():
+                print(f"{label}: {count} invoices would be archived")
+        else:
+            moved = archive_closed_years(conn)
+            for label, count in moved.items():
+                print(f"{label}: {count} invoices archived to {Config.ARCHIVE_DATABASE_PATH}")
+            if not moved:
+                print("No closed financial years left to archive")
+            elif '--vacuum' in sys.argv[1:]:
+                # Give the freed pages back to the filesystem
+                conn.execute("VACUUM")
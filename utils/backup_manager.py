@@ -2,16 +2,15 @@ import os
 import shutil
 from datetime import datetime
 import logging
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import threading
 import pickle
 import json
 
 logger = logging.getLogger(__name__)
 
+_backup_lock = threading.Lock()
+_backup_started = False
+
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 BACKUP_DIR = 'backups'
 MAX_LOCAL_BACKUPS = 5
@@ -30,6 +29,10 @@ class BackupManager:
             
     def get_google_creds(self):
         """Get or refresh Google Drive credentials"""
+        # The Google client libraries are slow to import, so load them only when backing up
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+        
         creds = None
         token_path = 'token.pickle'
         creds_path = 'credentials.json'
@@ -82,6 +85,9 @@ class BackupManager:
             if not creds:
                 logger.error("Failed to get Google credentials")
                 return False
+            
+            from googleapiclient.discovery import build
+            from googleapiclient.http import MediaFileUpload
                 
             service = build('drive', 'v3', credentials=creds)
             
@@ -160,4 +166,23 @@ class BackupManager:
 def init_backup():
     """Initialize backup system and perform backup"""
     backup_manager = BackupManager()
-    return backup_manager.perform_backup() 
\ No newline at end of file
+    return backup_manager.perform_backup()
+
+def _run_backup():
+    try:
+        if init_backup():
+            logger.info("Backup completed successfully")
+        else:
+            logger.warning("Backup failed or partially completed")
+    except Exception as e:
+        logger.error(f"Error during backup: {e}")
+
+def start_background_backup():
+    """Run init_backup in a background thread, at most once per process"""
+    global _backup_started
+    with _backup_lock:
+        if _backup_started:
+            return False
+        _backup_started = True
+    threading.Thread(target=_run_backup, name="backup", daemon=True).start()
+    return True 
\ No newline at end of file
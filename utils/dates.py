@@ -0,0 +1,48 @@
+"""Calendar dates as ISO 'YYYY-MM-DD' text.
+
+Every date column holds ISO dates (enforced by triggers since migration 7),
+so they sort and compare as strings and range filters can seek on an index.
+"""
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Accepted when normalizing dates typed or stored by older versions
+INPUT_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y']
+
+def to_iso_date(value):
+    """ISO date for a date, datetime, pandas Timestamp or date string; None stays None.
+
+    Raises ValueError for strings in none of INPUT_FORMATS.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        # Also pandas Timestamps; the time of day is dropped
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    # A time of day after the date (e.g. '2024-03-31 10:15:00') is dropped
+    head = text.replace('T', ' ').split(' ')[0]
+    for fmt in INPUT_FORMATS:
+        try:
+            return datetime.strptime(head, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date {value!r}")
+
+def month_bounds(month):
+    """(first day, first day of the next month) for a 'YYYY-MM' month"""
+    first = datetime.strptime(month, '%Y-%m').date()
+    following = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first.isoformat(), following.isoformat()
+
+def format_date(iso, fmt='%d-%m-%Y'):
+    """Display form of a stored ISO date; other values are shown unchanged"""
+    if not iso:
+        return ''
+    try:
+        return datetime.strptime(iso, DATE_FORMAT).strftime(fmt)
+    except (TypeError, ValueError):
+        return str(iso)
@@ -1,60 +1,59 @@
 import sqlite3
-import os
 import logging
 from contextlib import contextmanager
+from config import Config
+from utils.migrations import run_migrations
 
 logger = logging.getLogger(__name__)
 
+# Set once the default company record has been confirmed for this process
+_company_details_checked = False
+
+def connect():
+    """Open a connection to the app database, instrumented unless disabled in Config"""
+    if Config.QUERY_STATS_ENABLED:
+        from utils.query_stats import InstrumentedConnection
+        return sqlite3.connect(Config.DATABASE_PATH, factory=InstrumentedConnection)
+    return sqlite3.connect(Config.DATABASE_PATH)
+
 @contextmanager
 def get_db_connection():
-    conn = sqlite3.connect('inventory.db')
+    conn = connect()
     try:
         yield conn
     finally:
         conn.close()
 
 def init_db():
-    """Initialize the database with required schema"""
+    """Apply pending schema migrations; runs once per process"""
     try:
-        # Read schema file
-        schema_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schema.sql')
-        with open(schema_path, 'r') as f:
-            schema = f.read()
-        
-        # Connect to database and execute schema
-        with get_db_connection() as conn:
-            conn.executescript(schema)
-            conn.commit()
-            logger.info("Database schema initialized successfully")
-            return True
+        run_migrations()
+        return True
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         return False
 
 def ensure_company_details_exist():
-    """Ensure company_details table exists and has at least one record"""
+    """Ensure the database is migrated and has the default company_details record"""
+    global _company_details_checked
+    if _company_details_checked:
+        return True
+    if not init_db():
+        return False
     try:
         with get_db_connection() as conn:
-            # Check if table exists
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='company_details'
-            """)
-            if not cursor.fetchone():
-                # Initialize database if table doesn't exist
-                init_db()
-            
             # Check if we have company details
             cursor.execute("SELECT COUNT(*) FROM company_details")
             if cursor.fetchone()[0] == 0:
                 # Insert default company details
                 cursor.execute("""
                     INSERT INTO company_details (
-                        name, address, city, state, state_code, gstin, 
+                        id, name, address, city, state, state_code, gstin, 
                         phone, email, bank_name, bank_account, bank_ifsc, 
                         bank_branch, jurisdiction
                     ) VALUES (
+                        1,
                         'GANANATH ENTERPRISES',
                         'New Colony',
                         'Rayagada',
@@ -71,7 +70,8 @@ def ensure_company_details_exist():
                     )
                 """)
                 conn.commit()
-            return True
+        _company_details_checked = True
+        return True
     except Exception as e:
         logger.error(f"Error ensuring company details: {e}")
-        return False 
\ No newline at end of file
+        return False
@@ -0,0 +1,287 @@
+"""CSV and Excel exports of the database.
+
+Each export reads its query in Config.EXPORT_CHUNK_ROWS chunks from a
+cursor and writes the rows straight to a CSV file or a write-only (streamed)
+openpyxl workbook under Config.EXPORT_DIR, so exporting millions of invoice
+lines needs no more memory than one chunk. Amounts are written in rupees
+and dates as ISO text.
+"""
+import os
+import csv
+import sys
+import math
+import logging
+import tempfile
+from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+from config import Config
+from utils.invoice_codec import decode_invoice_items, PayloadError
+from utils.money import PAISE_PER_RUPEE, to_paise
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'xlsx')
+
+# Rows per worksheet; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1_000_000
+
+LINE_COLUMNS = ['item_name', 'item_code', 'quantity', 'price', 'discount_percentage',
+                'discount_amount', 'gst_percentage', 'gst_amount', 'total_amount']
+
+def _chunks(cursor):
+    while True:
+        rows = cursor.fetchmany(Config.EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+
+def _query_rows(conn, sql, money_columns=(), params=()):
+    """(columns, row iterator) for a query; money_columns are converted from paise to rupees"""
+    cursor = conn.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    money = [i for i, column in enumerate(columns) if column in money_columns]
+
+    def rows():
+        for chunk in _chunks(cursor):
+            for row in chunk:
+                if money:
+                    row = list(row)
+                    for i in money:
+                        if row[i] is not None:
+                            row[i] = row[i] / PAISE_PER_RUPEE
+                yield row
+    return columns, rows()
+
+def _invoice_items(conn):
+    # (invoice_number, date, seller, item dict) for every stored line, an invoice at a time
+    cursor = conn.execute("""
+        SELECT i.id, i.invoice_number, i.date, s.name, i.invoice_data
+        FROM invoices i
+        LEFT JOIN sellers s ON i.seller_id = s.id
+        ORDER BY i.id
+    """)
+    for chunk in _chunks(cursor):
+        for invoice_id, invoice_number, date, seller, payload in chunk:
+            try:
+                items = decode_invoice_items(payload)
+            except PayloadError as e:
+                logger.warning(f"Skipping unreadable items of invoice {invoice_id}: {e}")
+                continue
+            for item in items:
+                yield invoice_number, date, seller, item
+
+def _value(value):
+    # Missing amounts decode as NaN
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+def products(conn):
+    return _query_rows(conn, """
+        SELECT id, company, category, item_name, item_code, buying_price, selling_price,
+               quantity, gst_percentage, date_purchased
+        FROM products
+        ORDER BY id
+    """, ['buying_price', 'selling_price'])
+
+def sellers(conn):
+    return _query_rows(conn, """
+        SELECT
+            s.id, s.name, s.address, s.phone, s.gstin,
+            COALESCE(b.total_invoices, 0) as total_invoices,
+            COALESCE(b.total_sales, 0) as total_sales,
+            COALESCE(b.total_payments, 0) as total_payments,
+            COALESCE(s.total_credit, 0) as outstanding,
+            b.last_invoice_date
+        FROM sellers s
+        LEFT JOIN seller_balances b ON s.id = b.seller_id
+        ORDER BY s.id
+    """, ['total_sales', 'total_payments', 'outstanding'])
+
+def transactions(conn):
+    return _query_rows(conn, """
+        SELECT
+            t.id, t.date, t.seller_id, s.name as seller, t.transaction_type, t.amount,
+            COALESCE(i.invoice_number, a.invoice_number) as invoice_number, t.notes
+        FROM seller_transactions t
+        LEFT JOIN sellers s ON t.seller_id = s.id
+        LEFT JOIN invoices i ON t.invoice_id = i.id
+        LEFT JOIN archived_invoices a ON t.invoice_id = a.id
+        ORDER BY t.id
+    """, ['amount'])
+
+def invoices(conn):
+    return _query_rows(conn, """
+        SELECT
+            i.id, i.invoice_number, i.date, i.seller_id, s.name as seller,
+            i.payment_status, i.total_amount, COALESCE(b.paid_amount, 0) as paid_amount
+        FROM invoices i
+        LEFT JOIN sellers s ON i.seller_id = s.id
+        LEFT JOIN invoice_balances b ON i.id = b.invoice_id
+        ORDER BY i.id
+    """, ['total_amount', 'paid_amount'])
+
+def invoice_lines(conn):
+    """One row per invoice line, decoded from the stored invoice payloads"""
+    columns = ['invoice_number', 'date', 'seller'] + LINE_COLUMNS
+    rows = (
+        [invoice_number, date, seller] + [_value(item.get(column)) for column in LINE_COLUMNS]
+        for invoice_number, date, seller, item in _invoice_items(conn)
+    )
+    return columns, rows
+
+def monthly_sales(conn):
+    """Invoices and sales per month, including archived years"""
+    return _query_rows(conn, """
+        SELECT
+            strftime('%Y-%m', date) as month,
+            COUNT(*) as invoices,
+            SUM(total_amount) as total_sales,
+            SUM(CASE WHEN payment_status = 'credit' THEN total_amount ELSE 0 END) as credit_sales,
+            SUM(CASE WHEN payment_status = 'paid' THEN total_amount ELSE 0 END) as paid_sales
+        FROM (
+            SELECT date, total_amount, payment_status FROM invoices
+            UNION ALL
+            SELECT date, total_amount, payment_status FROM archived_invoices
+        )
+        GROUP BY month
+        ORDER BY month
+    """, ['total_sales', 'credit_sales', 'paid_sales'])
+
+def product_sales(conn):
+    """Quantity and sales per product over all stored invoice lines"""
+    totals = {}
+    for _, _, _, item in _invoice_items(conn):
+        key = (item.get('item_code'), item.get('item_name'))
+        quantity, amount, count = totals.get(key, (0, 0, 0))
+        # Summed in paise so the totals are exact
+        totals[key] = (
+            quantity + (_value(item.get('quantity')) or 0),
+            amount + (to_paise(_value(item.get('total_amount'))) or 0),
+            count + 1
+        )
+    columns = ['item_code', 'item_name', 'quantity_sold', 'total_sales', 'invoice_lines']
+    rows = (
+        [item_code, item_name, quantity, amount / PAISE_PER_RUPEE, count]
+        for (item_code, item_name), (quantity, amount, count) in sorted(
+            totals.items(), key=lambda entry: entry[1][1], reverse=True
+        )
+    )
+    return columns, rows
+
+def receivables_aging(conn):
+    # Imported here so the other exports work without pandas
+    from utils.ledger import get_receivables_aging
+    aging = get_receivables_aging(conn)
+    return list(aging.columns), (list(row) for row in aging.itertuples(index=False))
+
+# Text starting with one of these is read as a formula by Excel and LibreOffice
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+def _cell(value):
+    # Stray BLOBs (seller ids written as numpy int64 bytes) are read back as
+    # integers like migration 10 does, control characters Excel rejects are
+    # dropped from text, and text that would run as a formula is quoted
+    if isinstance(value, (bytes, memoryview)):
+        return int.from_bytes(bytes(value), 'little', signed=True)
+    if isinstance(value, str):
+        value = ILLEGAL_CHARACTERS_RE.sub('', value)
+        if value.startswith(FORMULA_PREFIXES):
+            value = "'" + value
+    return value
+
+# Export name -> (label, rows function returning (columns, row iterator))
+EXPORTS = {
+    'products': ("Products", products),
+    'sellers': ("Sellers", sellers),
+    'transactions': ("Seller transactions", transactions),
+    'invoices': ("Invoices", invoices),
+    'invoice_lines': ("Invoice line items", invoice_lines),
+    'monthly_sales': ("Monthly sales", monthly_sales),
+    'product_sales': ("Product sales", product_sales),
+    'receivables_aging': ("Receivables aging", receivables_aging),
+}
+
+def write_csv(f, columns, rows):
+    """Write rows to a text file object as CSV; returns the number of rows"""
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        count += 1
+    return count
+
+def write_xlsx(f, columns, rows, title):
+    """Write rows to a path or binary file object as a write-only workbook; returns the number of rows"""
+    workbook = Workbook(write_only=True)
+    sheet = None
+    count = 0
+    for row in rows:
+        if count % XLSX_MAX_ROWS == 0:
+            sheet = workbook.create_sheet(title if count == 0 else f"{title} {count // XLSX_MAX_ROWS + 1}")
+            header = []
+            for column in columns:
+                cell = WriteOnlyCell(sheet, value=column)
+                cell.font = Font(bold=True)
+                header.append(cell)
+            sheet.append(header)
+        sheet.append([_cell(value) for value in row])
+        count += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(columns)
+    workbook.save(f)
+    return count
+
+def _prune_exports(directory):
+    files = [os.path.join(directory, name) for name in os.listdir(directory)
+             if name.endswith(FORMATS) and not name.startswith('.')]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[Config.EXPORT_KEEP:]:
+        os.unlink(path)
+
+def export(conn, name, fmt='csv', out_dir=None):
+    """Write the named export as CSV or XLSX under out_dir (Config.EXPORT_DIR); returns (path, rows)"""
+    if name not in EXPORTS:
+        raise ValueError(f"Unknown export {name}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt}")
+    label, source = EXPORTS[name]
+    out_dir = out_dir or Config.EXPORT_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}")
+
+    # Written under a temporary name so a half-written export is never offered
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix='.', suffix='.tmp')
+    try:
+        columns, rows = source(conn)
+        if fmt == 'csv':
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                count = write_csv(f, columns, rows)
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                count = write_xlsx(f, columns, rows, label)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    logger.info(f"Exported {count} rows of {name} to {path}")
+    try:
+        _prune_exports(out_dir)
+    except OSError as e:
+        logger.warning(f"Could not prune old exports: {e}")
+    return path, count
+
+if __name__ == "__main__":
+    # python -m utils.exports NAME [csv|xlsx] [output directory]
+    from utils.db_manager import get_db_connection, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    if not 2 <= len(sys.argv) <= 4 or sys.argv[1] not in EXPORTS:
+        sys.exit(f"usage: python -m utils.exports {{{','.join(EXPORTS)}}} [csv|xlsx] [directory]")
+    init_db()
+    with get_db_connection() as conn:
+        path, count = export(conn, sys.argv[1], *sys.argv[2:])
+    print(f"{count} rows written to {path}")
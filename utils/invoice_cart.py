@@ -0,0 +1,115 @@
+import pandas as pd
+from inventory_core import INVOICE_ITEM_COLUMNS
+from utils.tax import line_amounts
+from utils.money import Money
+
+# Running totals kept by InvoiceCart; names match utils.tax.invoice_totals
+MONEY_FIELDS = ('gross_amount', 'discount_amount', 'taxable_value', 'gst_amount', 'total_amount')
+TOTAL_FIELDS = ('quantity',) + MONEY_FIELDS
+
+def _zero_totals():
+    totals = dict.fromkeys(MONEY_FIELDS, Money(0))
+    totals['quantity'] = 0
+    return totals
+
+def _line(product_id, item_name, item_code, quantity, price, discount_percentage, gst_percentage):
+    amounts = line_amounts(quantity, float(price), float(discount_percentage), float(gst_percentage))
+    return {
+        'product_id': product_id,
+        'item_name': item_name,
+        'item_code': item_code,
+        'quantity': int(quantity),
+        'price': float(price),
+        'discount_percentage': float(discount_percentage),
+        # Amounts are Money (paise) until to_dataframe
+        'discount_amount': amounts['discount_amount'],
+        'gst_percentage': float(gst_percentage),
+        'gst_amount': amounts['gst_amount'],
+        'total_amount': amounts['total_amount'],
+        # Not part of INVOICE_ITEM_COLUMNS; kept for the running totals
+        'gross_amount': amounts['gross_amount'],
+        'taxable_value': amounts['taxable_value']
+    }
+
+def _rate(value):
+    return 0.0 if value is None or pd.isna(value) else float(value)
+
+class InvoiceCart:
+    """Invoice lines keyed by product id, with running totals.
+
+    Adding, merging and removing a line touch only that line and the totals;
+    DataFrames are built only for the data editor, the PDF and saving.
+    """
+
+    def __init__(self):
+        self.lines = {}
+        self.totals = _zero_totals()
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __contains__(self, product_id):
+        return product_id in self.lines
+
+    @property
+    def empty(self):
+        return not self.lines
+
+    def _apply(self, line, sign):
+        for field in TOTAL_FIELDS:
+            self.totals[field] += sign * line[field]
+
+    def quantity_of(self, product_id):
+        line = self.lines.get(product_id)
+        return line['quantity'] if line else 0
+
+    def add(self, product_id, item_name, item_code, quantity, price, discount_percentage, gst_percentage):
+        """Add a product, merging with its existing line.
+
+        A merged line keeps one quantity total and takes the price, discount
+        and GST rate just entered.
+        """
+        quantity += self.quantity_of(product_id)
+        self.remove(product_id)
+        line = _line(product_id, item_name, item_code, quantity, price, discount_percentage, gst_percentage)
+        self.lines[product_id] = line
+        self._apply(line, 1)
+        return line
+
+    def remove(self, product_id):
+        line = self.lines.pop(product_id, None)
+        if line is not None:
+            self._apply(line, -1)
+        return line
+
+    def clear(self):
+        self.lines.clear()
+        self.totals = _zero_totals()
+
+    def to_dataframe(self):
+        """Lines as a DataFrame with product_id followed by INVOICE_ITEM_COLUMNS, amounts in rupees"""
+        df = pd.DataFrame(list(self.lines.values()), columns=['product_id'] + INVOICE_ITEM_COLUMNS)
+        for field in ('discount_amount', 'gst_amount', 'total_amount'):
+            df[field] = [line[field].rupees for line in self.lines.values()]
+        return df
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """A new cart built from a DataFrame, e.g. to total the data editor's unsaved edits"""
+        cart = cls()
+        cart.replace_from_dataframe(df)
+        return cart
+
+    def replace_from_dataframe(self, df):
+        """Rebuild the cart from an edited DataFrame, recomputing every line's amounts.
+
+        Rows without a product id (added by hand in the editor) are dropped.
+        """
+        self.clear()
+        for row in df.to_dict('records'):
+            if pd.isna(row.get('product_id')) or pd.isna(row.get('quantity')):
+                continue
+            self.add(
+                int(row['product_id']), row['item_name'], row['item_code'], int(row['quantity']),
+                row['price'], _rate(row.get('discount_percentage')), _rate(row.get('gst_percentage'))
+            )
@@ -0,0 +1,151 @@
+import re
+import sys
+import json
+import zlib
+import math
+import struct
+from array import array
+
+from utils.money import to_paise, PAISE_PER_RUPEE
+
+# Stored invoice_data payloads are MAGIC, a version byte, then a zlib stream of
+# typed columns: the row count, each text column as uint32 byte lengths followed
+# by the UTF-8 bytes, each rate column as float64 values (NaN for missing) and
+# each money column as int64 paise (MISSING_PAISE for missing). Version 1 had
+# no money columns and stored NUMERIC_COLUMNS as float64 rupees.
+# All integers and floats are little-endian.
+MAGIC = b'INVC'
+FORMAT_VERSION = 2
+
+TEXT_COLUMNS = ['item_name', 'item_code']
+NUMERIC_COLUMNS = ['quantity', 'price', 'discount_percentage', 'discount_amount',
+                   'gst_percentage', 'gst_amount', 'total_amount']
+RATE_COLUMNS = ['quantity', 'discount_percentage', 'gst_percentage']
+MONEY_COLUMNS = ['price', 'discount_amount', 'gst_amount', 'total_amount']
+COLUMNS = TEXT_COLUMNS + NUMERIC_COLUMNS
+
+MISSING_PAISE = -2 ** 63
+
+COMPRESSION_LEVEL = 6
+
+_ROW_COUNT = struct.Struct('<I')
+
+class PayloadError(ValueError):
+    """Raised when a stored invoice payload cannot be decoded"""
+
+def _records(items):
+    # DataFrames are accepted without importing pandas here
+    if hasattr(items, 'to_dict'):
+        return items.to_dict('records')
+    return list(items)
+
+def _text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    return str(value)
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _paise(value):
+    number = _number(value)
+    return MISSING_PAISE if math.isnan(number) else to_paise(number)
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def encode_invoice_items(items):
+    """Encode line items (a DataFrame or list of dicts with COLUMNS) as a compact payload"""
+    records = _records(items)
+    parts = [_ROW_COUNT.pack(len(records))]
+    for column in TEXT_COLUMNS:
+        encoded = [_text(record.get(column)).encode('utf-8') for record in records]
+        parts.append(_little_endian(array('I', map(len, encoded))).tobytes())
+        parts.append(b''.join(encoded))
+    for column in RATE_COLUMNS:
+        values = array('d', (_number(record.get(column)) for record in records))
+        parts.append(_little_endian(values).tobytes())
+    for column in MONEY_COLUMNS:
+        values = array('q', (_paise(record.get(column)) for record in records))
+        parts.append(_little_endian(values).tobytes())
+    return MAGIC + bytes([FORMAT_VERSION]) + zlib.compress(b''.join(parts), COMPRESSION_LEVEL)
+
+def _read_array(body, offset, typecode, rows):
+    values = array(typecode)
+    values.frombytes(body[offset:offset + values.itemsize * rows])
+    return _little_endian(values), offset + values.itemsize * rows
+
+def _decode_columns(body, float_columns, money_columns):
+    body = zlib.decompress(body)
+    (rows,) = _ROW_COUNT.unpack_from(body)
+    offset = _ROW_COUNT.size
+    columns = {}
+    for column in TEXT_COLUMNS:
+        lengths, offset = _read_array(body, offset, 'I', rows)
+        values = []
+        for length in lengths:
+            values.append(body[offset:offset + length].decode('utf-8'))
+            offset += length
+        columns[column] = values
+    for column in float_columns:
+        values, offset = _read_array(body, offset, 'd', rows)
+        columns[column] = values.tolist()
+    for column in money_columns:
+        # Decoded amounts are rupees, as in the DataFrames that were encoded
+        values, offset = _read_array(body, offset, 'q', rows)
+        columns[column] = [math.nan if paise == MISSING_PAISE else paise / PAISE_PER_RUPEE
+                           for paise in values]
+    if offset != len(body):
+        raise PayloadError("Invoice payload has trailing bytes")
+    return [{column: columns[column][i] for column in COLUMNS} for i in range(rows)]
+
+def _decode_v1(body):
+    return _decode_columns(body, NUMERIC_COLUMNS, [])
+
+def _decode_v2(body):
+    return _decode_columns(body, RATE_COLUMNS, MONEY_COLUMNS)
+
+_DECODERS = {1: _decode_v1, 2: _decode_v2}
+
+def _decode_json(text):
+    # Legacy rows hold DataFrame.to_json() output ({column: {index: value}}),
+    # and some older ones contain bare nan tokens
+    data = json.loads(re.sub(r'\bnan\b', 'null', text))
+    if isinstance(data, list):
+        return data
+    index = sorted({key for values in data.values() for key in values}, key=int)
+    return [{column: values.get(key) for column, values in data.items()} for key in index]
+
+def decode_invoice_items(payload):
+    """Decode a stored invoice_data payload into a list of item dicts.
+
+    Accepts the compact format, legacy JSON text, and zlib-compressed JSON.
+    Returns [] for an empty payload; raises PayloadError if it is unreadable.
+    """
+    if payload is None or len(payload) == 0:
+        return []
+    try:
+        if isinstance(payload, str):
+            return _decode_json(payload)
+        payload = bytes(payload)
+        if payload.startswith(MAGIC):
+            version = payload[len(MAGIC)]
+            if version not in _DECODERS:
+                raise PayloadError(f"Unsupported invoice payload version {version}")
+            return _DECODERS[version](payload[len(MAGIC) + 1:])
+        if payload[:1] == b'x':
+            payload = zlib.decompress(payload)
+        return _decode_json(payload.decode('utf-8'))
+    except PayloadError:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError, struct.error, zlib.error) as e:
+        raise PayloadError(f"Unreadable invoice payload: {e}") from e
+
+def is_current(payload):
+    """True if payload is already in the current compact format"""
+    return isinstance(payload, (bytes, memoryview)) and bytes(payload[:5]) == MAGIC + bytes([FORMAT_VERSION])
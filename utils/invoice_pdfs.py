@@ -0,0 +1,188 @@
+"""Stored invoice PDFs.
+
+Once an invoice is saved its final PDF is rendered in a worker process and
+written to Config.PDF_DIR under its SHA-256 (PDF_DIR/ab/abcd....pdf), so
+identical renders share one file and a stored file never changes. The path
+and hash are recorded on the invoice, and reprints read the file back.
+"""
+import os
+import sys
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from config import Config
+from utils.db_manager import get_db_connection
+from utils.pdf_generator import render_invoice, get_company_details
+from utils.invoice_codec import decode_invoice_items
+from utils.tax import compute_invoice_tax
+
+logger = logging.getLogger(__name__)
+
+# Reads from stored files are streamed in chunks of this size
+CHUNK_SIZE = 64 * 1024
+
+_executor = None
+_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Spawned, not forked: the Streamlit server is multi-threaded and a
+            # forked worker can inherit a lock held by another thread and hang
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.PDF_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    for chunk in read_pdf_chunks(path):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def _store_file(write, pdf_dir=None):
+    """Call write(f) on a temporary file, then move it under its hash; returns (path, sha256)"""
+    pdf_dir = pdf_dir or Config.PDF_DIR
+    os.makedirs(pdf_dir, exist_ok=True)
+    # Written beside its final place and renamed, so a reader never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=pdf_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        sha256 = _hash_file(tmp_path)
+        directory = os.path.join(pdf_dir, sha256[:2])
+        path = os.path.join(directory, f"{sha256}.pdf")
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path, sha256
+
+def store_pdf(data, pdf_dir=None):
+    """Write PDF bytes under their hash and return (path, sha256)"""
+    return _store_file(lambda f: f.write(data), pdf_dir)
+
+def _render_and_store(tax, seller_details, invoice_number, company_details, invoice_date, pdf_dir):
+    # Runs in a worker process; invariant output keeps re-renders byte-identical.
+    # The PDF goes straight to its file rather than through a buffer.
+    return _store_file(
+        lambda f: render_invoice(f, tax, seller_details, invoice_number, company_details,
+                                 invoice_date, invariant=True),
+        pdf_dir
+    )
+
+def _record_pdf(conn, invoice_id, path, sha256):
+    with conn:
+        conn.execute(
+            "UPDATE invoices SET pdf_path = ?, pdf_sha256 = ? WHERE id = ?",
+            (path, sha256, int(invoice_id))
+        )
+
+def _on_rendered(invoice_id, invoice_number, future):
+    try:
+        path, sha256 = future.result()
+        with get_db_connection() as conn:
+            _record_pdf(conn, invoice_id, path, sha256)
+        logger.info(f"Stored PDF for invoice {invoice_number} at {path}")
+    except Exception as e:
+        logger.error(f"Rendering PDF for invoice {invoice_number} failed: {e}")
+
+def queue_invoice_pdf(conn, invoice_id, invoice_number, tax, seller_details, invoice_date=None):
+    """Render and store a saved invoice's PDF in the background.
+
+    Call after the invoice is committed. Returns the Future, which resolves to
+    (path, sha256) once the file is written; the invoice row is updated then.
+    """
+    future = _get_executor().submit(
+        _render_and_store, tax, seller_details, invoice_number,
+        get_company_details(conn), invoice_date, Config.PDF_DIR
+    )
+    future.add_done_callback(lambda f: _on_rendered(invoice_id, invoice_number, f))
+    return future
+
+def _stored_invoice(conn, invoice_id):
+    row = conn.execute("""
+        SELECT i.invoice_number, i.invoice_data, i.date, i.payment_status,
+               s.name, s.address, s.phone, s.gstin
+        FROM invoices i
+        LEFT JOIN sellers s ON i.seller_id = s.id
+        WHERE i.id = ?
+    """, (int(invoice_id),)).fetchone()
+    if row is None:
+        raise ValueError(f"Invoice {invoice_id} not found")
+    invoice_number, invoice_data, invoice_date, payment_status, name, address, phone, gstin = row
+    seller_details = {
+        'name': name or '', 'address': address or '', 'phone': phone or '',
+        'gstin': gstin or '', 'payment_status': payment_status or ''
+    }
+    tax = compute_invoice_tax(conn, pd.DataFrame(decode_invoice_items(invoice_data)), gstin)
+    return invoice_number, tax, seller_details, invoice_date
+
+def render_stored_invoice(conn, invoice_id):
+    """Render and store the PDF of an invoice saved earlier, in this process.
+
+    Line amounts are recomputed from the stored items. Returns (path, sha256).
+    """
+    invoice_number, tax, seller_details, invoice_date = _stored_invoice(conn, invoice_id)
+    path, sha256 = _render_and_store(
+        tax, seller_details, invoice_number, get_company_details(conn), invoice_date, Config.PDF_DIR
+    )
+    _record_pdf(conn, invoice_id, path, sha256)
+    return path, sha256
+
+def get_invoice_pdf(conn, invoice_id):
+    """(path, sha256) of an invoice's stored PDF, or None if it is not stored (yet) or fails verify_pdf"""
+    row = conn.execute(
+        "SELECT pdf_path, pdf_sha256 FROM invoices WHERE id = ?", (int(invoice_id),)
+    ).fetchone()
+    if row is None or not row[0] or not os.path.exists(row[0]):
+        return None
+    if not verify_pdf(*row):
+        # Served as a reprint it would no longer be the invoice that was issued
+        logger.warning(f"Stored PDF {row[0]} of invoice {invoice_id} does not match its hash")
+        return None
+    return row[0], row[1]
+
+def read_pdf_chunks(path):
+    """Yield a stored PDF in CHUNK_SIZE pieces"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def verify_pdf(path, sha256):
+    """True if the file at path still hashes to sha256"""
+    return _hash_file(path) == sha256
+
+if __name__ == "__main__":
+    # Store PDFs for invoices saved before this existed: python -m utils.invoice_pdfs --backfill
+    from utils.db_manager import init_db
+
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ['--backfill']:
+        sys.exit("usage: python -m utils.invoice_pdfs --backfill")
+    init_db()
+    with get_db_connection() as conn:
+        missing = [row[0] for row in conn.execute(
+            "SELECT id FROM invoices WHERE pdf_path IS NULL ORDER BY id"
+        ).fetchall()]
+        rendered = 0
+        for invoice_id in missing:
+            try:
+                render_stored_invoice(conn, invoice_id)
+                rendered += 1
+            except Exception as e:
+                logger.error(f"Could not render invoice {invoice_id}: {e}")
+    print(f"Rendered {rendered} of {len(missing)} invoice PDFs")
@@ -0,0 +1,340 @@
+import sys
+import logging
+from datetime import date
+import pandas as pd
+from utils.pagination import fetch_page
+from utils.money import rupee_columns, to_rupees
+from utils.dates import to_iso_date
+
+logger = logging.getLogger(__name__)
+
+# Amounts are stored as integer paise (utils.money) and converted to rupees
+# in the DataFrames returned to the pages, so ledger checks compare exactly
+SELLER_MONEY_COLUMNS = ['total_credit', 'total_sales', 'total_payments', 'remaining_credit',
+                        'total_credit_sales', 'total_paid_sales', 'pending_amount']
+
+# Number of sellers reconciled per GROUP BY pass
+RECONCILE_BATCH_SIZE = 1000
+
+# Sort keys offered by the sellers list, mapped to non-NULL columns of the ledger query
+SELLER_SORT_COLUMNS = {
+    'name': 'name',
+    'total_sales': 'total_sales',
+    'remaining_credit': 'remaining_credit',
+    'last_invoice_date': 'last_invoice_date'
+}
+
+def _seller_search_clause(search):
+    if not search:
+        return "", []
+    pattern = f"%{search}%"
+    return (
+        "WHERE s.name LIKE ? OR s.phone LIKE ? OR s.gstin LIKE ?",
+        [pattern, pattern, pattern]
+    )
+
+def _date_range_clause(column, start=None, end=None):
+    # ISO dates compare as text, so the range is an index seek on (seller_id, date)
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(to_iso_date(start))
+    if end is not None:
+        clauses.append(f"{column} <= ?")
+        params.append(to_iso_date(end))
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+def get_seller_ledger_page(conn, search='', sort='name', descending=False, cursor=None, page_size=50):
+    """One page of per-seller sales and payment totals, served from seller_balances"""
+    where, params = _seller_search_clause(search)
+    query = f"""
+        SELECT
+            s.*,
+            COALESCE(b.total_invoices, 0) as total_invoices,
+            COALESCE(b.total_sales, 0) as total_sales,
+            COALESCE(b.last_invoice_date, '') as last_invoice_date,
+            COALESCE(b.total_payments, 0) as total_payments,
+            COALESCE(s.total_credit, 0) as remaining_credit
+        FROM sellers s
+        LEFT JOIN seller_balances b ON s.id = b.seller_id
+        {where}
+    """
+    df, next_cursor = fetch_page(
+        conn, query, params, SELLER_SORT_COLUMNS[sort], descending, cursor, page_size
+    )
+    df['last_invoice_date'] = df['last_invoice_date'].replace('', None)
+    return rupee_columns(df, SELLER_MONEY_COLUMNS), next_cursor
+
+def get_seller_ledger_totals(conn, search=''):
+    """Totals across all sellers matching the search, for the summary metrics"""
+    where, params = _seller_search_clause(search)
+    row = conn.execute(f"""
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(b.total_sales), 0),
+            COALESCE(SUM(b.total_payments), 0),
+            COALESCE(SUM(MAX(COALESCE(s.total_credit, 0), 0)), 0)
+        FROM sellers s
+        LEFT JOIN seller_balances b ON s.id = b.seller_id
+        {where}
+    """, params).fetchone()
+    return {
+        'total_sellers': row[0],
+        'total_sales': to_rupees(row[1]),
+        'total_payments': to_rupees(row[2]),
+        'total_outstanding': to_rupees(row[3])
+    }
+
+def search_sellers(conn, search='', limit=50):
+    """Sellers matching name, phone or GSTIN, limited to one page of options"""
+    where, params = _seller_search_clause(search)
+    return pd.read_sql_query(f"""
+        SELECT s.id, s.name, s.address, s.phone, s.gstin
+        FROM sellers s
+        {where}
+        ORDER BY s.name, s.id
+        LIMIT ?
+    """, conn, params=params + [limit])
+
+def get_seller_summary(conn, seller_id):
+    """Credit summary for a single seller, served from seller_balances"""
+    summary = pd.read_sql_query("""
+        SELECT
+            s.*,
+            COALESCE(b.total_invoices, 0) as total_invoices,
+            COALESCE(b.total_sales, 0) as total_sales,
+            COALESCE(b.credit_sales, 0) as total_credit_sales,
+            COALESCE(b.paid_sales, 0) as total_paid_sales,
+            COALESCE(b.total_payments, 0) as total_payments,
+            s.total_credit as pending_amount
+        FROM sellers s
+        LEFT JOIN seller_balances b ON s.id = b.seller_id
+        WHERE s.id = ?
+    """, conn, params=(int(seller_id),))
+    return rupee_columns(summary, SELLER_MONEY_COLUMNS)
+
+def get_seller_transactions_page(conn, seller_id, cursor=None, page_size=50, start=None, end=None):
+    """One page of a seller's ledger entries, newest first, optionally dated start to end inclusive"""
+    dates, date_params = _date_range_clause('t.date', start, end)
+    query = f"""
+        SELECT
+            t.id,
+            COALESCE(t.date, '') as date,
+            t.amount,
+            t.transaction_type,
+            t.notes,
+            COALESCE(i.invoice_number, a.invoice_number) as invoice_number,
+            COALESCE(i.total_amount, a.total_amount) as invoice_amount
+        FROM seller_transactions t
+        LEFT JOIN invoices i ON t.invoice_id = i.id
+        LEFT JOIN archived_invoices a ON t.invoice_id = a.id
+        WHERE t.seller_id = ?{dates}
+    """
+    df, next_cursor = fetch_page(conn, query, [int(seller_id)] + date_params, 'date', True, cursor, page_size)
+    return rupee_columns(df, ['amount', 'invoice_amount']), next_cursor
+
+def get_seller_invoices_page(conn, seller_id, cursor=None, page_size=50, start=None, end=None):
+    """One page of a seller's invoices with their paid amount, newest first.
+
+    Includes the headers of archived invoices so the history stays complete.
+    start and end optionally limit it to invoices dated between them, inclusive.
+    """
+    dates, date_params = _date_range_clause('date', start, end)
+    query = f"""
+        SELECT
+            i.id,
+            i.invoice_number,
+            i.total_amount,
+            i.payment_status,
+            COALESCE(i.date, '') as date,
+            COALESCE(b.paid_amount, 0) as paid_amount
+        FROM (
+            SELECT id, invoice_number, total_amount, payment_status, date, seller_id
+            FROM invoices
+            WHERE seller_id = ?{dates}
+            UNION ALL
+            SELECT id, invoice_number, total_amount, payment_status, date, seller_id
+            FROM archived_invoices
+            WHERE seller_id = ?{dates}
+        ) i
+        LEFT JOIN invoice_balances b ON i.id = b.invoice_id
+    """
+    params = ([int(seller_id)] + date_params) * 2
+    df, next_cursor = fetch_page(conn, query, params, 'date', True, cursor, page_size)
+    return rupee_columns(df, ['total_amount', 'paid_amount']), next_cursor
+
+AGING_COLUMNS = ['days_0_30', 'days_31_60', 'days_61_90', 'days_over_90', 'total_outstanding']
+
+def get_receivables_aging(conn, as_of=None):
+    """Outstanding credit per seller by age, in rupees, largest balance first.
+
+    Each credit sale dated on or before as_of (by default today) falls in a
+    bucket by its age in days at as_of, less the payments allocated to it by
+    utils.allocations that were dated by then, so a past as_of shows the
+    balances as they stood that day. All sellers are covered by a single
+    grouped pass.
+    """
+    as_of = to_iso_date(as_of or date.today())
+    df = pd.read_sql_query("""
+        WITH allocated AS (
+            SELECT a.credit_id, SUM(a.amount) AS amount
+            FROM payment_allocations a
+            JOIN seller_transactions p ON p.id = a.payment_id
+            WHERE p.date <= :as_of
+            GROUP BY a.credit_id
+        ), open_credits AS (
+            SELECT
+                t.seller_id,
+                t.date,
+                t.amount - COALESCE(a.amount, 0) AS outstanding,
+                julianday(:as_of) - julianday(t.date) AS age
+            FROM seller_transactions t
+            LEFT JOIN allocated a ON a.credit_id = t.id
+            WHERE t.transaction_type = 'credit'
+                AND (t.date <= :as_of OR julianday(t.date) IS NULL)
+        )
+        SELECT
+            s.id as seller_id,
+            s.name,
+            s.phone,
+            SUM(CASE WHEN o.age <= 30 THEN o.outstanding ELSE 0 END) as days_0_30,
+            SUM(CASE WHEN o.age > 30 AND o.age <= 60 THEN o.outstanding ELSE 0 END) as days_31_60,
+            SUM(CASE WHEN o.age > 60 AND o.age <= 90 THEN o.outstanding ELSE 0 END) as days_61_90,
+            -- Credits with an unreadable date count as the oldest
+            SUM(CASE WHEN o.age > 90 OR o.age IS NULL THEN o.outstanding ELSE 0 END) as days_over_90,
+            SUM(o.outstanding) as total_outstanding,
+            MIN(o.date) as oldest_open_date
+        FROM open_credits o
+        JOIN sellers s ON s.id = o.seller_id
+        WHERE o.outstanding > 0
+        GROUP BY s.id
+        ORDER BY total_outstanding DESC, s.id
+    """, conn, params={'as_of': as_of})
+    return rupee_columns(df, AGING_COLUMNS)
+
+def recompute_seller_ledger(conn):
+    """Naively recompute per-seller figures, in paise, from invoices and seller_transactions.
+
+    Slow on large histories; used only to check the pre-aggregated tables.
+    """
+    return pd.read_sql_query("""
+        WITH all_invoices AS (
+            SELECT seller_id, total_amount, payment_status, date FROM invoices
+            UNION ALL
+            SELECT seller_id, total_amount, payment_status, date FROM archived_invoices
+        )
+        SELECT
+            s.id as seller_id,
+            (SELECT COUNT(*) FROM all_invoices i WHERE i.seller_id = s.id) as total_invoices,
+            (SELECT COALESCE(SUM(total_amount), 0) FROM all_invoices i
+             WHERE i.seller_id = s.id) as total_sales,
+            (SELECT COALESCE(SUM(total_amount), 0) FROM all_invoices i
+             WHERE i.seller_id = s.id AND i.payment_status = 'credit') as credit_sales,
+            (SELECT COALESCE(SUM(total_amount), 0) FROM all_invoices i
+             WHERE i.seller_id = s.id AND i.payment_status = 'paid') as paid_sales,
+            (SELECT COALESCE(SUM(amount), 0) FROM seller_transactions t
+             WHERE t.seller_id = s.id AND t.transaction_type = 'payment') as total_payments,
+            (SELECT MAX(date) FROM all_invoices i WHERE i.seller_id = s.id) as last_invoice_date
+        FROM sellers s
+        ORDER BY s.id
+    """, conn)
+
+def verify_seller_ledger(conn):
+    """Compare seller_balances against a naive recompute.
+
+    Returns a list of (seller_id, column, stored, expected) mismatches; an
+    empty list means the pre-aggregated figures are correct.
+    """
+    expected = recompute_seller_ledger(conn).set_index('seller_id')
+    stored = pd.read_sql_query(
+        "SELECT * FROM seller_balances", conn
+    ).set_index('seller_id').reindex(expected.index)
+
+    mismatches = []
+    for seller_id, row in expected.iterrows():
+        for column, expected_value in row.items():
+            stored_value = stored.at[seller_id, column]
+            if column == 'last_invoice_date':
+                same = (pd.isna(stored_value) and pd.isna(expected_value)) or stored_value == expected_value
+            else:
+                same = not pd.isna(stored_value) and int(stored_value) == int(expected_value)
+            if not same:
+                mismatches.append((int(seller_id), column, stored_value, expected_value))
+
+    if mismatches:
+        logger.warning(f"Seller ledger has {len(mismatches)} mismatches against a full recompute")
+    return mismatches
+
+def reconcile_seller_credit(conn, repair=False, batch_size=RECONCILE_BATCH_SIZE):
+    """Check sellers.total_credit against the seller_transactions ledger.
+
+    The ledger is append-only and is the single source of truth: a seller's
+    credit is the sum of their credit entries minus their payments. Sellers
+    are processed in id batches, each with a single GROUP BY over the ledger.
+    Returns a list of (seller_id, stored, expected) divergences in paise; with
+    repair=True the stored balances are overwritten with the ledger values.
+    """
+    divergences = []
+    last_id = 0
+
+    while True:
+        sellers = conn.execute("""
+            SELECT id, total_credit FROM sellers
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not sellers:
+            break
+
+        upper_id = sellers[-1][0]
+        ledger = dict(conn.execute("""
+            SELECT
+                seller_id,
+                SUM(CASE WHEN transaction_type = 'credit' THEN amount ELSE -amount END)
+            FROM seller_transactions
+            WHERE seller_id > ? AND seller_id <= ?
+            GROUP BY seller_id
+        """, (last_id, upper_id)).fetchall())
+
+        batch = []
+        for seller_id, stored in sellers:
+            expected = ledger.get(seller_id, 0)
+            if stored != expected:
+                batch.append((seller_id, stored, expected))
+
+        if batch and repair:
+            # A savepoint commits on its own but nests inside a caller's
+            # transaction, such as a migration's
+            conn.execute("SAVEPOINT reconcile_credit")
+            try:
+                conn.executemany(
+                    "UPDATE sellers SET total_credit = ? WHERE id = ?",
+                    [(expected, seller_id) for seller_id, _, expected in batch]
+                )
+            except Exception:
+                conn.execute("ROLLBACK TO reconcile_credit")
+                raise
+            finally:
+                conn.execute("RELEASE reconcile_credit")
+        divergences.extend(batch)
+        last_id = upper_id
+
+    if divergences:
+        action = "repaired" if repair else "found"
+        logger.warning(f"Credit reconciliation {action} {len(divergences)} diverging seller balances")
+    return divergences
+
+if __name__ == "__main__":
+    # Run periodically, e.g. from cron: python -m utils.ledger [--repair]
+    from utils.db_manager import get_db_connection
+    from utils.money import format_inr
+
+    logging.basicConfig(level=logging.INFO)
+    repair = '--repair' in sys.argv[1:]
+    with get_db_connection() as conn:
+        divergences = reconcile_seller_credit(conn, repair=repair)
+    for seller_id, stored, expected in divergences:
+        stored = 'missing' if stored is None else format_inr(stored)
+        print(f"seller {seller_id}: stored {stored}, ledger {format_inr(expected)}")
+    print(f"{len(divergences)} diverging balances{' repaired' if repair and divergences else ''}")
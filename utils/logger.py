@@ -1,27 +1,130 @@
-import logging
 import os
-from datetime import datetime
 import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import Config
+
+# Attribute set on the root QueueHandler so configuration survives module reloads
+_MARKER = '_inventory_log_queue'
+
+_configure_lock = threading.Lock()
+
+# The app's own loggers; main.py is '__main__' under `streamlit run`
+_APP_LOGGERS = ('utils', 'pages', 'inventory_core', 'main', '__main__')
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file reaches maxBytes or at midnight, whichever comes first"""
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding=None):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self.rollover_at = self._next_midnight()
+
+    @staticmethod
+    def _next_midnight():
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return time.mktime(tomorrow.timetuple())
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_midnight()
+
+class DebugSampler(logging.Filter):
+    """Keep only every Nth DEBUG record per call site; other levels pass through"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self.counts = {}
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        return count % self.every == 0
+
+def configure_logging():
+    """Route all logging through a queue to rotating JSON-lines and console handlers.
+
+    Safe to call repeatedly: handlers are attached once per process, and file
+    I/O happens on the QueueListener thread rather than the caller's.
+    """
+    root = logging.getLogger()
+    with _configure_lock:
+        if any(getattr(handler, _MARKER, False) for handler in root.handlers):
+            return
+
+        os.makedirs(Config.LOG_DIR, exist_ok=True)
+
+        file_handler = SizeAndTimeRotatingFileHandler(
+            os.path.join(Config.LOG_DIR, Config.LOG_FILE),
+            maxBytes=Config.LOG_MAX_BYTES,
+            backupCount=Config.LOG_BACKUPS,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter())
+
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        console_handler.setLevel(Config.LOG_LEVEL)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        setattr(queue_handler, _MARKER, True)
+
+        # Sampled DEBUG records reach the file only, and only from the app's
+        # loggers: root stays at LOG_LEVEL so third-party libraries don't
+        # build DEBUG records just for them to be dropped
+        file_handler.setLevel(Config.LOG_LEVEL)
+        if Config.LOG_DEBUG_SAMPLE_EVERY:
+            queue_handler.addFilter(DebugSampler(Config.LOG_DEBUG_SAMPLE_EVERY))
+            file_handler.setLevel(logging.DEBUG)
+            for name in _APP_LOGGERS:
+                logging.getLogger(name).setLevel(logging.DEBUG)
+
+        listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        root.addHandler(queue_handler)
+        root.setLevel(Config.LOG_LEVEL)
 
-def setup_logger():
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    # Create a logger
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    
-    # Create handlers
-    console_handler = logging.StreamHandler(sys.stdout)
-    file_handler = logging.FileHandler(f'logs/app_{datetime.now().strftime("%Y%m%d")}.log')
-    
-    # Create formatters and add it to handlers
-    log_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(log_format)
-    file_handler.setFormatter(log_format)
-    
-    # Add handlers to the logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
-    return logger 
\ No newline at end of file
+def setup_logger(name=None):
+    """Configure logging if needed and return a logger; prefer logging.getLogger(__name__)"""
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,649 @@
+import os
+import re
+import sys
+import sqlite3
+import logging
+import threading
+from config import Config
+from utils.invoice_codec import encode_invoice_items, decode_invoice_items, is_current, PayloadError
+from utils.dates import to_iso_date
+from utils.allocations import allocate_payments
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schema.sql')
+
+_lock = threading.Lock()
+_migrated = set()
+
+def _split_statements(script):
+    """Split a SQL script into complete statements, keeping trigger bodies intact"""
+    statements = []
+    current = ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            if current.strip():
+                statements.append(current.strip())
+            current = ''
+    if current.strip() and not current.strip().startswith('--'):
+        statements.append(current.strip())
+    return statements
+
+def _execute_script(conn, script):
+    # executescript() would commit the migration's transaction, so run
+    # the statements one by one instead
+    for statement in _split_statements(script):
+        conn.execute(statement)
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _baseline(conn):
+    """Create every table, index and trigger from schema.sql"""
+    with open(SCHEMA_PATH, 'r') as f:
+        _execute_script(conn, f.read())
+
+def _legacy_columns(conn):
+    """Add columns missing from databases created by older versions of main.py"""
+    sellers = _columns(conn, 'sellers')
+    # ALTER TABLE cannot add a column with a CURRENT_TIMESTAMP default, so backfill instead.
+    # update_seller_credit writes updated_at and fails without it
+    for column in ('created_at', 'updated_at'):
+        if column not in sellers:
+            conn.execute(f"ALTER TABLE sellers ADD COLUMN {column} TEXT")
+            conn.execute(f"UPDATE sellers SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL")
+    if 'pdf_path' not in _columns(conn, 'invoices'):
+        conn.execute("ALTER TABLE invoices ADD COLUMN pdf_path TEXT")
+
+def _archive_tables(conn):
+    """Hot-side headers and per-year totals for invoices moved by utils.archive"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archived_invoices (
+            id INTEGER PRIMARY KEY,
+            invoice_number TEXT UNIQUE,
+            total_amount REAL,
+            date TEXT,
+            seller_id INTEGER,
+            payment_status TEXT,
+            financial_year TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_invoices_seller ON archived_invoices(seller_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_summary (
+            financial_year TEXT PRIMARY KEY,
+            invoice_count INTEGER,
+            total_amount REAL,
+            archived_at TEXT
+        )
+    """)
+
+def _compact_invoice_payloads(conn):
+    """Re-encode JSON invoice_data rows in the compact utils.invoice_codec format"""
+    rows = conn.execute("SELECT id, invoice_data FROM invoices WHERE invoice_data IS NOT NULL")
+    updates = []
+    for invoice_id, payload in rows.fetchall():
+        if is_current(payload):
+            continue
+        try:
+            updates.append((encode_invoice_items(decode_invoice_items(payload)), invoice_id))
+        except PayloadError as e:
+            # Leave the row as it was; the decoder still reads whatever it can
+            logger.warning(f"Keeping invoice {invoice_id} payload unconverted: {e}")
+    conn.executemany("UPDATE invoices SET invoice_data = ? WHERE id = ?", updates)
+    logger.info(f"Re-encoded {len(updates)} invoice payloads")
+
+STOCK_MOVEMENTS_SQL = """
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER NOT NULL,
+    movement_type TEXT NOT NULL
+        CHECK (movement_type IN ('opening', 'purchase', 'sale', 'adjustment', 'return')),
+    quantity INTEGER NOT NULL,       -- signed change in stock
+    balance_after INTEGER NOT NULL,  -- products.quantity after this movement
+    date TEXT NOT NULL,
+    invoice_id INTEGER,
+    notes TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (product_id) REFERENCES products (id),
+    FOREIGN KEY (invoice_id) REFERENCES invoices (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_product_date ON stock_movements(product_id, date, id);
+
+-- Month-end stock per product, for valuing inventory over time
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+    snapshot_date TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    buying_price REAL,
+    PRIMARY KEY (snapshot_date, product_id)
+);
+
+-- Opening balances for stock that predates the ledger, dated when it was
+-- bought if that is known
+INSERT INTO stock_movements (product_id, movement_type, quantity, balance_after, date, notes)
+SELECT id, 'opening', quantity, quantity,
+       COALESCE(date(date_purchased), date('now', 'localtime')), 'Opening balance'
+FROM products
+WHERE COALESCE(quantity, 0) != 0
+  AND NOT EXISTS (SELECT 1 FROM stock_movements m WHERE m.product_id = products.id);
+
+UPDATE products SET quantity = 0 WHERE quantity IS NULL;
+
+-- Each movement must continue the product's running balance
+CREATE TRIGGER IF NOT EXISTS stock_movements_check_balance
+BEFORE INSERT ON stock_movements
+BEGIN
+    SELECT RAISE(ABORT, 'stock movement for unknown product')
+    WHERE NOT EXISTS (SELECT 1 FROM products WHERE id = NEW.product_id);
+    SELECT RAISE(ABORT, 'stock movement balance does not follow current stock')
+    WHERE NEW.balance_after IS NOT
+        (SELECT quantity FROM products WHERE id = NEW.product_id) + NEW.quantity;
+    SELECT RAISE(ABORT, 'stock cannot go below zero')
+    WHERE NEW.balance_after < 0;
+END;
+
+-- The only writer of products.quantity, which caches the latest balance_after
+CREATE TRIGGER IF NOT EXISTS stock_movements_update_quantity
+AFTER INSERT ON stock_movements
+BEGIN
+    UPDATE products SET quantity = NEW.balance_after WHERE id = NEW.product_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_quantity_from_ledger
+BEFORE UPDATE OF quantity ON products
+WHEN NEW.quantity IS NOT OLD.quantity
+    AND NEW.quantity IS NOT (
+        SELECT balance_after FROM stock_movements
+        WHERE product_id = NEW.id
+        ORDER BY id DESC LIMIT 1
+    )
+BEGIN
+    SELECT RAISE(ABORT, 'products.quantity is maintained by stock_movements');
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_insert_without_stock
+BEFORE INSERT ON products
+WHEN COALESCE(NEW.quantity, 0) != 0
+BEGIN
+    SELECT RAISE(ABORT, 'new products start at zero stock; record a purchase movement');
+END;
+
+CREATE TRIGGER IF NOT EXISTS stock_movements_no_update
+BEFORE UPDATE ON stock_movements
+BEGIN
+    SELECT RAISE(ABORT, 'stock_movements is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS stock_movements_no_delete
+BEFORE DELETE ON stock_movements
+BEGIN
+    SELECT RAISE(ABORT, 'stock_movements is append-only');
+END;
+"""
+
+def _stock_movements(conn):
+    """Append-only stock ledger that maintains products.quantity"""
+    _execute_script(conn, STOCK_MOVEMENTS_SQL)
+
+# Money columns converted from REAL rupees to INTEGER paise (utils.money)
+MONEY_COLUMNS = {
+    'products': ['buying_price', 'selling_price'],
+    'sellers': ['total_credit'],
+    'invoices': ['total_amount'],
+    'seller_transactions': ['amount'],
+    'seller_balances': ['total_sales', 'credit_sales', 'paid_sales', 'total_payments'],
+    'invoice_balances': ['total_amount', 'paid_amount'],
+    'archived_invoices': ['total_amount'],
+    'archive_summary': ['total_amount'],
+    'stock_snapshots': ['buying_price'],
+}
+
+def _drop_triggers(conn, table=None):
+    """Drop the triggers on table (or every trigger) and return their SQL"""
+    query = "SELECT sql, name FROM sqlite_master WHERE type = 'trigger'"
+    params = ()
+    if table is not None:
+        query += " AND tbl_name = ?"
+        params = (table,)
+    triggers = conn.execute(query, params).fetchall()
+    for _, name in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    return [sql for sql, _ in triggers]
+
+def _restore_triggers(conn, triggers):
+    for sql in triggers:
+        conn.execute(sql)
+
+def _integer_table_sql(sql, table, columns):
+    sql = re.sub(rf'^CREATE TABLE\s+(IF NOT EXISTS\s+)?["`]?{table}["`]?', f'CREATE TABLE {table}_new', sql)
+    for column in columns:
+        sql, count = re.subn(rf'(\b{column}\s+)REAL\b', r'\1INTEGER', sql, flags=re.IGNORECASE)
+        if count != 1:
+            raise RuntimeError(f"Cannot find REAL column {table}.{column}")
+        sql = re.sub(rf'(\b{column}\s+INTEGER\b[^,]*?DEFAULT\s+)0\.0\b', r'\g<1>0', sql)
+    return sql
+
+def _integer_money(conn):
+    """Store money as INTEGER paise instead of REAL rupees.
+
+    A column's declared type decides how SQLite stores values, so each table is
+    rebuilt rather than updated in place. Triggers are dropped first because
+    renaming a table re-checks every trigger, and restored unchanged at the end.
+    Invoice payloads are re-encoded so line amounts are paise as well.
+    """
+    triggers = _drop_triggers(conn)
+    has_sequence = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'"
+    ).fetchone() is not None
+
+    for table, money_columns in MONEY_COLUMNS.items():
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if row is None:
+            continue
+        indexes = [sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+        )]
+        sequence = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)
+        ).fetchone() if has_sequence else None
+
+        conn.execute(_integer_table_sql(row[0], table, money_columns))
+        columns = _columns(conn, table)
+        select = ', '.join(
+            f"CAST(ROUND({column} * 100) AS INTEGER)" if column in money_columns else column
+            for column in columns
+        )
+        conn.execute(f"INSERT INTO {table}_new ({', '.join(columns)}) SELECT {select} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        for sql in indexes:
+            conn.execute(sql)
+        if sequence is not None:
+            # Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+            conn.execute(f"""
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT ?, MAX(?, COALESCE(MAX(id), 0)) FROM {table}
+            """, (table, sequence[0]))
+
+    _restore_triggers(conn, triggers)
+    _compact_invoice_payloads(conn)
+
+# Date columns kept as ISO 'YYYY-MM-DD' text (utils.dates)
+DATE_COLUMNS = {
+    'products': 'date_purchased',
+    'invoices': 'date',
+    'seller_transactions': 'date',
+    'archived_invoices': 'date',
+    'stock_movements': 'date',
+    'stock_snapshots': 'snapshot_date',
+}
+
+ISO_DATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_{column}_iso_{event}
+BEFORE {event_sql} ON {table}
+WHEN NEW.{column} IS NOT NULL AND NEW.{column} IS NOT date(NEW.{column})
+BEGIN
+    SELECT RAISE(ABORT, '{table}.{column} must be an ISO date (YYYY-MM-DD)');
+END
+"""
+
+DATE_INDEXES_SQL = """
+-- Range filters and date-ordered pages per seller seek on these
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices(date);
+CREATE INDEX IF NOT EXISTS idx_invoices_seller_date ON invoices(seller_id, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON seller_transactions(date);
+CREATE INDEX IF NOT EXISTS idx_transactions_seller_date ON seller_transactions(seller_id, date);
+CREATE INDEX IF NOT EXISTS idx_archived_invoices_seller_date ON archived_invoices(seller_id, date);
+
+-- Covered by the (seller_id, date) indexes above
+DROP INDEX IF EXISTS idx_invoices_seller;
+DROP INDEX IF EXISTS idx_transactions_seller;
+DROP INDEX IF EXISTS idx_archived_invoices_seller;
+"""
+
+def _normalize_dates(conn, table, column):
+    rows = conn.execute(f"""
+        SELECT rowid, {column} FROM {table}
+        WHERE {column} IS NOT NULL AND {column} IS NOT date({column})
+    """).fetchall()
+    updates = []
+    for rowid, value in rows:
+        try:
+            updates.append((to_iso_date(value), rowid))
+        except ValueError:
+            # Left as it was; only new writes are checked
+            logger.warning(f"Keeping unreadable {table}.{column} {value!r} (rowid {rowid})")
+    if updates:
+        # Append-only tables reject updates, so their triggers step aside
+        triggers = _drop_triggers(conn, table)
+        conn.executemany(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", updates)
+        _restore_triggers(conn, triggers)
+        logger.info(f"Normalized {len(updates)} {table}.{column} values")
+    return len(updates)
+
+def _iso_dates(conn):
+    """Normalize dates to ISO text, reject anything else, and index them"""
+    changed = {table: _normalize_dates(conn, table, column) for table, column in DATE_COLUMNS.items()}
+    if changed['invoices'] or changed['archived_invoices']:
+        conn.execute("""
+            UPDATE seller_balances SET last_invoice_date = (
+                SELECT MAX(date) FROM (
+                    SELECT date FROM invoices WHERE seller_id = seller_balances.seller_id
+                    UNION ALL
+                    SELECT date FROM archived_invoices WHERE seller_id = seller_balances.seller_id
+                )
+            )
+        """)
+    for table, column in DATE_COLUMNS.items():
+        for event, event_sql in (('insert', 'INSERT'), ('update', f'UPDATE OF {column}')):
+            conn.execute(ISO_DATE_TRIGGER.format(table=table, column=column, event=event, event_sql=event_sql))
+    _execute_script(conn, DATE_INDEXES_SQL)
+
+def _invoice_pdf_hash(conn):
+    """Hash of the stored PDF written by utils.invoice_pdfs, next to its pdf_path"""
+    if 'pdf_sha256' not in _columns(conn, 'invoices'):
+        conn.execute("ALTER TABLE invoices ADD COLUMN pdf_sha256 TEXT")
+
+PAYMENT_ALLOCATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS payment_allocations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payment_id INTEGER NOT NULL,  -- seller_transactions entry of the payment
+    credit_id INTEGER NOT NULL,   -- seller_transactions entry of the credit sale
+    invoice_id INTEGER,
+    seller_id INTEGER NOT NULL,
+    amount INTEGER NOT NULL CHECK (amount > 0),
+    FOREIGN KEY(payment_id) REFERENCES seller_transactions(id),
+    FOREIGN KEY(credit_id) REFERENCES seller_transactions(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_allocations_seller_credit ON payment_allocations(seller_id, credit_id);
+CREATE INDEX IF NOT EXISTS idx_allocations_payment ON payment_allocations(payment_id);
+CREATE INDEX IF NOT EXISTS idx_allocations_invoice ON payment_allocations(invoice_id);
+
+-- Invoice paid amounts now come from allocations, not from payments naming an invoice
+DROP TRIGGER IF EXISTS seller_balances_on_payment_insert;
+
+CREATE TRIGGER seller_balances_on_payment_insert
+AFTER INSERT ON seller_transactions
+WHEN NEW.transaction_type = 'payment'
+BEGIN
+    INSERT OR IGNORE INTO seller_balances (seller_id) VALUES (NEW.seller_id);
+    UPDATE seller_balances
+    SET total_payments = total_payments + NEW.amount
+    WHERE seller_id = NEW.seller_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS invoice_balances_on_allocation_insert
+AFTER INSERT ON payment_allocations
+WHEN NEW.invoice_id IS NOT NULL
+BEGIN
+    UPDATE invoice_balances
+    SET paid_amount = paid_amount + NEW.amount
+    WHERE invoice_id = NEW.invoice_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS payment_allocations_no_update
+BEFORE UPDATE ON payment_allocations
+BEGIN
+    SELECT RAISE(ABORT, 'payment_allocations is append-only');
+END;
+"""
+
+def _payment_allocations(conn):
+    """Allocate every payment to credit sales, oldest first, and derive invoice paid amounts"""
+    _execute_script(conn, PAYMENT_ALLOCATIONS_SQL)
+    conn.execute("UPDATE invoice_balances SET paid_amount = 0")
+    added = allocate_payments(conn)
+    logger.info(f"Allocated payments to credit sales in {added} allocations")
+
+def _integer_seller_ids(conn):
+    """Turn seller ids stored as BLOBs back into integers.
+
+    Older versions passed numpy integers to sqlite3, which stored them as
+    their 8 raw little-endian bytes, so those rows matched no seller. Once
+    the ledger entries point at their seller again, the seller's balances
+    take them in as the insert triggers would have.
+    """
+    seller_tables = [
+        name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        if 'seller_id' in _columns(conn, name)
+    ]
+    for table in seller_tables:
+        rows = conn.execute(
+            f"SELECT rowid, seller_id FROM {table} WHERE typeof(seller_id) = 'blob'"
+        ).fetchall()
+        if not rows:
+            continue
+        updates = [(int.from_bytes(value, 'little', signed=True), rowid) for rowid, value in rows]
+        triggers = _drop_triggers(conn, table)
+        conn.executemany(f"UPDATE {table} SET seller_id = ? WHERE rowid = ?", updates)
+        _restore_triggers(conn, triggers)
+        logger.info(f"Restored {len(updates)} integer {table}.seller_id values")
+
+        if table == 'seller_transactions':
+            fixed = [rowid for _, rowid in updates]
+            placeholders = ', '.join('?' * len(fixed))
+            entries = conn.execute(f"""
+                SELECT
+                    seller_id,
+                    SUM(CASE WHEN transaction_type = 'credit' THEN amount ELSE -amount END),
+                    SUM(CASE WHEN transaction_type = 'payment' THEN amount ELSE 0 END)
+                FROM seller_transactions
+                WHERE rowid IN ({placeholders})
+                GROUP BY seller_id
+            """, fixed).fetchall()
+            for seller_id, credit, payments in entries:
+                conn.execute(
+                    "UPDATE sellers SET total_credit = total_credit + ? WHERE id = ?", (credit, seller_id)
+                )
+                conn.execute("INSERT OR IGNORE INTO seller_balances (seller_id) VALUES (?)", (seller_id,))
+                conn.execute(
+                    "UPDATE seller_balances SET total_payments = total_payments + ? WHERE seller_id = ?",
+                    (payments, seller_id)
+                )
+                allocate_payments(conn, seller_id)
+
+INVOICE_UPDATE_TRIGGERS_SQL = """
+-- Edited invoices move their amounts between the balance rows, so
+-- seller_balances keeps matching a full recompute (utils.ledger)
+CREATE TRIGGER IF NOT EXISTS seller_balances_on_invoice_update
+AFTER UPDATE OF seller_id, total_amount, payment_status, date ON invoices
+BEGIN
+    UPDATE seller_balances
+    SET total_invoices = total_invoices - 1,
+        total_sales = total_sales - COALESCE(OLD.total_amount, 0),
+        credit_sales = credit_sales -
+            CASE WHEN OLD.payment_status = 'credit' THEN COALESCE(OLD.total_amount, 0) ELSE 0 END,
+        paid_sales = paid_sales -
+            CASE WHEN OLD.payment_status = 'paid' THEN COALESCE(OLD.total_amount, 0) ELSE 0 END
+    WHERE seller_id = OLD.seller_id;
+    INSERT OR IGNORE INTO seller_balances (seller_id) VALUES (NEW.seller_id);
+    UPDATE seller_balances
+    SET total_invoices = total_invoices + 1,
+        total_sales = total_sales + COALESCE(NEW.total_amount, 0),
+        credit_sales = credit_sales +
+            CASE WHEN NEW.payment_status = 'credit' THEN COALESCE(NEW.total_amount, 0) ELSE 0 END,
+        paid_sales = paid_sales +
+            CASE WHEN NEW.payment_status = 'paid' THEN COALESCE(NEW.total_amount, 0) ELSE 0 END
+    WHERE seller_id = NEW.seller_id;
+    -- A moved or re-dated invoice can change either seller's latest date
+    UPDATE seller_balances SET last_invoice_date = (
+        SELECT MAX(date) FROM (
+            SELECT date FROM invoices WHERE seller_id = seller_balances.seller_id
+            UNION ALL
+            SELECT date FROM archived_invoices WHERE seller_id = seller_balances.seller_id
+        )
+    )
+    WHERE seller_id IN (OLD.seller_id, NEW.seller_id);
+    UPDATE invoice_balances
+    SET seller_id = NEW.seller_id,
+        total_amount = COALESCE(NEW.total_amount, 0)
+    WHERE invoice_id = NEW.id;
+END;
+"""
+
+def _invoice_update_triggers(conn):
+    """Keep seller_balances and invoice_balances in step with edited invoices"""
+    _execute_script(conn, INVOICE_UPDATE_TRIGGERS_SQL)
+
+SNAPSHOT_CHANGES_SQL = """
+-- Months written since the last analytics snapshot refresh; changes counts
+-- the writes so a refresh only clears the months it has exported
+CREATE TABLE IF NOT EXISTS snapshot_changes (
+    table_name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    changes INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (table_name, month)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS snapshot_changes_on_invoice_insert
+AFTER INSERT ON invoices
+BEGIN
+    INSERT INTO snapshot_changes (table_name, month)
+    VALUES ('invoices', COALESCE(strftime('%Y-%m', NEW.date), 'unknown'))
+    ON CONFLICT (table_name, month) DO UPDATE SET changes = changes + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS snapshot_changes_on_invoice_update
+AFTER UPDATE OF invoice_number, invoice_data, total_amount, date, seller_id, payment_status ON invoices
+BEGIN
+    INSERT INTO snapshot_changes (table_name, month)
+    VALUES ('invoices', COALESCE(strftime('%Y-%m', OLD.date), 'unknown'))
+    ON CONFLICT (table_name, month) DO UPDATE SET changes = changes + 1;
+    INSERT INTO snapshot_changes (table_name, month)
+    VALUES ('invoices', COALESCE(strftime('%Y-%m', NEW.date), 'unknown'))
+    ON CONFLICT (table_name, month) DO UPDATE SET changes = changes + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS snapshot_changes_on_invoice_delete
+AFTER DELETE ON invoices
+BEGIN
+    INSERT INTO snapshot_changes (table_name, month)
+    VALUES ('invoices', COALESCE(strftime('%Y-%m', OLD.date), 'unknown'))
+    ON CONFLICT (table_name, month) DO UPDATE SET changes = changes + 1;
+END;
+
+-- seller_transactions is append-only, so inserts are its only changes
+CREATE TRIGGER IF NOT EXISTS snapshot_changes_on_transaction_insert
+AFTER INSERT ON seller_transactions
+BEGIN
+    INSERT INTO snapshot_changes (table_name, month)
+    VALUES ('transactions', COALESCE(strftime('%Y-%m', NEW.date), 'unknown'))
+    ON CONFLICT (table_name, month) DO UPDATE SET changes = changes + 1;
+END;
+"""
+
+def _snapshot_changes(conn):
+    """Log the months written to invoices and seller_transactions for utils.analytics_snapshot"""
+    _execute_script(conn, SNAPSHOT_CHANGES_SQL)
+
+def _reconcile_seller_credit(conn):
+    """Reset sellers.total_credit to the ledger balance.
+
+    Older versions updated it in the app as well as in update_seller_credit,
+    counting some entries twice.
+    """
+    # utils.ledger needs pandas, which the other migrations do without
+    from utils.ledger import reconcile_seller_credit
+    repaired = reconcile_seller_credit(conn, repair=True)
+    logger.info(f"Reset {len(repaired)} seller credit balances to the ledger")
+
+def _opening_stock_dates(conn):
+    """Date opening stock movements from products.date_purchased.
+
+    Migration 5 dated them on the day it ran; dates it could not read then
+    are ISO since migration 7. Movements of products without a readable
+    purchase date keep theirs.
+    """
+    triggers = _drop_triggers(conn, 'stock_movements')
+    changed = conn.execute("""
+        UPDATE stock_movements
+        SET date = (SELECT date(p.date_purchased) FROM products p WHERE p.id = stock_movements.product_id)
+        WHERE movement_type = 'opening' AND notes = 'Opening balance'
+          AND date IS NOT (SELECT COALESCE(date(p.date_purchased), stock_movements.date)
+                           FROM products p WHERE p.id = stock_movements.product_id)
+    """).rowcount
+    _restore_triggers(conn, triggers)
+    logger.info(f"Dated {changed} opening stock movements from their purchase date")
+
+# Ordered migrations; PRAGMA user_version records the last one applied.
+# Append new entries here rather than editing schema.sql or earlier steps.
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "legacy seller timestamps and invoice pdf_path", _legacy_columns),
+    (3, "invoice archive headers and summary", _archive_tables),
+    (4, "compact invoice payloads", _compact_invoice_payloads),
+    (5, "stock movement ledger", _stock_movements),
+    (6, "integer paise money", _integer_money),
+    (7, "ISO dates", _iso_dates),
+    (8, "invoice PDF hash", _invoice_pdf_hash),
+    (9, "FIFO payment allocations", _payment_allocations),
+    (10, "integer seller ids", _integer_seller_ids),
+    (11, "invoice update balance triggers", _invoice_update_triggers),
+    (12, "analytics snapshot change log", _snapshot_changes),
+    (13, "seller credit from the ledger", _reconcile_seller_credit),
+    (14, "opening stock dated by purchase", _opening_stock_dates),
+]
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply pending migrations on conn, each in its own transaction.
+
+    Returns the number of migrations applied.
+    """
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    # Table rebuilds drop referenced tables; foreign keys can only be switched
+    # off outside a transaction
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    applied = 0
+    try:
+        current = get_version(conn)
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Applying migration {version}: {description}")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied += 1
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {int(foreign_keys)}")
+        conn.isolation_level = isolation_level
+    return applied
+
+def run_migrations(db_path=None):
+    """Bring the database up to date; does nothing after the first call per process"""
+    db_path = db_path or Config.DATABASE_PATH
+    with _lock:
+        if db_path in _migrated:
+            return 0
+        conn = sqlite3.connect(db_path)
+        try:
+            applied = migrate(conn)
+        finally:
+            conn.close()
+        _migrated.add(db_path)
+    if applied:
+        logger.info(f"Database {db_path} migrated to version {MIGRATIONS[-1][0]}")
+    return applied
+
+if __name__ == "__main__":
+    # python -m utils.migrations [database path]
+    logging.basicConfig(level=logging.INFO)
+    path = sys.argv[1] if len(sys.argv) > 1 else Config.DATABASE_PATH
+    applied = run_migrations(path)
+    with sqlite3.connect(path) as conn:
+        print(f"{path}: version {get_version(conn)} ({applied} migrations applied)")
@@ -0,0 +1,132 @@
+"""Money as integer paise.
+
+Amounts are stored in SQLite and summed as whole paise, so totals, credit
+balances and reports are exact. Rupees appear only where people see or
+type them: forms, tables and the PDF. Conversion from rupees rounds half
+up to the nearest paisa.
+"""
+import math
+import numbers
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+
+PAISE_PER_RUPEE = 100
+
+def to_paise(rupees):
+    """Whole paise for a rupee amount (float, int, str or Decimal); None stays None"""
+    if rupees is None or (isinstance(rupees, float) and math.isnan(rupees)):
+        return None
+    if isinstance(rupees, Money):
+        return int(rupees)
+    # str() of a float is its shortest repr, so 2.675 rounds to 268 paise
+    value = Decimal(str(rupees)) * PAISE_PER_RUPEE
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def to_rupees(paise):
+    """Rupees as a float for display; None stays None"""
+    return None if paise is None else int(paise) / PAISE_PER_RUPEE
+
+def format_inr(paise):
+    """e.g. ₹1,234.50 or -₹20.00"""
+    sign = '-' if paise < 0 else ''
+    return f"{sign}₹{abs(int(paise)) / PAISE_PER_RUPEE:,.2f}"
+
+def _round_scalar(paise, mode='half_up'):
+    paise = round(float(paise), 6)
+    if mode == 'half_even':
+        return int(round(paise))
+    if mode != 'half_up':
+        raise ValueError(f"Unknown rounding mode {mode}")
+    return int(math.copysign(math.floor(abs(paise) + 0.5), paise))
+
+def round_paise(values, mode='half_up'):
+    """Round fractional paise (scalar or array) to whole paise as int64"""
+    if np.ndim(values) == 0:
+        return _round_scalar(values, mode)
+    # Pre-rounding absorbs binary representation error (267.5 may be 267.4999...)
+    scaled = np.round(np.asarray(values, dtype=float), 6)
+    if mode == 'half_even':
+        rounded = np.round(scaled)
+    elif mode == 'half_up':
+        rounded = np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)
+    else:
+        raise ValueError(f"Unknown rounding mode {mode}")
+    return rounded.astype(np.int64)
+
+def paise_array(rupees):
+    """Rupee amounts (array or Series) as int64 paise; missing amounts become 0"""
+    values = np.nan_to_num(np.asarray(rupees, dtype=float))
+    return round_paise(values * PAISE_PER_RUPEE)
+
+def rupee_columns(df, columns):
+    """Convert paise columns of a DataFrame read from SQLite to rupees, in place"""
+    for column in columns:
+        if column in df:
+            df[column] = df[column] / PAISE_PER_RUPEE
+    return df
+
+def paise_columns(df, columns):
+    """Convert rupee columns of a DataFrame to int64 paise, in place"""
+    for column in columns:
+        if column in df:
+            df[column] = paise_array(df[column])
+    return df
+
+def _whole_paise(other):
+    # A float or Decimal here is rupees or a fraction of a paisa, which int()
+    # would silently truncate
+    if not isinstance(other, numbers.Integral):
+        raise TypeError(
+            f"Money can only be added to or subtracted from whole paise, not {type(other).__name__}; "
+            "convert rupees with Money.from_rupees"
+        )
+    return int(other)
+
+class Money(int):
+    """An amount in paise.
+
+    Behaves as an int in SQL parameters and sums; adding or subtracting
+    Money or int paise keeps the type (other operands raise TypeError),
+    multiplying by a quantity or rate rounds half up to whole paise. Format specs apply to the rupee value, so
+    f"{amount:,.2f}" shows rupees.
+    """
+
+    @classmethod
+    def from_rupees(cls, rupees):
+        return cls(to_paise(rupees) or 0)
+
+    @property
+    def rupees(self):
+        return int(self) / PAISE_PER_RUPEE
+
+    def __add__(self, other):
+        return Money(int(self) + _whole_paise(other))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return Money(int(self) - _whole_paise(other))
+
+    def __rsub__(self, other):
+        return Money(_whole_paise(other) - int(self))
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __mul__(self, factor):
+        return Money(_round_scalar(int(self) * float(factor)))
+
+    __rmul__ = __mul__
+
+    def percent(self, rate):
+        """rate percent of this amount, e.g. GST at 18"""
+        return self * (float(rate) / 100)
+
+    def __format__(self, spec):
+        return format(self.rupees, spec)
+
+    def __str__(self):
+        return format_inr(self)
+
+    def __repr__(self):
+        return f"Money({int(self)})"
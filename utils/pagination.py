@@ -0,0 +1,34 @@
+import pandas as pd
+
+def fetch_page(conn, query, params=(), sort_column='id', descending=False, cursor=None, page_size=50):
+    """Fetch one keyset-paginated page of a query.
+
+    `query` must select a unique `id` column and `sort_column`, neither of
+    which may be NULL. `cursor` is the (sort value, id) of the last row of
+    the previous page, or None for the first page. Returns the page as a
+    DataFrame and the cursor for the next page (None on the last page).
+    """
+    direction = 'DESC' if descending else 'ASC'
+    operator = '<' if descending else '>'
+
+    sql = f"SELECT * FROM ({query}) AS page"
+    page_params = list(params)
+    if cursor is not None:
+        sql += f" WHERE ({sort_column}, id) {operator} (?, ?)"
+        page_params.extend(cursor)
+    sql += f" ORDER BY {sort_column} {direction}, id {direction} LIMIT ?"
+    # Fetch one extra row to know whether another page exists
+    page_params.append(page_size + 1)
+
+    df = pd.read_sql_query(sql, conn, params=page_params)
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (_to_sql_value(last[sort_column]), int(last['id']))
+    return df, next_cursor
+
+def _to_sql_value(value):
+    # numpy scalars are not accepted as sqlite3 parameters
+    return value.item() if hasattr(value, 'item') else value
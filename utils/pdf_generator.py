@@ -1,15 +1,370 @@
+"""Invoice PDFs.
+
+render_invoice lays an invoice out on any file object and needs no database,
+so utils.invoice_pdfs can run it in worker processes; generate_pdf is the
+in-memory version used for the preview on the invoice page, which caches
+it under invoice_pdf_key.
+
+Invoices with more lines than fit on the first page are laid out a page at
+a time: each page gets its own items table with the column header, the
+page's total and the subtotal carried forward to the next page, so long
+wholesale invoices read like the printed ones and reportlab never has to
+split one huge table.
+"""
+import io
+import json
+import hashlib
+from itertools import islice
+from datetime import date, datetime
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from num2words import num2words
+from config import Config
+from utils.db_manager import get_db_connection, ensure_company_details_exist
+from utils.money import Money
+
+ITEM_HEADER = ['Sl\nNo.', 'Description of Goods', 'HSN/SAC', 'GST\nRate', 'Quantity', 'Rate\n(incl. of Tax)', 'Rate', 'per', 'Disc. %', 'Amount']
+# Total should equal the available width
+ITEM_COL_WIDTHS = [25, 175, 45, 35, 45, 55, 55, 30, 35, 35]
+
+ITEM_TABLE_STYLE = [
+    ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
+    ('FONT', (0, 1), (-1, -1), 'Helvetica', 8),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),  # Description column left aligned
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+]
+
+def get_company_details(conn):
+    """The company_details record as a dict"""
+    cursor = conn.execute("SELECT * FROM company_details WHERE id = 1")
+    row = cursor.fetchone()
+    if row is None:
+        raise Exception("Company details not found!")
+    return dict(zip([col[0] for col in cursor.description], row))
+
+def _item_row(idx, item):
+    # Prices are stored excluding GST; Amount is the taxable value of the line
+    return [
+        str(idx),
+        item.item_name,
+        "84701000",  # Example HSN code
+        f"{item.gst_percentage:g}%",
+        str(item.quantity),
+        f"{item.price * (1 + item.gst_percentage / 100):.2f}",
+        f"{item.price:.2f}",
+        "Nos",
+        f"{item.discount_percentage:g}%",
+        f"{item.taxable_value:.2f}"
+    ]
+
+def _total_row(label, quantity, amount):
+    return ['', label, '', '', f"{quantity:g}", '', '', '', '', f"{amount:.2f}"]
+
+def _items_table(rows, bold_rows=()):
+    """Items table for rows after ITEM_HEADER; bold_rows index into the finished table"""
+    style = list(ITEM_TABLE_STYLE)
+    for row in bold_rows:
+        style.append(('FONT', (0, row), (-1, row), 'Helvetica-Bold', 8))
+    # Should a page still overflow, the header row repeats on the next one
+    table = Table([ITEM_HEADER] + rows, colWidths=ITEM_COL_WIDTHS, repeatRows=1)
+    table.setStyle(TableStyle(style))
+    return table
+
+def _paged_items(invoice_items, totals):
+    """Items tables a page each, with page totals and subtotals carried forward.
+
+    The first page holds Config.PDF_FIRST_PAGE_ROWS lines under the invoice
+    header, later pages Config.PDF_PAGE_ROWS. Rows are formatted one page at
+    a time from the lines DataFrame.
+    """
+    items = enumerate(invoice_items.itertuples(), 1)
+    remaining = len(invoice_items)
+    carried_quantity, carried_amount = 0, Money(0)
+    page_rows = Config.PDF_FIRST_PAGE_ROWS
+    flowables = []
+    while remaining:
+        page = list(islice(items, page_rows))
+        remaining -= len(page)
+        rows, bold_rows = [], []
+        if flowables:
+            rows.append(_total_row('Brought Forward', carried_quantity, carried_amount))
+            bold_rows.append(1)
+        page_quantity = sum(item.quantity for _, item in page)
+        # Sum whole paise so the carried-forward subtotals add up to the invoice total exactly
+        page_amount = sum((Money.from_rupees(item.taxable_value) for _, item in page), Money(0))
+        rows.extend(_item_row(idx, item) for idx, item in page)
+        carried_quantity += page_quantity
+        carried_amount += page_amount
+        rows.append(_total_row('Page Total', page_quantity, page_amount))
+        if remaining:
+            rows.append(_total_row('Carried Forward', carried_quantity, carried_amount))
+        else:
+            rows.append(_total_row('Total', totals['quantity'], totals['taxable_value']))
+        bold_rows.extend([len(rows) - 1, len(rows)])
+        flowables.append(_items_table(rows, bold_rows))
+        if remaining:
+            flowables.append(PageBreak())
+        page_rows = Config.PDF_PAGE_ROWS
+    return flowables
+
+def render_invoice(out, tax, seller_details, invoice_number, company_details, invoice_date=None, invariant=False):
+    """Write an invoice PDF to out, a path or binary file object.
+
+    tax is the utils.tax.InvoiceTax for its items and invoice_date defaults to
+    today. With invariant the output has no timestamps, so rendering the same
+    invoice twice gives identical bytes.
+    """
+    invoice_items = tax.lines
+    totals = tax.totals
+    if invoice_date is None:
+        invoice_date = date.today()
+    elif isinstance(invoice_date, str):
+        invoice_date = datetime.strptime(invoice_date, '%Y-%m-%d')
+    
+    # Use letter size for better layout
+    doc = SimpleDocTemplate(
+        out,
+        pagesize=letter,
+        rightMargin=30,  # Increased margins
+        leftMargin=30,
+        topMargin=30,
+        bottomMargin=30,
+        showBoundary=1,
+        invariant=invariant
+    )
+
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Add custom styles
+    styles.add(ParagraphStyle(
+        name='CompanyHeader',
+        parent=styles['Normal'],
+        fontSize=11,  # Slightly reduced font size
+        spaceAfter=2,
+        leading=13,
+        fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='CompanyDetails',
+        parent=styles['Normal'],
+        fontSize=8,  # Reduced font size
+        spaceAfter=1,
+        leading=10
+    ))
+    
+    # Create the title "TAX INVOICE" centered
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Title'],
+        fontSize=16,
+        spaceAfter=6,
+        spaceBefore=6,
+        alignment=1
+    )
+    elements.append(Paragraph("TAX INVOICE", title_style))
+    elements.append(Spacer(1, 5))
+    
+    # Create header table with seller and company info
+    seller_info = [
+        [Paragraph("Bill To:", styles['CompanyHeader'])],
+        [Paragraph(f"M/S {seller_details['name']}", styles['CompanyDetails'])],
+        [Paragraph(seller_details['address'], styles['CompanyDetails'])],
+        [Paragraph(f"GSTIN/UIN: {seller_details['gstin']}", styles['CompanyDetails'])],
+        [Paragraph(f"Contact: {seller_details['phone']}", styles['CompanyDetails'])],
+        [Paragraph(f"Place of Supply: State Code {tax.place_of_supply}", styles['CompanyDetails'])]
+    ]
+    
+    company_info = [
+        [Paragraph(company_details['name'], styles['CompanyHeader'])],
+        [Paragraph(company_details['address'], styles['CompanyDetails'])],
+        [Paragraph(f"{company_details['city']}, {company_details['state']} - {company_details['state_code']}", styles['CompanyDetails'])],
+        [Paragraph(f"GSTIN: {company_details['gstin']}", styles['CompanyDetails'])],
+        [Paragraph(f"Phone: {company_details['phone']}", styles['CompanyDetails'])],
+        [Paragraph(f"Email: {company_details['email']}", styles['CompanyDetails'])]
+    ]
+    
+    # Calculate available width for tables
+    available_width = 535  # Total width minus margins
+    col_width = available_width / 2  # Equal width for two columns
+    
+    # Create a table for the header section
+    header_data = [
+        [Table(seller_info, colWidths=[col_width]), Table(company_info, colWidths=[col_width])],
+        [
+            Table([
+                [Paragraph("Invoice Details:", styles['CompanyHeader'])],
+                [Paragraph(f"Invoice No: {invoice_number}", styles['CompanyDetails'])],
+                [Paragraph(f"Date: {invoice_date.strftime('%d-%b-%y')}", styles['CompanyDetails'])],
+                [Paragraph(f"Mode/Terms of Payment: {seller_details['payment_status'].upper()}", styles['CompanyDetails'])]
+            ], colWidths=[col_width]),
+            Table([
+                [Paragraph("Shipping Details:", styles['CompanyHeader'])],
+                [Paragraph("Delivery Note: ", styles['CompanyDetails'])],
+                [Paragraph("Dispatch Doc No: ", styles['CompanyDetails'])],
+                [Paragraph("Dispatched through: ", styles['CompanyDetails'])]
+            ], colWidths=[col_width])
+        ]
+    ]
+    
+    header_table = Table(header_data, colWidths=[col_width, col_width])
+    header_table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(header_table)
+    elements.append(Spacer(1, 8))
+    
+    if len(invoice_items) > Config.PDF_FIRST_PAGE_ROWS:
+        elements.extend(_paged_items(invoice_items, totals))
+    else:
+        rows = [_item_row(idx, item) for idx, item in enumerate(invoice_items.itertuples(), 1)]
+        rows.append(_total_row('Total', totals['quantity'], totals['taxable_value']))
+        elements.append(_items_table(rows))
+    elements.append(Spacer(1, 8))
+    
+    # Tax summary by rate slab
+    if tax.interstate:
+        slab_data = [['GST Rate', 'Taxable Value', 'IGST', 'Total Tax']]
+        for slab in tax.slabs.itertuples():
+            slab_data.append([f"{slab.gst_percentage:g}%", f"{slab.taxable_value:.2f}",
+                              f"{slab.igst_amount:.2f}", f"{slab.gst_amount:.2f}"])
+        slab_data.append(['Total', f"{totals['taxable_value']:.2f}",
+                          f"{totals['igst_amount']:.2f}", f"{totals['gst_amount']:.2f}"])
+        slab_widths = [95, 150, 145, 145]
+    else:
+        slab_data = [['GST Rate', 'Taxable Value', 'CGST', 'SGST', 'Total Tax']]
+        for slab in tax.slabs.itertuples():
+            slab_data.append([f"{slab.gst_percentage:g}%", f"{slab.taxable_value:.2f}",
+                              f"{slab.cgst_amount:.2f}", f"{slab.sgst_amount:.2f}", f"{slab.gst_amount:.2f}"])
+        slab_data.append(['Total', f"{totals['taxable_value']:.2f}", f"{totals['cgst_amount']:.2f}",
+                          f"{totals['sgst_amount']:.2f}", f"{totals['gst_amount']:.2f}"])
+        slab_widths = [95, 110, 110, 110, 110]
+    slab_table = Table(slab_data, colWidths=slab_widths)
+    slab_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
+        ('FONT', (0, 1), (-1, -1), 'Helvetica', 8),
+        ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold', 8),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    elements.append(slab_table)
+    
+    # Add spacer to push bottom section to the end
+    elements.append(Spacer(1, 50))
+    
+    # Update bottom section widths
+    bottom_data = [
+        [
+            # Left side - Bank Details
+            Table([
+                [Paragraph("Company's Bank Details", styles['CompanyHeader'])],
+                [Paragraph(f"Bank Name: {company_details['bank_name']}", styles['CompanyDetails'])],
+                [Paragraph(f"A/c No.: {company_details['bank_account']}", styles['CompanyDetails'])],
+                [Paragraph(f"Branch: {company_details['bank_branch']}", styles['CompanyDetails'])],
+                [Paragraph(f"IFSC Code: {company_details['bank_ifsc']}", styles['CompanyDetails'])]
+            ], colWidths=[col_width]),
+            
+            # Right side - Amount Details
+            Table([
+                [Paragraph("Amount Details", styles['CompanyHeader'])],
+                [Paragraph(f"Taxable Value: INR {totals['taxable_value']:.2f}", styles['CompanyDetails'])]
+            ] + ([
+                [Paragraph(f"IGST: INR {totals['igst_amount']:.2f}", styles['CompanyDetails'])]
+            ] if tax.interstate else [
+                [Paragraph(f"CGST: INR {totals['cgst_amount']:.2f}", styles['CompanyDetails'])],
+                [Paragraph(f"SGST: INR {totals['sgst_amount']:.2f}", styles['CompanyDetails'])]
+            ]) + [
+                [Paragraph(f"Round Off: INR {totals['round_off']:.2f}", styles['CompanyDetails'])],
+                [Paragraph(f"Total Amount: INR {totals['grand_total']:.2f}", styles['CompanyDetails'])],
+                [Paragraph(f"Amount in Words: {num2words(int(totals['grand_total'].rupees)).title()} Only", 
+                          ParagraphStyle('AmountWords', parent=styles['CompanyDetails'], fontSize=8, leading=10))]
+            ], colWidths=[col_width])
+        ]
+    ]
+    
+    bottom_table = Table(bottom_data, colWidths=[col_width, col_width])
+    bottom_table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    elements.append(bottom_table)
+    
+    # Update footer width
+    footer_data = [
+        [Paragraph("Declaration: We declare that this invoice shows the actual price of the goods described and that all particulars are true and correct.", 
+                  ParagraphStyle('Footer', parent=styles['Normal'], fontSize=7, alignment=0, leading=8))],
+        [Paragraph(f"SUBJECT TO {company_details['jurisdiction']} JURISDICTION | This is a Computer Generated Invoice", 
+                  ParagraphStyle('Footer', parent=styles['Normal'], fontSize=7, alignment=1, leading=8))]
+    ]
+    
+    footer_table = Table(footer_data, colWidths=[available_width])
+    footer_table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ]))
+    elements.append(footer_table)
 
-class PDFGenerator:
-    def __init__(self, config):
-        self.config = config
-        self.styles = getSampleStyleSheet()
-        self._setup_styles()
+    def number_page(canvas, doc):
+        # Continuation pages of a long invoice are identified in the bottom margin
+        canvas.saveState()
+        canvas.setFont('Helvetica', 7)
+        canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, doc.bottomMargin / 2,
+                               f"Invoice No: {invoice_number} | Page {doc.page}")
+        canvas.restoreState()
+
+    doc.build(elements, onFirstPage=number_page, onLaterPages=number_page)
+
+def invoice_pdf_key(tax, seller_details, invoice_number, company_details, invoice_date=None):
+    """Hash of everything an invoice PDF is rendered from, so a cached render can be found without rendering"""
+    inputs = {
+        'lines': tax.lines.to_json(orient='split', index=False),
+        'totals': tax.totals,
+        'interstate': tax.interstate,
+        'place_of_supply': tax.place_of_supply,
+        'seller': seller_details,
+        'invoice_number': invoice_number,
+        'company': company_details,
+        'date': str(invoice_date or date.today()),
+        'layout': [Config.PDF_FIRST_PAGE_ROWS, Config.PDF_PAGE_ROWS],
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+def generate_pdf(tax, seller_details, invoice_number, preview=False, invariant=False):
+    """Render an invoice in memory; tax is the utils.tax.InvoiceTax for its items"""
+    # Ensure database is initialized
+    if not ensure_company_details_exist():
+        raise Exception("Failed to initialize database. Please check the logs.")
+    
+    with get_db_connection() as conn:
+        company_details = get_company_details(conn)
     
-    def _setup_styles(self):
-        self.styles.add(ParagraphStyle(name='Left', alignment=0))
-        self.styles.add(ParagraphStyle(name='Right', alignment=2))
+    buffer = io.BytesIO()
+    render_invoice(buffer, tax, seller_details, invoice_number, company_details, invariant=invariant)
     
-    def generate(self, invoice_data, preview=False):
-        # Move PDF generation logic here
-        pass 
\ No newline at end of file
+    if preview:
+        return buffer
+    else:
+        return buffer.getvalue()
@@ -0,0 +1,112 @@
+"""PNG previews of invoice PDFs.
+
+Each preview is cached under Config.PREVIEW_DIR by a hash of the invoice's
+inputs (utils.pdf_generator.invoice_pdf_key): the PDF itself and PNGs of its
+first Config.PREVIEW_PAGES pages, rasterized in process with pypdfium2. A
+rerun with an unchanged invoice reads those files back without rendering
+the PDF or rasterizing again. The page shows the images and offers the PDF
+through a download button.
+"""
+import os
+import shutil
+import logging
+import tempfile
+from config import Config
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - previews are optional
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+COUNT_FILE = 'pages.txt'
+PDF_FILE = 'invoice.pdf'
+
+def previews_available():
+    return pdfium is not None
+
+def _cache_dir(key):
+    return os.path.join(Config.PREVIEW_DIR, key)
+
+def _cached(directory):
+    pdf_path = os.path.join(directory, PDF_FILE)
+    try:
+        images = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.png')
+        )
+        with open(os.path.join(directory, COUNT_FILE)) as f:
+            page_count = int(f.read())
+    except FileNotFoundError:
+        # Stored without pypdfium2; rasterize it once it is installed
+        if pdfium is not None or not os.path.exists(pdf_path):
+            return None
+        images, page_count = [], None
+    except (OSError, ValueError):
+        return None
+    # Touch the entry so pruning drops the least recently used previews
+    os.utime(directory)
+    return pdf_path, images, page_count
+
+def _rasterize(pdf_bytes, directory):
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        page_count = len(pdf)
+        for index in range(min(page_count, Config.PREVIEW_PAGES)):
+            page = pdf[index]
+            image = page.render(scale=Config.PREVIEW_SCALE).to_pil()
+            image.save(os.path.join(directory, f"page-{index + 1:03d}.png"), optimize=True)
+            page.close()
+    finally:
+        pdf.close()
+    with open(os.path.join(directory, COUNT_FILE), 'w') as f:
+        f.write(str(page_count))
+
+def _store(pdf_bytes, directory):
+    os.makedirs(Config.PREVIEW_DIR, exist_ok=True)
+    # Built in a temporary directory and renamed, so a reader never sees half an entry
+    tmp_dir = tempfile.mkdtemp(dir=Config.PREVIEW_DIR, suffix='.tmp')
+    try:
+        with open(os.path.join(tmp_dir, PDF_FILE), 'wb') as f:
+            f.write(pdf_bytes)
+        if pdfium is not None:
+            _rasterize(pdf_bytes, tmp_dir)
+        if os.path.isdir(directory):
+            # Replaces an entry stored before pypdfium2 was installed
+            shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # Another session stored the same preview first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+def _prune():
+    entries = [
+        os.path.join(Config.PREVIEW_DIR, name) for name in os.listdir(Config.PREVIEW_DIR)
+        if not name.endswith('.tmp')
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for directory in entries[Config.PREVIEW_CACHE_SIZE:]:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def invoice_preview(key, render):
+    """(PDF path, PNG paths of the first pages, total page count) for an invoice.
+
+    key identifies the invoice's inputs; render() returns its PDF bytes and
+    is only called when key is not cached. Without pypdfium2 there are no
+    images and the page count is None.
+    """
+    directory = _cache_dir(key)
+    cached = _cached(directory)
+    if cached is not None:
+        return cached
+    _store(render(), directory)
+    try:
+        _prune()
+    except OSError as e:
+        logger.warning(f"Could not prune preview cache: {e}")
+    return _cached(directory)
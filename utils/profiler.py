@@ -0,0 +1,164 @@
+import os
+import io
+import glob
+import math
+import json
+import time
+import pstats
+import logging
+import cProfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Finished runs are written as JSON lines through this logger
+store_logger = logging.getLogger(f"{__name__}.store")
+store_logger.propagate = False
+
+PROFILE_FILE = 'profiles.jsonl'
+
+_current_run = ContextVar('current_profile_run', default=None)
+
+class ProfileRun:
+    """Timings collected while rendering one page"""
+
+    def __init__(self, page, use_cprofile=False):
+        self.page = page
+        self.started = time.perf_counter()
+        self.stages = []
+        self.sql_ms = 0.0
+        self.sql_statements = 0
+        self.total_ms = None
+        self.top_functions = None
+        self.profiler = cProfile.Profile() if use_cprofile else None
+
+    def to_record(self):
+        return {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'page': self.page,
+            'total_ms': round(self.total_ms, 3),
+            'sql_ms': round(self.sql_ms, 3),
+            'sql_statements': self.sql_statements,
+            'stages': self.stages,
+            'top_functions': self.top_functions
+        }
+
+def _store_path():
+    return os.path.join(Config.PROFILE_DIR, PROFILE_FILE)
+
+def _configure_store():
+    if store_logger.handlers:
+        return
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    handler = RotatingFileHandler(
+        _store_path(), maxBytes=Config.PROFILE_MAX_BYTES, backupCount=Config.PROFILE_BACKUPS
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    store_logger.addHandler(handler)
+    store_logger.setLevel(logging.INFO)
+
+def _top_functions(profiler, limit=25):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, _, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'calls': calls,
+            'cumulative_ms': round(cumtime * 1000, 3)
+        })
+    rows.sort(key=lambda r: r['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+@contextmanager
+def profile_page(page, use_cprofile=False):
+    """Time a page render; yields the ProfileRun, written to the store on exit"""
+    run = ProfileRun(page, use_cprofile)
+    token = _current_run.set(run)
+    if run.profiler:
+        run.profiler.enable()
+    try:
+        yield run
+    finally:
+        if run.profiler:
+            run.profiler.disable()
+            run.top_functions = _top_functions(run.profiler)
+        run.total_ms = (time.perf_counter() - run.started) * 1000
+        _current_run.reset(token)
+        try:
+            _configure_store()
+            store_logger.info(json.dumps(run.to_record()))
+        except OSError as e:
+            logger.warning(f"Could not write page profile: {e}")
+
+@contextmanager
+def stage(name):
+    """Time a named stage of the page being profiled; a no-op when profiling is off"""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.stages.append({'stage': name, 'ms': round((time.perf_counter() - start) * 1000, 3)})
+
+def record_sql(elapsed_ms):
+    """Add a statement's time to the page being profiled"""
+    run = _current_run.get()
+    if run is not None:
+        run.sql_ms += elapsed_ms
+        run.sql_statements += 1
+
+def load_profiles():
+    """All stored runs, oldest first, across the rotated files"""
+    paths = sorted(
+        glob.glob(f"{_store_path()}.*"),
+        key=lambda p: int(p.rsplit('.', 1)[-1]) if p.rsplit('.', 1)[-1].isdigit() else 0,
+        reverse=True
+    )
+    paths.append(_store_path())
+
+    records = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+def _percentile(values, percent):
+    # Nearest-rank percentile
+    values = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+def summarize_profiles(records):
+    """p50/p95 wall time per page and per stage, with '(total)' and '(sql)' rows per page"""
+    samples = {}
+    for record in records:
+        page = record['page']
+        samples.setdefault((page, '(total)'), []).append(record['total_ms'])
+        samples.setdefault((page, '(sql)'), []).append(record.get('sql_ms', 0.0))
+        for entry in record.get('stages', []):
+            samples.setdefault((page, entry['stage']), []).append(entry['ms'])
+
+    summary = []
+    for (page, stage_name), values in samples.items():
+        summary.append({
+            'page': page,
+            'stage': stage_name,
+            'runs': len(values),
+            'p50_ms': round(_percentile(values, 50), 3),
+            'p95_ms': round(_percentile(values, 95), 3)
+        })
+    summary.sort(key=lambda s: (s['page'], s['stage'] != '(total)', -s['p95_ms']))
+    return summary
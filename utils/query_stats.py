@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import sqlite3
+from logging.handlers import RotatingFileHandler
+from config import Config
+from utils.profiler import record_sql
+
+logger = logging.getLogger(__name__)
+
+# Slow statements are written here with their query plan
+slow_logger = logging.getLogger(f"{__name__}.slow")
+
+_current_page = ContextVar('current_page', default=None)
+
+_lock = threading.Lock()
+_stats = {}
+_slow_queries = deque(maxlen=Config.SLOW_QUERY_HISTORY)
+_explained = set()
+_slow_log_configured = False
+
+_WHITESPACE = re.compile(r'\s+')
+_PAGES_DIR = os.sep + 'pages' + os.sep
+
+def _normalize(sql):
+    return _WHITESPACE.sub(' ', sql).strip()
+
+@contextmanager
+def page_context(page):
+    """Attribute every statement run inside the block to the named page"""
+    token = _current_page.set(page)
+    try:
+        yield
+    finally:
+        _current_page.reset(token)
+
+def _caller_page():
+    page = _current_page.get()
+    if page:
+        return page
+    # Fall back to the nearest module under pages/ on the stack
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if _PAGES_DIR in filename:
+            return os.path.splitext(os.path.basename(filename))[0]
+        frame = frame.f_back
+    return 'other'
+
+def _configure_slow_log():
+    global _slow_log_configured
+    if _slow_log_configured:
+        return
+    os.makedirs(os.path.dirname(Config.SLOW_QUERY_LOG) or '.', exist_ok=True)
+    handler = RotatingFileHandler(Config.SLOW_QUERY_LOG, maxBytes=5 * 1024 * 1024, backupCount=3)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    slow_logger.addHandler(handler)
+    slow_logger.setLevel(logging.INFO)
+    _slow_log_configured = True
+
+def _explain(conn, sql, params):
+    try:
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error as e:
+        return f"(no plan: {e})"
+    return '\n'.join(row[-1] for row in rows)
+
+class _Statement:
+    __slots__ = ('sql', 'params', 'page', 'elapsed', 'rows', 'steps')
+
+    def __init__(self, sql, params, page):
+        self.sql = sql
+        self.params = params
+        self.page = page
+        self.elapsed = 0.0
+        self.rows = 0
+        self.steps = 0
+
+def _record(conn, statement):
+    """Fold a finished statement into the aggregate stats and the slow-query log"""
+    elapsed_ms = statement.elapsed * 1000
+    record_sql(elapsed_ms)
+    sql = _normalize(statement.sql)
+    key = (statement.page, sql)
+
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {
+                'page': statement.page, 'sql': sql, 'calls': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'rows': 0, 'vm_steps': 0, 'slow_calls': 0
+            }
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['rows'] += statement.rows
+        entry['vm_steps'] += statement.steps
+        slow = elapsed_ms >= Config.SLOW_QUERY_MS
+        if slow:
+            entry['slow_calls'] += 1
+            explain = sql not in _explained
+            _explained.add(sql)
+
+    if not slow:
+        return
+
+    # Each distinct statement is explained once per process
+    plan = _explain(conn, statement.sql, statement.params) if explain else None
+    record = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'page': statement.page,
+        'elapsed_ms': round(elapsed_ms, 2),
+        'rows': statement.rows,
+        'sql': sql,
+        'plan': plan
+    }
+    with _lock:
+        _slow_queries.append(record)
+    _configure_slow_log()
+    slow_logger.info(
+        f"{elapsed_ms:.1f} ms page={statement.page} rows={statement.rows} sql={sql}"
+        + ("\n  plan:\n    " + plan.replace('\n', '\n    ') if plan else '')
+    )
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execute and fetch calls and counts rows returned"""
+
+    _statement = None
+
+    def _finish(self):
+        statement = self._statement
+        if statement is not None:
+            self._statement = None
+            _record(self.connection, statement)
+
+    def _run(self, method, sql, params, first_params):
+        self._finish()
+        statement = _Statement(sql, first_params, _caller_page())
+        conn = self.connection
+        conn._vm_steps = 0
+        start = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            statement.elapsed = time.perf_counter() - start
+            statement.steps = conn._vm_steps
+            if self.description is None:
+                # Not a query: nothing to fetch, record it now
+                statement.rows = max(self.rowcount, 0)
+                _record(conn, statement)
+            else:
+                self._statement = statement
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        return self._run(super().executemany, sql, seq_of_parameters, first)
+
+    def _fetch(self, method, *args):
+        statement = self._statement
+        if statement is None:
+            return method(*args)
+        conn = self.connection
+        steps = conn._vm_steps
+        start = time.perf_counter()
+        result = method(*args)
+        statement.elapsed += time.perf_counter() - start
+        statement.steps += conn._vm_steps - steps
+        return result
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._statement is not None:
+            self._statement.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._fetch(super().fetchmany, size)
+        if self._statement is not None:
+            self._statement.rows += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        if self._statement is not None:
+            self._statement.rows += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Queries that were only partly fetched are recorded when the cursor goes away
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors record per-statement latency, rows and caller page.
+
+    A progress handler counts SQLite virtual machine steps, a proxy for the
+    work a statement does independent of machine load.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._vm_steps = 0
+        self.set_progress_handler(self._on_progress, Config.QUERY_PROGRESS_STEPS)
+
+    def _on_progress(self):
+        self._vm_steps += Config.QUERY_PROGRESS_STEPS
+        return 0
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute creates its cursor internally, bypassing cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def get_query_stats():
+    """Aggregated per-page, per-statement stats, slowest total time first"""
+    with _lock:
+        entries = [dict(entry) for entry in _stats.values()]
+    for entry in entries:
+        entry['avg_ms'] = entry['total_ms'] / entry['calls']
+    return sorted(entries, key=lambda e: e['total_ms'], reverse=True)
+
+def get_slow_queries():
+    """Recent slow statements, newest first"""
+    with _lock:
+        return list(reversed(_slow_queries))
+
+def reset_query_stats():
+    with _lock:
+        _stats.clear()
+        _slow_queries.clear()
+        _explained.clear()
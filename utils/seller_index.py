@@ -0,0 +1,93 @@
+import bisect
+import logging
+import threading
+from utils.db_manager import get_db_connection
+from utils.money import Money
+
+logger = logging.getLogger(__name__)
+
+_index = None
+_lock = threading.Lock()
+
+def _normalize_phone(phone):
+    return ''.join(ch for ch in str(phone or '') if ch.isdigit())
+
+class SellerIndex:
+    """In-memory seller lookup keyed by id, with prefix search over name and phone.
+
+    Per-seller stats (order count, last order date, current credit) are
+    loaded once from seller_balances, so picking a seller is a dict lookup
+    and a typeahead search is a binary search over sorted keys.
+    """
+
+    def __init__(self, rows):
+        self.by_id = {row['id']: row for row in rows}
+        self._names = sorted((row['name'].casefold(), row['id']) for row in rows)
+        self._phones = sorted(
+            (_normalize_phone(row['phone']), row['id']) for row in rows if _normalize_phone(row['phone'])
+        )
+        self._recent = [
+            row['id'] for row in sorted(
+                rows, key=lambda r: (r['last_order_date'] or '', r['id']), reverse=True
+            )
+        ]
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, seller_id):
+        return self.by_id.get(seller_id)
+
+    @staticmethod
+    def _prefix_matches(keys, prefix, limit):
+        start = bisect.bisect_left(keys, (prefix,))
+        matches = []
+        for key, seller_id in keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            matches.append(seller_id)
+        return matches
+
+    def search(self, text, limit=20):
+        """Return seller ids whose name or phone starts with text"""
+        text = (text or '').strip()
+        if not text:
+            return self._recent[:limit]
+
+        matches = self._prefix_matches(self._names, text.casefold(), limit)
+        digits = _normalize_phone(text)
+        if digits:
+            matches += self._prefix_matches(self._phones, digits, limit)
+        return list(dict.fromkeys(matches))[:limit]
+
+def _load_index():
+    with get_db_connection() as conn:
+        cursor = conn.execute("""
+            SELECT
+                s.id, s.name, s.address, s.phone, s.gstin,
+                COALESCE(b.total_invoices, 0) as order_count,
+                b.last_invoice_date as last_order_date,
+                COALESCE(s.total_credit, 0) as current_credit
+            FROM sellers s
+            LEFT JOIN seller_balances b ON s.id = b.seller_id
+        """)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for row in rows:
+        row['current_credit'] = Money(row['current_credit'])
+    logger.info(f"Loaded seller index with {len(rows)} sellers")
+    return SellerIndex(rows)
+
+def get_seller_index():
+    """Return the cached seller index, building it on first use"""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = _load_index()
+        return _index
+
+def invalidate_seller_index():
+    """Drop the cached index; call after any write to sellers, invoices or seller credit"""
+    global _index
+    with _lock:
+        _index = None
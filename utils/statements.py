@@ -0,0 +1,281 @@
+"""Seller account statements.
+
+A statement lists a seller's ledger entries (credit sales and payments from
+seller_transactions) between two dates, with the balance brought forward
+from before the period and a running balance after each entry. Statements
+are written as PDF and as write-only (streamed) XLSX workbooks. The batch
+mode writes statements for every seller with outstanding credit, split
+across worker processes that each read the database themselves.
+"""
+import os
+import sys
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from config import Config
+from utils.db_manager import get_db_connection
+from utils.pdf_generator import get_company_details
+from utils.money import Money
+from utils.dates import to_iso_date, format_date
+
+logger = logging.getLogger(__name__)
+
+ENTRY_COLUMNS = ['Date', 'Particulars', 'Invoice No', 'Debit', 'Credit', 'Balance']
+SUMMARY_COLUMNS = ['Seller ID', 'Seller', 'Phone', 'Opening Balance', 'Debits', 'Credits', 'Closing Balance', 'File']
+AMOUNT_FORMAT = '#,##0.00'
+
+def seller_statement(conn, seller_id, start, end):
+    """Statement of a seller's account from start to end inclusive, amounts as Money.
+
+    Entries are (date, particulars, invoice_number, debit, credit, balance);
+    credit sales are debits to the seller's account and payments credits.
+    """
+    start, end = to_iso_date(start), to_iso_date(end)
+    seller = conn.execute(
+        "SELECT id, name, address, phone, gstin FROM sellers WHERE id = ?", (int(seller_id),)
+    ).fetchone()
+    if seller is None:
+        raise ValueError(f"Seller {seller_id} not found")
+
+    # Both queries seek on the (seller_id, date) index
+    opening = Money(conn.execute("""
+        SELECT COALESCE(SUM(CASE WHEN transaction_type = 'credit' THEN amount ELSE -amount END), 0)
+        FROM seller_transactions
+        WHERE seller_id = ? AND date < ?
+    """, (int(seller_id), start)).fetchone()[0])
+    rows = conn.execute("""
+        SELECT
+            t.date,
+            t.transaction_type,
+            COALESCE(i.invoice_number, a.invoice_number, ''),
+            COALESCE(t.notes, ''),
+            t.amount
+        FROM seller_transactions t
+        LEFT JOIN invoices i ON t.invoice_id = i.id
+        LEFT JOIN archived_invoices a ON t.invoice_id = a.id
+        WHERE t.seller_id = ? AND t.date >= ? AND t.date <= ?
+        ORDER BY t.date, t.id
+    """, (int(seller_id), start, end)).fetchall()
+
+    entries = []
+    balance = opening
+    debits = credits = Money(0)
+    for date, transaction_type, invoice_number, notes, amount in rows:
+        amount = Money(amount)
+        if transaction_type == 'credit':
+            debit, credit = amount, Money(0)
+            particulars = notes or 'Credit sale'
+        else:
+            debit, credit = Money(0), amount
+            particulars = notes or 'Payment received'
+        debits += debit
+        credits += credit
+        balance += debit - credit
+        entries.append((date, particulars, invoice_number, debit, credit, balance))
+
+    return {
+        'seller_id': seller[0],
+        'name': seller[1],
+        'address': seller[2] or '',
+        'phone': seller[3] or '',
+        'gstin': seller[4] or '',
+        'start': start,
+        'end': end,
+        'opening_balance': opening,
+        'total_debits': debits,
+        'total_credits': credits,
+        'closing_balance': balance,
+        'entries': entries
+    }
+
+def write_statement_pdf(out, statement, company_details):
+    """Write a statement PDF to out, a path or binary file object"""
+    doc = SimpleDocTemplate(out, pagesize=letter, rightMargin=30, leftMargin=30,
+                            topMargin=30, bottomMargin=30)
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph(company_details['name'], styles['Title']),
+        Paragraph(f"{company_details['address']} | GSTIN: {company_details['gstin']}", styles['Normal']),
+        Spacer(1, 8),
+        Paragraph("STATEMENT OF ACCOUNT", styles['Heading2']),
+        Paragraph(f"M/S {statement['name']}", styles['Normal']),
+        Paragraph(statement['address'], styles['Normal']),
+        Paragraph(f"GSTIN/UIN: {statement['gstin']} | Contact: {statement['phone']}", styles['Normal']),
+        Paragraph(f"Period: {format_date(statement['start'])} to {format_date(statement['end'])}", styles['Normal']),
+        Spacer(1, 8)
+    ]
+
+    data = [ENTRY_COLUMNS,
+            ['', 'Opening Balance', '', '', '', f"{statement['opening_balance']:,.2f}"]]
+    for date, particulars, invoice_number, debit, credit, balance in statement['entries']:
+        data.append([
+            format_date(date), particulars, invoice_number,
+            f"{debit:,.2f}" if debit else '', f"{credit:,.2f}" if credit else '', f"{balance:,.2f}"
+        ])
+    data.append(['', 'Total', '', f"{statement['total_debits']:,.2f}",
+                 f"{statement['total_credits']:,.2f}", ''])
+    data.append(['', 'Closing Balance', '', '', '', f"{statement['closing_balance']:,.2f}"])
+
+    # repeatRows carries the column header onto every page of long statements
+    table = Table(data, colWidths=[60, 205, 65, 70, 70, 80], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica', 8),
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
+        ('FONT', (0, 1), (-1, 1), 'Helvetica-Bold', 8),
+        ('FONT', (0, -2), (-1, -1), 'Helvetica-Bold', 8),
+        ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    elements.append(table)
+    doc.build(elements)
+
+def _amount_cell(sheet, amount, bold=False):
+    cell = WriteOnlyCell(sheet, value=amount.rupees if amount is not None else None)
+    cell.number_format = AMOUNT_FORMAT
+    if bold:
+        cell.font = Font(bold=True)
+    return cell
+
+def _header_cells(sheet, values):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    return cells
+
+def write_statement_xlsx(out, statement):
+    """Write a statement workbook to out, a path or binary file object.
+
+    The workbook is write-only, so rows are streamed to the file rather than
+    kept as a worksheet in memory.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Statement")
+    sheet.append([f"Statement of account: {statement['name']}"])
+    sheet.append([f"Period: {format_date(statement['start'])} to {format_date(statement['end'])}"])
+    sheet.append([])
+    sheet.append(_header_cells(sheet, ENTRY_COLUMNS))
+    sheet.append([None, 'Opening Balance', None, None, None,
+                  _amount_cell(sheet, statement['opening_balance'], bold=True)])
+    for date, particulars, invoice_number, debit, credit, balance in statement['entries']:
+        sheet.append([
+            format_date(date), particulars, invoice_number,
+            _amount_cell(sheet, debit or None), _amount_cell(sheet, credit or None),
+            _amount_cell(sheet, balance)
+        ])
+    sheet.append([None, 'Total', None, _amount_cell(sheet, statement['total_debits'], bold=True),
+                  _amount_cell(sheet, statement['total_credits'], bold=True), None])
+    sheet.append([None, 'Closing Balance', None, None, None,
+                  _amount_cell(sheet, statement['closing_balance'], bold=True)])
+    workbook.save(out)
+
+def sellers_with_credit(conn):
+    """Ids of sellers with outstanding credit, in id order"""
+    return [row[0] for row in conn.execute(
+        "SELECT id FROM sellers WHERE total_credit > 0 ORDER BY id"
+    ).fetchall()]
+
+def _statement_path(out_dir, statement, extension):
+    return os.path.join(
+        out_dir, f"statement-{statement['seller_id']}-{statement['start']}-{statement['end']}.{extension}"
+    )
+
+def _write_batch(database_path, seller_ids, start, end, out_dir, formats, company_details):
+    # Runs in a worker process with its own connection
+    Config.DATABASE_PATH = database_path
+    summaries = []
+    with get_db_connection() as conn:
+        for seller_id in seller_ids:
+            statement = seller_statement(conn, seller_id, start, end)
+            paths = []
+            if 'pdf' in formats:
+                paths.append(_statement_path(out_dir, statement, 'pdf'))
+                write_statement_pdf(paths[-1], statement, company_details)
+            if 'xlsx' in formats:
+                paths.append(_statement_path(out_dir, statement, 'xlsx'))
+                write_statement_xlsx(paths[-1], statement)
+            summaries.append((
+                statement['seller_id'], statement['name'], statement['phone'],
+                statement['opening_balance'], statement['total_debits'],
+                statement['total_credits'], statement['closing_balance'], paths
+            ))
+    return summaries
+
+def write_batch_statements(start, end, out_dir=None, formats=('pdf', 'xlsx'), seller_ids=None):
+    """Write statements for many sellers, by default every seller with outstanding credit.
+
+    Sellers are split into Config.STATEMENT_BATCH_SIZE batches across
+    Config.STATEMENT_WORKERS processes. A summary workbook with one row per
+    seller is streamed to out_dir as batches finish; returns its path.
+    """
+    start, end = to_iso_date(start), to_iso_date(end)
+    out_dir = out_dir or Config.STATEMENT_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    with get_db_connection() as conn:
+        company_details = get_company_details(conn)
+        if seller_ids is None:
+            seller_ids = sellers_with_credit(conn)
+
+    summary_path = os.path.join(out_dir, f"statements-{start}-{end}.xlsx")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Statements")
+    sheet.append(_header_cells(sheet, SUMMARY_COLUMNS))
+
+    size = Config.STATEMENT_BATCH_SIZE
+    batches = [seller_ids[i:i + size] for i in range(0, len(seller_ids), size)]
+    written = failed = 0
+    # Spawned like the PDF workers, so no worker inherits a lock or an open
+    # connection held by another thread of the parent
+    spawn = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=Config.STATEMENT_WORKERS, mp_context=spawn) as executor:
+        futures = {
+            executor.submit(_write_batch, Config.DATABASE_PATH, batch, start, end,
+                            out_dir, formats, company_details): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            try:
+                summaries = future.result()
+            except Exception as e:
+                failed += len(futures[future])
+                logger.error(f"Statements for sellers {futures[future][0]}-{futures[future][-1]} failed: {e}")
+                continue
+            for seller_id, name, phone, opening, debits, credits, closing, paths in summaries:
+                sheet.append([
+                    seller_id, name, phone,
+                    _amount_cell(sheet, opening), _amount_cell(sheet, debits),
+                    _amount_cell(sheet, credits), _amount_cell(sheet, closing),
+                    ', '.join(os.path.basename(path) for path in paths)
+                ])
+            written += len(summaries)
+
+    workbook.save(summary_path)
+    logger.info(f"Wrote statements for {written} sellers to {out_dir} ({failed} failed)")
+    return summary_path
+
+if __name__ == "__main__":
+    # Month-end run: python -m utils.statements 2025-04-01 2025-04-30 [--pdf | --xlsx]
+    from utils.db_manager import init_db
+
+    logging.basicConfig(level=logging.INFO)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) != 2:
+        sys.exit("usage: python -m utils.statements START END [--pdf | --xlsx]")
+    formats = ('pdf', 'xlsx')
+    if '--pdf' in sys.argv[1:]:
+        formats = ('pdf',)
+    elif '--xlsx' in sys.argv[1:]:
+        formats = ('xlsx',)
+    init_db()
+    print(f"Summary written to {write_batch_statements(args[0], args[1], formats=formats)}")
@@ -0,0 +1,111 @@
+import logging
+from datetime import date, timedelta
+import pandas as pd
+from utils.pagination import fetch_page
+from utils.money import rupee_columns
+from utils.dates import to_iso_date
+
+logger = logging.getLogger(__name__)
+
+# Latest balance on or before a date. idx_stock_movements_product_date turns
+# this into one index seek per product instead of a replay of its history
+_BALANCE_AS_OF = """
+    SELECT m.balance_after FROM stock_movements m
+    WHERE m.product_id = p.id AND m.date <= :as_of
+    ORDER BY m.date DESC, m.id DESC
+    LIMIT 1
+"""
+
+def get_quantity_as_of(conn, product_id, as_of):
+    """A product's stock at the end of as_of (0 before its first movement)"""
+    row = conn.execute(f"""
+        SELECT COALESCE(({_BALANCE_AS_OF}), 0) FROM products p WHERE p.id = :product_id
+    """, {'as_of': to_iso_date(as_of), 'product_id': int(product_id)}).fetchone()
+    return row[0] if row else 0
+
+def get_stock_as_of(conn, as_of):
+    """Every product's stock and value at the end of as_of, valued at current buying prices"""
+    stock = pd.read_sql_query(f"""
+        SELECT
+            p.id as product_id,
+            p.company,
+            p.category,
+            p.item_name,
+            p.item_code,
+            p.buying_price,
+            COALESCE(({_BALANCE_AS_OF}), 0) as quantity
+        FROM products p
+        ORDER BY p.company, p.category, p.item_name
+    """, conn, params={'as_of': to_iso_date(as_of)})
+    # Exact in paise, then shown in rupees
+    stock['value'] = stock['quantity'] * stock['buying_price']
+    return rupee_columns(stock, ['buying_price', 'value'])
+
+def get_stock_movements_page(conn, product_id, cursor=None, page_size=50):
+    """One page of a product's stock movements, newest first"""
+    query = """
+        SELECT
+            m.id,
+            m.date,
+            m.movement_type,
+            m.quantity,
+            m.balance_after,
+            i.invoice_number,
+            m.notes
+        FROM stock_movements m
+        LEFT JOIN invoices i ON m.invoice_id = i.id
+        WHERE m.product_id = ?
+    """
+    return fetch_page(conn, query, (int(product_id),), 'date', True, cursor, page_size)
+
+def _month_ends(first, last):
+    # Last day of every month from first's month up to and including last
+    day = date(first.year, first.month, 1)
+    while True:
+        next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        month_end = next_month - timedelta(days=1)
+        if month_end > last:
+            return
+        yield month_end
+        day = next_month
+
+def take_stock_snapshots(conn, today=None):
+    """Record month-end stock for every closed month not yet snapshotted.
+
+    Returns the number of months written. Snapshots keep the buying price at
+    the time they are taken, so later price edits do not revalue history.
+    """
+    today = today or date.today()
+    last_closed = today.replace(day=1) - timedelta(days=1)
+    first = conn.execute("SELECT MIN(date) FROM stock_movements").fetchone()[0]
+    if first is None:
+        return 0
+    latest = conn.execute("SELECT MAX(snapshot_date) FROM stock_snapshots").fetchone()[0]
+    start = date.fromisoformat(latest) + timedelta(days=1) if latest else date.fromisoformat(first[:10])
+
+    written = 0
+    with conn:
+        for month_end in _month_ends(start, last_closed):
+            conn.execute(f"""
+                INSERT OR IGNORE INTO stock_snapshots (snapshot_date, product_id, quantity, buying_price)
+                SELECT :as_of, p.id, COALESCE(({_BALANCE_AS_OF}), 0), p.buying_price
+                FROM products p
+            """, {'as_of': month_end.isoformat()})
+            written += 1
+    if written:
+        logger.info(f"Recorded {written} month-end stock snapshots")
+    return written
+
+def get_inventory_value_series(conn):
+    """Month-end stock quantity and value, taking any snapshots that are due first"""
+    take_stock_snapshots(conn)
+    series = pd.read_sql_query("""
+        SELECT
+            snapshot_date,
+            SUM(quantity) as quantity,
+            SUM(quantity * buying_price) as value
+        FROM stock_snapshots
+        GROUP BY snapshot_date
+        ORDER BY snapshot_date
+    """, conn)
+    return rupee_columns(series, ['value'])
@@ -0,0 +1,148 @@
+"""GST calculation for invoices.
+
+Prices are entered excluding GST. Amounts are worked out in whole paise
+(see utils.money) and converted back to rupees only in the lines
+DataFrame handed to the PDF and to invoice storage. Each line's taxable value is quantity x
+price less discount; intra-state supplies split the GST rate equally into
+CGST and SGST, inter-state supplies charge it all as IGST. The place of
+supply is the buyer's state, taken from the first two digits of their
+GSTIN; buyers without a GSTIN, or any buyer while the company's own state
+code is not set, are treated as in the seller's own state.
+"""
+import logging
+import numpy as np
+from config import Config
+from utils.money import Money, round_paise, paise_array
+
+logger = logging.getLogger(__name__)
+
+LINE_COLUMNS = ['gross_amount', 'discount_amount', 'taxable_value',
+                'cgst_amount', 'sgst_amount', 'igst_amount', 'gst_amount', 'total_amount']
+
+def _round(paise, mode=None):
+    """Round fractional paise to whole paise using Config.TAX_ROUNDING"""
+    return round_paise(paise, mode or Config.TAX_ROUNDING)
+
+def state_code_from_gstin(gstin):
+    """Two-digit state code a GSTIN was issued in, or None"""
+    gstin = (gstin or '').strip()
+    if len(gstin) >= 2 and gstin[:2].isdigit():
+        return gstin[:2]
+    return None
+
+def _normalize_state_code(code):
+    code = str(code or '').strip()
+    return code.zfill(2) if code.isdigit() else code
+
+def is_interstate(company_state_code, buyer_gstin):
+    """True if the supply is to a buyer registered in another state.
+
+    Without a company state code the supply cannot be placed, so it is
+    taxed as intra-state rather than charging IGST on every registered buyer.
+    """
+    buyer_state = state_code_from_gstin(buyer_gstin)
+    company_state = _normalize_state_code(company_state_code)
+    if not company_state:
+        if buyer_state is not None:
+            logger.warning("Company state code is not set; taxing the supply as intra-state")
+        return False
+    return buyer_state is not None and buyer_state != company_state
+
+def get_company_state_code(conn):
+    row = conn.execute("SELECT state_code FROM company_details WHERE id = 1").fetchone()
+    return _normalize_state_code(row[0]) if row else None
+
+def line_amounts(quantity, price, discount_percentage, gst_percentage):
+    """Money amounts for a single line, used for running totals while items are added.
+
+    GST is rounded at the full rate; once the invoice is split into CGST and
+    SGST by compute_line_taxes a line's tax can differ by a paisa.
+    """
+    gross = Money.from_rupees(price) * quantity
+    discount = gross.percent(discount_percentage)
+    taxable = gross - discount
+    gst = taxable.percent(gst_percentage)
+    return {
+        'gross_amount': gross,
+        'discount_amount': discount,
+        'taxable_value': taxable,
+        'gst_amount': gst,
+        'total_amount': taxable + gst
+    }
+
+def compute_line_taxes(items, interstate):
+    """Add LINE_COLUMNS, in rupees, to a copy of items (quantity, price, discount_percentage, gst_percentage).
+
+    CGST and SGST are each rounded from half the rate, so they always match.
+    """
+    lines = items.copy()
+    quantity = lines['quantity'].to_numpy(dtype=float)
+    price = paise_array(lines['price'])
+    discount_rate = np.nan_to_num(lines['discount_percentage'].to_numpy(dtype=float)) / 100
+    gst_rate = np.nan_to_num(lines['gst_percentage'].to_numpy(dtype=float)) / 100
+
+    # int64 paise from here on; only the rates introduce fractions to round
+    gross = _round(quantity * price)
+    discount = _round(gross * discount_rate)
+    taxable = gross - discount
+    if interstate:
+        igst = _round(taxable * gst_rate)
+        cgst = sgst = np.zeros_like(taxable)
+        gst = igst
+    else:
+        cgst = sgst = _round(taxable * gst_rate / 2)
+        igst = np.zeros_like(taxable)
+        gst = cgst + sgst
+
+    amounts = {
+        'gross_amount': gross,
+        'discount_amount': discount,
+        'taxable_value': taxable,
+        'cgst_amount': cgst,
+        'sgst_amount': sgst,
+        'igst_amount': igst,
+        'gst_amount': gst,
+        'total_amount': taxable + gst
+    }
+    for column, paise in amounts.items():
+        lines[column] = paise / 100
+    return lines
+
+SLAB_COLUMNS = ['taxable_value', 'cgst_amount', 'sgst_amount', 'igst_amount', 'gst_amount']
+
+def tax_slabs(lines):
+    """Taxable value and tax per GST rate, in rupees, for the invoice's tax summary"""
+    slabs = lines[['gst_percentage']].copy()
+    for column in SLAB_COLUMNS:
+        slabs[column] = paise_array(lines[column])
+    slabs = slabs.groupby('gst_percentage', as_index=False, sort=True)[SLAB_COLUMNS].sum()
+    slabs[SLAB_COLUMNS] = slabs[SLAB_COLUMNS] / 100
+    return slabs
+
+def invoice_totals(lines, round_off=None):
+    """Invoice totals as Money; with round_off the grand total is rounded to whole rupees"""
+    round_off = Config.INVOICE_ROUND_OFF if round_off is None else round_off
+    totals = {'quantity': float(lines['quantity'].sum())}
+    for column in LINE_COLUMNS:
+        # Line amounts are whole paise, so summing them as int64 is exact
+        totals[column] = Money(paise_array(lines[column]).sum())
+    total = totals['taxable_value'] + totals['gst_amount']
+    grand_total = Money(_round(total / 100, 'half_up') * 100) if round_off else total
+    totals['total_amount'] = total
+    totals['round_off'] = grand_total - total
+    totals['grand_total'] = grand_total
+    return totals
+
+class InvoiceTax:
+    """Per-line amounts, per-rate slabs and totals for one invoice"""
+
+    def __init__(self, items, company_state_code, buyer_gstin, round_off=None):
+        self.interstate = is_interstate(company_state_code, buyer_gstin)
+        self.place_of_supply = state_code_from_gstin(buyer_gstin) or _normalize_state_code(company_state_code)
+        self.lines = compute_line_taxes(items, self.interstate)
+        self.slabs = tax_slabs(self.lines)
+        self.totals = invoice_totals(self.lines, round_off)
+
+def compute_invoice_tax(conn, items, buyer_gstin, round_off=None):
+    """InvoiceTax for items sold from the company in company_details"""
+    return InvoiceTax(items, get_company_state_code(conn), buyer_gstin, round_off)